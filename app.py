@@ -1,8 +1,10 @@
+from config.config import BACKPLANE_URL, COMMAND_CONFLICT_RETRIES, PUBLIC_URL
 from core.state_manager import get_state_manager
 
 from utils.logger import get_logger
 from utils.wsp_utils import EventHandlerRegistry
 from utils.event_bus import EventBus, initialize_event_bus
+from utils.backplane import initialize_backplane
 
 
 event_handler_registry = EventHandlerRegistry(
@@ -10,4 +12,5 @@ event_handler_registry = EventHandlerRegistry(
 )
 
 state_manager = get_state_manager()
-initialize_event_bus(state_manager=state_manager)
+initialize_event_bus(state_manager=state_manager, max_conflict_retries=COMMAND_CONFLICT_RETRIES)
+initialize_backplane(BACKPLANE_URL, public_url=PUBLIC_URL)
@@ -0,0 +1,53 @@
+"""Measure the cost of bot players: decision latency and full bot turns through the EventBus.
+
+Run from the project root: python benchmarks/bench_bots.py [games] [bots_per_game] [rounds]
+"""
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+logging.disable(logging.CRITICAL)
+
+import server  # noqa: E402,F401  Registers handlers and listeners
+from core.bot_players import get_bot_manager  # noqa: E402
+from core.state_manager import get_state_manager  # noqa: E402
+from models.board_models import PropertySpace  # noqa: E402
+
+
+async def main(game_count: int, bots_per_game: int, rounds: int) -> None:
+    bot_manager = get_bot_manager()
+    state_manager = get_state_manager()
+
+    board = state_manager.create_state("bench-decisions").board
+    properties = [space for space in board.spaces if isinstance(space, PropertySpace)]
+    decisions = 100_000
+    start = time.perf_counter()
+    for i in range(decisions):
+        bot_manager.should_buy(board, 1500, properties[i % len(properties)], 3)
+    elapsed = time.perf_counter() - start
+    print(f"Buy decision: {elapsed / decisions * 1e6:.3f} us/decision")
+
+    game_ids = [f"bench-game-{i}" for i in range(game_count)]
+    for game_id in game_ids:
+        state_manager.create_state(game_id)
+        for _ in range(bots_per_game):
+            bot_manager.add_bot(game_id)
+
+    start = time.perf_counter()
+    turns = 0
+    for _ in range(rounds):
+        for game_id in game_ids:
+            turns += await bot_manager.play_turns(game_id)
+    elapsed = time.perf_counter() - start
+
+    print(f"Bots: {game_count * bots_per_game} across {game_count} games")
+    print(f"Turns: {turns} in {elapsed:.2f}s ({turns / elapsed:,.0f} turns/s, {elapsed / max(turns, 1) * 1e3:.3f} ms/turn)")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:4]]
+    games, bots, rounds = args + [250, 4, 5][len(args):]
+    asyncio.run(main(games, bots, rounds))
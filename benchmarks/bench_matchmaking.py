@@ -0,0 +1,39 @@
+"""Measure quick-join throughput of the matchmaker: bursts of joins placed into open games or new ones.
+
+Run from the project root: python benchmarks/bench_matchmaking.py [joins] [burst_size]
+"""
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+logging.disable(logging.CRITICAL)
+
+import server  # noqa: E402,F401  Registers handlers and listeners
+from config.board_loader import get_board  # noqa: E402
+from core.matchmaking import get_matchmaker  # noqa: E402
+from utils.metrics import get_metrics  # noqa: E402
+
+
+async def main(join_count: int, burst_size: int) -> None:
+    get_board()
+    matchmaker = get_matchmaker()
+
+    start = time.perf_counter()
+    for burst_start in range(0, join_count, burst_size):
+        await asyncio.gather(*(
+            matchmaker.join(f"user-{i}", "default") for i in range(burst_start, min(burst_start + burst_size, join_count))
+        ))
+    elapsed = time.perf_counter() - start
+
+    counters = get_metrics().snapshot()["counters"]
+    print(f"Joins: {join_count} in bursts of {burst_size}, {counters.get('matchmaking.games_created', 0)} games created")
+    print(f"{join_count / elapsed:,.0f} joins/s, {elapsed / join_count * 1e6:.2f} us/join (batch interval included)")
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    joins, burst = args + [100_000, 1_000][len(args):]
+    asyncio.run(main(joins, burst))
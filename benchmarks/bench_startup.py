@@ -0,0 +1,78 @@
+"""Measure import time, startup time and time to first accepted connection of a fresh server process.
+
+Each run starts a new interpreter, imports main, runs the startup phase, serves on an ephemeral port and
+connects to itself. Runs alternate between a cold (no precompiled board) and warm board cache.
+
+Run from the project root: python benchmarks/bench_startup.py [runs]
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from config.config import BOARD_CACHE_DIR  # noqa: E402
+
+
+CHILD = """
+import time
+process_started_at = time.perf_counter()
+import asyncio, json, logging
+logging.disable(logging.CRITICAL)
+import websockets
+import main
+imported_at = time.perf_counter()
+
+async def serve_once():
+    await main.startup()
+    started_at = time.perf_counter()
+    async with websockets.serve(main.event_router, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        async with websockets.connect(f"ws://127.0.0.1:{port}"):
+            accepted_at = time.perf_counter()
+    return started_at, accepted_at
+
+started_at, accepted_at = asyncio.run(serve_once())
+print(json.dumps({
+    "import_ms": (imported_at - process_started_at) * 1000,
+    "startup_ms": (started_at - imported_at) * 1000,
+    "first_accept_ms": (accepted_at - process_started_at) * 1000
+}))
+"""
+
+
+def run_child() -> dict:
+    launched_at = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - launched_at) * 1000
+    return timings
+
+
+def main(runs: int) -> None:
+    results = {"cold": [], "warm": []}
+    for _ in range(runs):
+        for cache_file in BOARD_CACHE_DIR.glob("*.pickle"):
+            cache_file.unlink()
+        results["cold"].append(run_child())
+        results["warm"].append(run_child())
+
+    for cache_state, timings in results.items():
+        medians = {key: statistics.median(run[key] for run in timings) for key in timings[0]}
+        print(
+            f"{cache_state} board cache ({runs} runs, medians): "
+            f"import {medians['import_ms']:.1f}ms, "
+            f"startup {medians['startup_ms']:.1f}ms, "
+            f"first accept {medians['first_accept_ms']:.1f}ms after interpreter start, "
+            f"whole process {medians['process_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
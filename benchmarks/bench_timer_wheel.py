@@ -0,0 +1,75 @@
+"""Measure scheduling, cancelling and expiring deadlines on the timer wheel against one loop.call_later per deadline.
+
+Every deadline is scheduled, half of them are cancelled (players acting in time) and the rest expire.
+Run from the project root: python benchmarks/bench_timer_wheel.py [timers]
+"""
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.timer_wheel import TimerWheel  # noqa: E402
+
+
+def noop(game_id: str) -> None:
+    pass
+
+
+def bench_wheel(delays) -> None:
+    wheel = TimerWheel(tick_seconds=0.1)
+    tracemalloc.start()
+    start = time.perf_counter()
+    timers = [wheel.schedule(delay, noop, str(i)) for i, delay in enumerate(delays)]
+    scheduled = time.perf_counter()
+    for timer in timers[::2]:
+        timer.cancel()
+    cancelled = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    fired = 0
+    horizon = wheel._started_at + max(delays) + 1
+    expire_start = time.perf_counter()
+    for tick in range(1, int((max(delays) + 1) / wheel.tick_seconds) + 2):
+        fired += len(wheel.advance(min(wheel._started_at + tick * wheel.tick_seconds + 1e-6, horizon)))
+    expired = time.perf_counter()
+
+    print(
+        f"Timer wheel: schedule {(scheduled - start) / len(delays) * 1e6:.3f} us, "
+        f"cancel {(cancelled - scheduled) / (len(delays) // 2) * 1e6:.3f} us, "
+        f"expire {(expired - expire_start) / max(fired, 1) * 1e6:.3f} us per timer ({fired} fired), "
+        f"peak {peak / len(delays):.0f} B per timer"
+    )
+
+
+async def bench_call_later(delays) -> None:
+    loop = asyncio.get_running_loop()
+    tracemalloc.start()
+    start = time.perf_counter()
+    handles = [loop.call_later(delay, noop, str(i)) for i, delay in enumerate(delays)]
+    scheduled = time.perf_counter()
+    for handle in handles[::2]:
+        handle.cancel()
+    cancelled = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for handle in handles:
+        handle.cancel()
+
+    print(
+        f"call_later:  schedule {(scheduled - start) / len(delays) * 1e6:.3f} us, "
+        f"cancel {(cancelled - scheduled) / (len(delays) // 2) * 1e6:.3f} us, "
+        f"peak {peak / len(delays):.0f} B per timer"
+    )
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    delays = [random.uniform(1, 120) for _ in range(count)]
+    print(f"{count} deadlines between 1s and 120s")
+    bench_wheel(delays)
+    asyncio.run(bench_call_later(delays))
@@ -0,0 +1,54 @@
+"""Measure time and memory allocated per game turn on the EventBus / StateManager hot path.
+
+Run from the project root: python benchmarks/bench_turn_allocations.py [turns]
+"""
+import asyncio
+import logging
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+logging.disable(logging.CRITICAL)
+
+import server  # noqa: E402,F401  Registers handlers and listeners
+from core.bot_players import get_bot_manager  # noqa: E402
+from core.state_manager import get_state_manager  # noqa: E402
+
+
+async def main(turn_count: int) -> None:
+    bot_manager = get_bot_manager()
+    state_manager = get_state_manager()
+
+    game_id = "bench-allocations"
+    game_state = state_manager.create_state(game_id)
+    for _ in range(4):
+        bot_manager.add_bot(game_id)
+
+    # Warm up caches and lazily built tables
+    for _ in range(20):
+        await bot_manager.play_turn(game_id, game_state.current_turn_uid)
+
+    start = time.perf_counter()
+    for _ in range(turn_count):
+        await bot_manager.play_turn(game_id, game_state.current_turn_uid)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    transient_bytes = 0
+    retained_bytes = 0
+    for _ in range(turn_count):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await bot_manager.play_turn(game_id, game_state.current_turn_uid)
+        after, peak = tracemalloc.get_traced_memory()
+        transient_bytes += peak - before
+        retained_bytes += after - before
+    tracemalloc.stop()
+
+    print(f"Turns: {turn_count}, {elapsed / turn_count * 1e6:.1f} us/turn")
+    print(f"Per turn: {transient_bytes / turn_count:,.0f} bytes peak allocated, {retained_bytes / turn_count:,.0f} bytes retained")
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
@@ -0,0 +1,129 @@
+"""Compare frame size and CPU of the wire encodings for stateUpdate and showDialog payloads.
+
+Each encoding is measured raw and through permessage-deflate with the server's configured parameters and with
+the websockets defaults, compressing the frames of consecutive turns on one stream as a connection would.
+Encodings whose library isn't installed are skipped. Also compares encoding a broadcast once per encoding
+against once per socket.
+Run from the project root: python benchmarks/bench_wire_encoding.py [turns] [sockets]
+"""
+import asyncio
+import logging
+import sys
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+logging.disable(logging.CRITICAL)
+
+import server  # noqa: E402,F401  Registers handlers and listeners
+from config.config import DEFLATE_SERVER_MAX_WINDOW_BITS, DEFLATE_COMPRESSION_LEVEL, DEFLATE_MEM_LEVEL  # noqa: E402
+from core.bot_players import get_bot_manager  # noqa: E402
+from core.state_manager import get_state_manager  # noqa: E402
+from models.wsp_schemas import WSPEvent  # noqa: E402
+from utils.wsp_codec import available_encodings, decode_event, encode_event  # noqa: E402
+
+DEFLATE_SETTINGS = {
+    "configured": (DEFLATE_SERVER_MAX_WINDOW_BITS, DEFLATE_COMPRESSION_LEVEL, DEFLATE_MEM_LEVEL),
+    "websockets default": (12, -1, 5)
+}
+
+
+def deflated_size(frames, window_bits: int, level: int, mem_level: int) -> int:
+    """Bytes on the wire of the frames compressed on one stream with context takeover, as permessage-deflate does."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -window_bits, mem_level)
+    total = 0
+    for frame in frames:
+        data = frame.encode() if isinstance(frame, str) else frame
+        total += len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return total
+
+
+def fresh(events):
+    # Encoded frames are memoized on the events, copies measure the encoding itself
+    return [event.model_copy() for event in events]
+
+
+def measure(name: str, events) -> None:
+    print(f"\n{name}: {len(events)} events")
+    for encoding in available_encodings():
+        copies = fresh(events)
+        start = time.perf_counter()
+        frames = [encode_event(event, encoding) for event in copies]
+        encoded = time.perf_counter()
+        for frame in frames:
+            decode_event(frame, encoding)
+        decoded = time.perf_counter()
+
+        raw = sum(len(frame.encode() if isinstance(frame, str) else frame) for frame in frames)
+        deflated = ", ".join(
+            f"{label} {deflated_size(frames, *settings) / len(frames):,.0f} B"
+            for label, settings in DEFLATE_SETTINGS.items()
+        )
+        print(
+            f"  {encoding:8} raw {raw / len(frames):7,.0f} B, deflated: {deflated} | "
+            f"encode {(encoded - start) / len(frames) * 1e6:6.1f} us, decode {(decoded - encoded) / len(frames) * 1e6:6.1f} us"
+        )
+
+
+def measure_broadcast(events, socket_count: int) -> None:
+    encodings = available_encodings()
+    print(f"\nBroadcast to {socket_count} sockets spread over {len(encodings)} encodings")
+
+    copies = fresh(events)
+    start = time.perf_counter()
+    for event in copies:
+        for i in range(socket_count):
+            encode_event(event, encodings[i % len(encodings)])
+    shared = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for event in events:
+        for i in range(socket_count):
+            # One event per socket, as broadcasts were built before events were shared
+            encode_event(event.model_copy(), encodings[i % len(encodings)])
+    per_socket = time.perf_counter() - start
+
+    print(f"  shared event: {shared / len(events) * 1e6:,.1f} us, event per socket: {per_socket / len(events) * 1e6:,.1f} us per broadcast")
+
+
+async def main(turn_count: int, socket_count: int) -> None:
+    bot_manager = get_bot_manager()
+    state_manager = get_state_manager()
+
+    game_id = "bench-wire-encoding"
+    game_state = state_manager.create_state(game_id)
+    for _ in range(4):
+        bot_manager.add_bot(game_id)
+
+    full_updates = []
+    dynamic_updates = []
+    dialogs = []
+    for seq in range(turn_count):
+        await bot_manager.play_turn(game_id, game_state.current_turn_uid)
+        full_updates.append(WSPEvent(event="stateUpdate", data={"state": game_state.to_dict()}, seq=seq))
+        dynamic_updates.append(WSPEvent(event="stateUpdate", data={"state": game_state.to_dynamic_dict()}, seq=seq))
+        space_index = game_state.player_states[game_state.current_turn_uid].position
+        dialogs.append(WSPEvent(
+            event="showDialog",
+            data={
+                "promptType": "payRent",
+                "message": "You landed on an owned property, pay rent to continue.",
+                "space": game_state.space_fragment(space_index, dynamic_only=True),
+                "action": None,
+                "rentAmount": 120
+            },
+            seq=seq
+        ))
+
+    print(f"Encodings available: {', '.join(available_encodings())}")
+    measure("stateUpdate, full board", full_updates)
+    measure("stateUpdate, dynamic fields only", dynamic_updates)
+    measure("showDialog", dialogs)
+    measure_broadcast(dynamic_updates, socket_count)
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:3]]
+    turns, sockets = args + [200, 8][len(args):]
+    asyncio.run(main(turns, sockets))
@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import json
+import pickle
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.config import BOARD_PATH, BOARD_VARIANTS_DIR, BOARD_CACHE_DIR, DEFAULT_BOARD_VARIANT, BOARD_RELOAD_INTERVAL_SECONDS
+
+import models.board_models
+from models.board_models import Board, BoardSpace, space_from_json
+
+from utils.logger import get_logger
+from utils.metrics import get_metrics
+
+
+log = get_logger("board_loader")
+
+
+@lru_cache(maxsize=1)
+def _schema_hash() -> str:
+    """Hash of the board model definitions, pickles written by other versions of them are never read."""
+    return hashlib.sha256(Path(models.board_models.__file__).read_bytes()).hexdigest()[:8]
+
+
+def _parse_board(data: bytes) -> List[BoardSpace]:
+    return [space_from_json(json.loads(line)) for line in data.decode().splitlines() if line.strip()]
+
+
+def load_board(
+    path: Path,
+    variant: str = DEFAULT_BOARD_VARIANT,
+    cache_dir: Path = BOARD_CACHE_DIR,
+    current: Optional[Board] = None
+) -> Board:
+    """Load a board file, reusing its precompiled form when the file's hash matches a cached one.
+
+    The precompiled form is the pickled list of spaces, which skips JSON decoding and model validation.
+    It is keyed by the file's hash and the board models' source, so a change to either misses the cache.
+    A missing, stale or unreadable cache falls back to parsing the file and rewrites the cache.
+    `current` is returned as is when the file still has its hash, so unchanged boards keep their identity.
+    """
+    data = path.read_bytes()
+    board_hash = hashlib.sha256(data).hexdigest()[:16]
+    if current is not None and current.hash == board_hash:
+        return current
+
+    cache_path = cache_dir / f"{path.stem}-{board_hash}-{_schema_hash()}.pickle"
+    try:
+        cached = cache_path.read_bytes()
+    except OSError:
+        cached = None
+    if cached is not None:
+        try:
+            return Board.from_spaces(variant, board_hash, pickle.loads(cached))
+        except Exception as e:
+            # Unpickling can fail in many ways, any of them is a cache miss
+            log.warning(f"Ignoring unreadable board cache {cache_path.name}: {e}")
+
+    spaces = _parse_board(data)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_path.write_bytes(pickle.dumps(spaces, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        # A read-only deployment still works, it just parses on every start
+        pass
+    return Board.from_spaces(variant, board_hash, spaces)
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class BoardRegistry:
+    """Board definitions by variant id and content hash, reloaded when their files change on disk.
+
+    The variants are the default board file plus every `*.jsonl` file in BOARD_VARIANTS_DIR, named after the file.
+    Changed files are parsed off the event loop and the registry's mappings are swapped in a single assignment,
+    so lookups see either every old or every new board. Games keep a reference to the Board they were created
+    with, so a reload only affects games created afterwards.
+
+    Use case:
+    ```
+    registry = get_board_registry()
+    registry.start()
+    board = registry.get("speed_run")
+    ```
+    """
+
+    _boards: Dict[str, Board]
+    """Maps variant id to its current board"""
+    _boards_by_hash: Dict[str, Board]
+    """Maps content hash to the current board with that hash"""
+    _file_stamps: Dict[str, Tuple[int, int]]
+    """Maps variant id to the (mtime, size) of its file when it was last read, including files that failed to load"""
+
+    def __init__(
+        self,
+        default_path: Path = BOARD_PATH,
+        variants_dir: Path = BOARD_VARIANTS_DIR,
+        reload_interval: float = BOARD_RELOAD_INTERVAL_SECONDS
+    ):
+        self.default_path = default_path
+        self.variants_dir = variants_dir
+        self.reload_interval = reload_interval
+        self._boards = {}
+        self._boards_by_hash = {}
+        self._file_stamps = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _board_files(self) -> Dict[str, Path]:
+        files = {}
+        if self.variants_dir.is_dir():
+            files = {path.stem: path for path in sorted(self.variants_dir.glob("*.jsonl"))}
+        files[DEFAULT_BOARD_VARIANT] = self.default_path
+        return files
+
+    def _changed_files(self) -> Tuple[Dict[str, Path], Dict[str, Tuple[int, int]]]:
+        """Files whose stamp differs from when they were loaded, and the stamps of every current file."""
+        changed = {}
+        stamps = {}
+        for variant, path in self._board_files().items():
+            stamp = _file_stamp(path)
+            if stamp is None:
+                continue
+            stamps[variant] = stamp
+            if self._file_stamps.get(variant) != stamp:
+                changed[variant] = path
+        return changed, stamps
+
+    def _load_files(self, files: Dict[str, Path]) -> Dict[str, Board]:
+        boards = {}
+        for variant, path in files.items():
+            try:
+                boards[variant] = load_board(path, variant=variant, current=self._boards.get(variant))
+            except (OSError, ValueError) as e:
+                log.error(f"Failed to load board variant {variant} from {path}, keeping the previous version: {e}")
+        return boards
+
+    def _swap(self, loaded: Dict[str, Board], stamps: Dict[str, Tuple[int, int]]) -> None:
+        boards = {variant: board for variant, board in self._boards.items() if variant in stamps}
+        for variant, board in loaded.items():
+            if self._boards.get(variant) is not board:
+                log.info(f"Loaded board variant {variant} ({board.hash})")
+            boards[variant] = board
+        for variant in self._boards.keys() - boards.keys():
+            log.info(f"Board variant {variant} was removed, running games keep it until they end")
+
+        self._file_stamps = dict(stamps)
+        self._boards_by_hash = {board.hash: board for board in boards.values()}
+        self._boards = boards
+        get_metrics().set_gauge("boards.variants", len(boards))
+
+    def load(self) -> None:
+        """Load every board file that changed, blocking. Used before the event loop serves requests."""
+        changed, stamps = self._changed_files()
+        if changed or stamps.keys() != self._file_stamps.keys():
+            self._swap(self._load_files(changed), stamps)
+
+    async def reload(self) -> bool:
+        """Reload the board files that changed on disk without blocking the event loop. Returns whether anything changed."""
+        changed, stamps = await asyncio.to_thread(self._changed_files)
+        if not changed and stamps.keys() == self._file_stamps.keys():
+            return False
+        loaded = await asyncio.to_thread(self._load_files, changed)
+        self._swap(loaded, stamps)
+        get_metrics().incr("boards.reloads")
+        return True
+
+    def get(self, variant: str = DEFAULT_BOARD_VARIANT) -> Board | None:
+        if not self._boards:
+            self.load()
+        return self._boards.get(variant)
+
+    def get_by_hash(self, board_hash: str) -> Board | None:
+        if not self._boards:
+            self.load()
+        return self._boards_by_hash.get(board_hash)
+
+    def variants(self) -> List[str]:
+        if not self._boards:
+            self.load()
+        return sorted(self._boards)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            log.info(f"Watching board files for changes every {self.reload_interval:g}s")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                log.error(f"Error reloading board files: {e}")
+
+
+@lru_cache(maxsize=1)
+def get_board_registry() -> BoardRegistry:
+    return BoardRegistry()
+
+
+def get_board() -> Board:
+    """The current board of the default variant, which new games use unless they ask for another one."""
+    board = get_board_registry().get(DEFAULT_BOARD_VARIANT)
+    if board is None:
+        raise ValueError(f"The default board variant could not be loaded from {BOARD_PATH}.")
+    return board
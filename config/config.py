@@ -1,12 +1,81 @@
-import json
+import os
 from pathlib import Path
 
-from models.board_models import space_from_json
 
-
-with open('data/board_data.jsonl', 'r') as f:
-    BOARD_DATA = [json.loads(line) for line in f.readlines()]
-
-template_game_board = [space_from_json(space_json) for space_json in BOARD_DATA]
 PROJECT_PATH = Path(__file__).parent.parent
+BOARD_PATH = PROJECT_PATH / "data" / "board_data.jsonl"  # Board of the default variant
+BOARD_VARIANTS_DIR = PROJECT_PATH / "data" / "boards"  # Every *.jsonl file here is a board variant named after the file
+BOARD_CACHE_DIR = PROJECT_PATH / "data" / "cache"  # Precompiled boards, keyed by the board file's hash and the board models
+DEFAULT_BOARD_VARIANT = "default"
+BOARD_RELOAD_INTERVAL_SECONDS = 5  # How often board files are checked for changes
 SESSION_PERSIST_PATH = PROJECT_PATH / "data" / "sessions.db"
+ADMIN_TOKEN = os.environ.get("MAS_ADMIN_TOKEN")  # Admin WSP events are disabled unless this is set
+BACKPLANE_URL = os.environ.get("MAS_BACKPLANE_URL")  # redis://host:port or unix:///path, broadcasts stay in-process if unset
+PUBLIC_URL = os.environ.get("MAS_PUBLIC_URL")  # Address clients reach this process at, clients of its games arriving elsewhere are sent here
+
+# ---- BACKPLANE ----
+BACKPLANE_MAX_PENDING_BYTES = 8 * 1024 * 1024       # Unsent broadcasts kept while the broker is slow or down, the oldest are dropped beyond this
+BACKPLANE_MAX_RECONNECT_DELAY_SECONDS = 10          # Longest wait between attempts to reconnect to the broker
+BACKPLANE_REQUEST_TIMEOUT_SECONDS = 5               # Requests to the broker that get no reply within this fail
+GAME_OWNERSHIP_TTL_SECONDS = 30                     # A crashed process's games can be claimed by others after this, live owners renew at a third of it
+
+# ---- BOT PLAYERS ----
+BOT_TAKEOVER_ON_DISCONNECT = True   # Hand disconnected players' seats to a bot instead of removing them
+BOT_CASH_RESERVE = 200              # Bots never spend below this balance on purchases
+BOT_MAX_PAYBACK_TURNS = 500         # Bots skip properties that take longer than this to pay for themselves
+
+# ---- RECONNECTS ----
+REPLAY_BUFFER_SIZE = 256  # Outbound events kept per game for reconnecting clients to catch up from
+
+# ---- SPECTATORS ----
+SPECTATOR_TICK_RATE_HZ = 2                  # Snapshots per second sent to spectators of a changing game
+SPECTATOR_MAX_WRITE_BUFFER = 256 * 1024     # Spectators with more unsent bytes than this skip snapshots until they catch up
+
+# ---- CONNECTIONS ----
+PING_INTERVAL_SECONDS = 20      # Keepalive pings sent by the server
+PING_TIMEOUT_SECONDS = 20       # Connections that don't answer a ping within this are closed
+IDLE_TIMEOUT_SECONDS = 600      # Connections that send nothing for this long are evicted
+REAPER_INTERVAL_SECONDS = 15    # How often closed and idle connections are evicted
+ABANDONED_GAME_TIMEOUT_SECONDS = 1800  # Games without a connected player or spectator for this long are ended
+MAX_CONNECTIONS = 20_000        # Connections above this are refused
+MAX_CONNECTIONS_PER_IP = 64     # Connections from one remote address above this are refused
+
+# ---- ADMISSION CONTROL ----
+GLOBAL_EVENTS_PER_SECOND = 5_000    # Inbound events the process accepts per second across all connections
+GLOBAL_EVENT_BURST = 10_000
+USER_EVENTS_PER_SECOND = 10         # Inbound events accepted per second from one user (and from one connection)
+USER_EVENT_BURST = 20
+GAME_EVENTS_PER_SECOND = 40         # Inbound events accepted per second for one game across its players
+GAME_EVENT_BURST = 80
+
+# ---- DRAINING ----
+HANDOFF_DIR = PROJECT_PATH / "data" / "handoff"     # Snapshots of the games a draining process hands to its successor
+SUCCESSOR_URL = os.environ.get("MAS_SUCCESSOR_URL")  # Where clients of a draining process reconnect, their current address if unset
+
+# ---- TURN DEADLINES ----
+TIMER_TICK_SECONDS = 0.1        # Resolution of the timer wheel driving every deadline
+TURN_TIMEOUT_SECONDS = 60       # Players who don't roll within this have their turn ended
+DECISION_TIMEOUT_SECONDS = 30   # Unanswered purchase and rent dialogs take their default: pass, or pay the rent
+
+# ---- MATCHMAKING ----
+SEATS_PER_GAME = 4                          # Players placed in one matchmade game, addBot fills other games up to this too
+MATCHMAKING_BATCH_INTERVAL_SECONDS = 0.005  # Quick joins arriving within this are placed together
+
+# ---- GAME STATE POOL ----
+GAME_STATE_POOL_SIZE = 64                   # Idle pre-built game states kept per board in use
+GAME_STATE_POOL_REFILL_INTERVAL_SECONDS = 1 # How often the pool is topped up
+GAME_STATE_POOL_REFILL_BATCH = 16           # States built per refill, so refilling never holds the loop for long
+
+# ---- IDEMPOTENCY ----
+REQUEST_DEDUP_TTL_SECONDS = 120             # How long a requestId is remembered, longer than any client's retry window
+REQUEST_DEDUP_MAX_PER_USER = 64             # Remembered requestIds per user, the oldest are forgotten first
+REQUEST_DEDUP_MAX_USERS = 10_000            # Users with remembered requestIds, the least recently active are forgotten first
+
+# ---- WIRE ENCODING ----
+DEFLATE_SERVER_MAX_WINDOW_BITS = 12         # Window of the server's compressor. 14 shrinks full-board updates ~10x but triples memory per connection
+DEFLATE_CLIENT_MAX_WINDOW_BITS = 12         # Largest window clients may compress their frames with
+DEFLATE_COMPRESSION_LEVEL = 6               # zlib level of outbound frames
+DEFLATE_MEM_LEVEL = 5                       # zlib memLevel, memory per connection against compression ratio
+
+# ---- CONCURRENCY CONTROL ----
+COMMAND_CONFLICT_RETRIES = 3                # Times listeners are re-run when their commands conflict with a concurrent change to the game
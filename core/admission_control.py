@@ -0,0 +1,115 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Hashable
+from weakref import WeakKeyDictionary
+
+from websockets.asyncio.server import ServerConnection
+
+from config.config import (
+    GLOBAL_EVENTS_PER_SECOND, GLOBAL_EVENT_BURST,
+    USER_EVENTS_PER_SECOND, USER_EVENT_BURST,
+    GAME_EVENTS_PER_SECOND, GAME_EVENT_BURST
+)
+
+from utils.metrics import get_metrics
+
+
+class TokenBucket:
+    """Allows `rate` events per second on average with bursts of up to `capacity` events."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_take(self, now: float) -> bool:
+        self.refill(now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class KeyedTokenBuckets:
+    """One token bucket per key, the least recently used are forgotten once there are more than max_keys."""
+
+    _buckets: OrderedDict[Hashable, TokenBucket]
+    """Maps key to its bucket, ordered from least to most recently used"""
+
+    def __init__(self, rate: float, capacity: float, max_keys: int = 10_000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def try_take(self, key: Hashable, now: float) -> bool:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_take(now)
+
+
+class AdmissionController:
+    """Decides whether an inbound WSP event may be processed, shedding floods before they cost state work.
+
+    Raw messages are checked against the per-connection budget, then the process-wide one, before they are parsed.
+    A connection's shed messages don't take from the process-wide budget, so one flood can't starve other clients.
+    Parsed events are then checked against the budgets of their user and game before reaching a handler.
+    Shed events are counted in `admission.shed.<budget>`.
+    """
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_EVENTS_PER_SECOND, GLOBAL_EVENT_BURST)
+        self.connection_buckets: WeakKeyDictionary = WeakKeyDictionary()
+        self.user_buckets = KeyedTokenBuckets(USER_EVENTS_PER_SECOND, USER_EVENT_BURST)
+        self.game_buckets = KeyedTokenBuckets(GAME_EVENTS_PER_SECOND, GAME_EVENT_BURST)
+
+    def admit_message(self, ws: ServerConnection) -> bool:
+        """Check a raw inbound message against the per-connection and global budgets."""
+        now = time.monotonic()
+        bucket = self.connection_buckets.get(ws)
+        if bucket is None:
+            bucket = self.connection_buckets[ws] = TokenBucket(USER_EVENTS_PER_SECOND, USER_EVENT_BURST)
+        if not bucket.try_take(now):
+            get_metrics().incr("admission.shed.connection")
+            return False
+
+        if not self.global_bucket.try_take(now):
+            get_metrics().incr("admission.shed.global")
+            return False
+        return True
+
+    def admit_event(self, user_id: str | None, game_id: str | None) -> bool:
+        """Check a parsed event against the budgets of its user and game.
+
+        The game_id is chosen by the client, pass None unless the sender is registered in that game,
+        so a connection can't spend the budget of a game it isn't part of.
+        """
+        now = time.monotonic()
+        if user_id and not self.user_buckets.try_take(user_id, now):
+            get_metrics().incr("admission.shed.user")
+            return False
+        if game_id and not self.game_buckets.try_take(game_id, now):
+            get_metrics().incr("admission.shed.game")
+            return False
+        return True
+
+
+@lru_cache(maxsize=1)
+def get_admission_controller() -> AdmissionController:
+    return AdmissionController()
@@ -0,0 +1,209 @@
+import random
+import uuid
+from functools import lru_cache
+from typing import Dict, List, Sequence, Set
+
+from config.config import BOT_CASH_RESERVE, BOT_MAX_PAYBACK_TURNS
+
+from core.rent_engine import RentTable, get_rent_table
+from core.state_manager import get_state_manager
+from core.turn_deadlines import get_turn_deadlines
+from core.wsp_helpers import state_update
+
+from models.board_models import Board, BoardSpace, PropertySpace
+from models.events import PlayerRollDice, PurchasedProperty, PassedOnProperty, PayedRent
+
+from utils.event_bus import DefaultPhase, get_event_bus
+from utils.logger import get_logger
+
+
+log = get_logger("bot_players")
+
+BOT_ID_PREFIX = "bot-"
+
+# Probability of each total when rolling two six-sided dice
+DICE_DISTRIBUTION: Dict[int, float] = {
+    total: (6 - abs(total - 7)) / 36 for total in range(2, 13)
+}
+
+
+def _transition_rows(board: Sequence[BoardSpace]) -> List[Dict[int, float]]:
+    """Sparse transition matrix of the board's Markov chain, one {destination: probability} row per space.
+
+    Pieces only move by dice roll today, so each row is the dice distribution shifted by the space index.
+    Any space that redirects a piece (e.g. go_to_jail) should be modelled here once the game implements it.
+    """
+    board_size = len(board)
+    rows = []
+    for index in range(board_size):
+        row: Dict[int, float] = {}
+        for roll, probability in DICE_DISTRIBUTION.items():
+            destination = (index + roll) % board_size
+            row[destination] = row.get(destination, 0.0) + probability
+        rows.append(row)
+    return rows
+
+
+def stationary_distribution(rows: List[Dict[int, float]], max_iterations: int = 1000, tolerance: float = 1e-12) -> List[float]:
+    """Long-run landing probability of each space, found by power iteration over the transition rows."""
+    size = len(rows)
+    distribution = [1.0 / size] * size
+    for _ in range(max_iterations):
+        next_distribution = [0.0] * size
+        for index, row in enumerate(rows):
+            weight = distribution[index]
+            for destination, probability in row.items():
+                next_distribution[destination] += weight * probability
+        delta = max(abs(a - b) for a, b in zip(distribution, next_distribution))
+        distribution = next_distribution
+        if delta < tolerance:
+            break
+    return distribution
+
+
+class BoardTables:
+    """Precomputed per-board lookup tables used for bot decisions."""
+
+    landing_probabilities: List[float]
+    """Stationary probability that a turn ends on each space"""
+    payback_turns: List[float]
+    """Opponent turns a property needs to repay its purchase price with a single opponent, inf for non-properties"""
+
+    def __init__(self, board: Sequence[BoardSpace], rent_table: RentTable):
+        self.landing_probabilities = stationary_distribution(_transition_rows(board))
+        self.payback_turns = []
+        for space, probability in zip(board, self.landing_probabilities):
+            base_rent = rent_table.base_rent(space.space_index)
+            if isinstance(space, PropertySpace) and probability > 0 and base_rent > 0:
+                self.payback_turns.append(space.purchase_price / (probability * base_rent))
+            else:
+                self.payback_turns.append(float("inf"))
+
+
+@lru_cache(maxsize=32)
+def get_board_tables(board: Board) -> BoardTables:
+    """Tables of a board, computed once per board definition."""
+    log.info(f"Computing bot landing tables for board variant {board.variant} ({board.hash})...")
+    return BoardTables(board.spaces, get_rent_table(board))
+
+
+class BotManager:
+    """Tracks which seats are driven by bots and plays their turns through the EventBus."""
+
+    _bots_by_game: Dict[str, Set[str]]
+    """Maps game_id to the user_ids of seats currently controlled by a bot"""
+
+    def __init__(self):
+        self._bots_by_game = {}
+        self.state_manager = get_state_manager()
+
+    def is_bot(self, game_id: str, user_id: str) -> bool:
+        return user_id in self._bots_by_game.get(game_id, ())
+
+    def get_bots(self, game_id: str) -> Set[str]:
+        return self._bots_by_game.get(game_id, set())
+
+    def add_bot(self, game_id: str) -> str:
+        """Seat a new bot player in the game, returns the bot's user_id. The caller checks the seat is free."""
+        bot_id = f"{BOT_ID_PREFIX}{uuid.uuid4().hex[:8]}"
+        log.info(f"Adding bot {bot_id} to game {game_id}")
+        self.state_manager.initialize_session(user_id=bot_id, game_id=game_id)
+        self.state_manager.place_on_board(game_id=game_id, user_id=bot_id)
+        self._bots_by_game.setdefault(game_id, set()).add(bot_id)
+        return bot_id
+
+    def take_over(self, game_id: str, user_id: str) -> None:
+        """Hand an existing player's seat to a bot, keeping their position, balance and properties."""
+        log.info(f"Bot taking over seat of {user_id} in game {game_id}")
+        self._bots_by_game.setdefault(game_id, set()).add(user_id)
+
+    def release(self, game_id: str, user_id: str) -> None:
+        """Return a seat to its human player, e.g. after they reconnect."""
+        bots = self._bots_by_game.get(game_id)
+        if bots and user_id in bots:
+            log.info(f"Returning seat of {user_id} in game {game_id} to its player")
+            bots.discard(user_id)
+
+    def remove_game(self, game_id: str) -> None:
+        self._bots_by_game.pop(game_id, None)
+
+    def should_buy(self, board: Board, user_money: int, space: PropertySpace, opponent_count: int) -> bool:
+        """Buy when the property stays above the cash reserve and repays itself quickly enough."""
+        if user_money - space.purchase_price < BOT_CASH_RESERVE:
+            return False
+        payback = get_board_tables(board).payback_turns[space.space_index] / max(opponent_count, 1)
+        return payback <= BOT_MAX_PAYBACK_TURNS
+
+    async def play_turn(self, game_id: str, user_id: str) -> None:
+        """Play one full turn for a bot, publishing the same events a human client would trigger.
+
+        A bot taking over mid-turn, from a player who already rolled and was shown a decision dialog,
+        answers that dialog instead of rolling again.
+        """
+        event_bus = get_event_bus()
+        turn_deadlines = get_turn_deadlines()
+
+        prompt_type = turn_deadlines.open_dialogs(game_id).get(user_id)
+        if prompt_type:
+            turn_deadlines.answer_dialog(game_id, user_id, prompt_type)
+        else:
+            await event_bus.publish(
+                DefaultPhase.INPUT,
+                PlayerRollDice(
+                    game_id=game_id,
+                    user_id=user_id,
+                    version=self.state_manager.get_game_state(game_id).version,
+                    dice_roll=(random.randint(1, 6) + random.randint(1, 6))
+                )
+            )
+            await event_bus.process_all_phases(game_id)
+
+        game_state = self.state_manager.get_game_state(game_id)
+        user_state = self.state_manager.get_user_state(game_id, user_id)
+        space = game_state.game_board[user_state.position]
+        owner_id = game_state.owner_of(space.space_index)
+
+        if not isinstance(space, PropertySpace) or owner_id == user_id:
+            # Action and self-owned spaces end the turn from their landing listeners
+            return
+
+        if not owner_id:
+            opponent_count = len(game_state.player_states) - 1
+            if self.should_buy(game_state.board, user_state.money_dollars, space, opponent_count):
+                decision = PurchasedProperty(game_id=game_id, user_id=user_id, version=game_state.version, space_index=space.space_index)
+            else:
+                decision = PassedOnProperty(game_id=game_id, user_id=user_id, version=game_state.version, space_index=space.space_index)
+        else:
+            decision = PayedRent(
+                game_id=game_id,
+                user_id=user_id,
+                version=game_state.version,
+                opponent_id=owner_id,
+                rent_dollars=self.state_manager.get_rent(game_id, space.space_index)
+            )
+
+        await event_bus.publish(DefaultPhase.INPUT, decision)
+        await event_bus.process_all_phases(game_id)
+
+    async def play_turns(self, game_id: str) -> int:
+        """Play bot turns until it is a human's turn, at most one round. Returns the number of turns played."""
+        bots = self._bots_by_game.get(game_id)
+        game_state = self.state_manager.get_game_state(game_id)
+        if not bots or not game_state:
+            return 0
+
+        turns_played = 0
+        while game_state.current_turn_uid in bots and turns_played < len(game_state.player_states):
+            if self.state_manager.game_states.get(game_id) is not game_state:
+                # The game was handed to another process between two turns
+                break
+            await self.play_turn(game_id, game_state.current_turn_uid)
+            await state_update(game_state)
+            turns_played += 1
+
+        return turns_played
+
+
+@lru_cache(maxsize=1)
+def get_bot_manager() -> BotManager:
+    return BotManager()
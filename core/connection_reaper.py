@@ -0,0 +1,105 @@
+import asyncio
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+
+from config.config import IDLE_TIMEOUT_SECONDS, REAPER_INTERVAL_SECONDS, ABANDONED_GAME_TIMEOUT_SECONDS
+
+from core.event_handlers import handle_disconnected_players, end_game
+from core.state_manager import get_state_manager
+from core.websocket_service import get_websocket_service
+
+from utils.logger import get_logger
+from utils.metrics import get_metrics
+
+
+log = get_logger("connection_reaper")
+
+
+class ConnectionReaper:
+    """Periodically evicts connections that are closed or have been idle for too long.
+
+    Half-open connections are closed by the websocket keepalive pings, this catches the ones whose
+    handler never got to clean up, and clients that keep the socket open without ever sending anything.
+    Every evicted connection is unregistered in one pass and each affected game gets a single state update.
+    Games left without any connected player or spectator for abandoned_timeout are ended.
+    """
+
+    _unattended_since: Dict[str, float]
+    """Maps game_id to the monotonic time the game was first seen without connections"""
+
+    def __init__(
+        self,
+        interval: float = REAPER_INTERVAL_SECONDS,
+        idle_timeout: float = IDLE_TIMEOUT_SECONDS,
+        abandoned_timeout: float = ABANDONED_GAME_TIMEOUT_SECONDS
+    ):
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.abandoned_timeout = abandoned_timeout
+        self._unattended_since = {}
+        self._task: Optional[asyncio.Task] = None
+        self.websocket_service = get_websocket_service()
+        self.state_manager = get_state_manager()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            log.info(f"Connection reaper running every {self.interval:g}s, idle timeout {self.idle_timeout:g}s")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reap()
+                await self.end_abandoned_games()
+            except Exception as e:
+                log.error(f"Error reaping connections: {e}")
+
+    async def reap(self) -> int:
+        """Evict closed and idle connections, returns the number evicted."""
+        closed, idle = self.websocket_service.get_stale_connections(self.idle_timeout)
+        if not closed and not idle:
+            return 0
+
+        loop = asyncio.get_running_loop()
+        for ws in idle:
+            # The close handshake runs in the background, the connection is evicted either way
+            loop.create_task(ws.close(code=1001, reason="Idle timeout"))
+
+        metrics = get_metrics()
+        metrics.incr("connections.reaped_closed", len(closed))
+        metrics.incr("connections.reaped_idle", len(idle))
+        log.info(f"Reaping {len(closed)} closed and {len(idle)} idle connections")
+
+        await handle_disconnected_players(self.websocket_service.unregister_websockets(closed + idle))
+        return len(closed) + len(idle)
+
+    async def end_abandoned_games(self) -> int:
+        """End the games that had no connected player or spectator for abandoned_timeout, returns the number ended."""
+        now = time.monotonic()
+        unattended = {
+            game_id for game_id in self.state_manager.game_states
+            if not self.websocket_service.get_websockets_by_game(game_id) and not self.websocket_service.get_spectators(game_id)
+        }
+        self._unattended_since = {game_id: self._unattended_since.get(game_id, now) for game_id in unattended}
+
+        abandoned = [game_id for game_id, since in self._unattended_since.items() if now - since >= self.abandoned_timeout]
+        for game_id in abandoned:
+            del self._unattended_since[game_id]
+            await end_game(game_id)
+
+        if abandoned:
+            get_metrics().incr("games.ended_abandoned", len(abandoned))
+            log.info(f"Ended {len(abandoned)} abandoned games")
+        return len(abandoned)
+
+
+@lru_cache(maxsize=1)
+def get_connection_reaper() -> ConnectionReaper:
+    return ConnectionReaper()
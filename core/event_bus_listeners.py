@@ -2,13 +2,11 @@ from core.state_manager import get_state_manager
 from core.websocket_service import get_websocket_service
 from core.wsp_helpers import ShowDialog
 
-from models.wsp_schemas import WSPEvent
-from models.events import PlayerMoved, PlayerRollDice, PurchasedProperty, PayedRent
+from models.events import PlayerMoved, PlayerRollDice, PurchasedProperty, PassedOnProperty, PayedRent, TurnTimedOut
 from models.commands import MovePlayer, BuyProperty, ModifyFunds, EndTurn
 from models.board_models import PropertySpace, ActionSpace
 
 from utils.event_bus import get_event_bus
-from utils.wsp_utils import send_wsp_event
 from utils.logger import get_logger
 
 
@@ -24,14 +22,16 @@ async def handle_payed_rent(event: PayedRent):
         ModifyFunds(
             game_id=event.game_id,
             user_id=event.user_id,
+            version=event.version,
             money_dollars=-event.rent_dollars
         ),
         ModifyFunds(
             game_id=event.game_id,
             user_id=event.opponent_id,
+            version=event.version,
             money_dollars=event.rent_dollars
         ),
-        EndTurn(**event.ids)
+        EndTurn(game_id=event.game_id, user_id=event.user_id, version=event.version)
     ]
 
 
@@ -40,13 +40,26 @@ async def handle_buy_property(event: PurchasedProperty):
     # Logic for buying a property
     return [
         BuyProperty(
-            **event.ids,
-            space=event.space
+            game_id=event.game_id,
+            user_id=event.user_id,
+            version=event.version,
+            space_index=event.space_index
         ),
-        EndTurn(**event.ids)
+        EndTurn(game_id=event.game_id, user_id=event.user_id, version=event.version)
     ]
 
 
+@event_bus.on(PassedOnProperty)
+async def handle_passed_on_property(event: PassedOnProperty):
+    return EndTurn(game_id=event.game_id, user_id=event.user_id, version=event.version)
+
+
+@event_bus.on(TurnTimedOut)
+async def handle_turn_timed_out(event: TurnTimedOut):
+    log.info(f"Turn of {event.user_id} timed out in game {event.game_id}")
+    return EndTurn(game_id=event.game_id, user_id=event.user_id)
+
+
 @event_bus.on(PlayerMoved)
 async def check_if_passed_boot(event: PlayerMoved):
     if event.old_position >= event.new_position:
@@ -59,17 +72,16 @@ async def check_if_passed_boot(event: PlayerMoved):
 
 @event_bus.on(PlayerMoved)
 async def handle_property_landing(event: PlayerMoved):
-    if not isinstance(event.space, PropertySpace):
-        return
-
     game_state = state_manager.get_game_state(event.game_id)
-    user_state = state_manager.get_user_state(event.user_id)
     landed_space = game_state.game_board[event.new_position]
-    ws = websocket_service.get_websocket_by_user(user_state.user_id)
+    if not isinstance(landed_space, PropertySpace):
+        return
 
-    show_dialog = ShowDialog(ws)
+    user_state = state_manager.get_user_state(event.game_id, event.user_id)
+    show_dialog = ShowDialog(game_id=event.game_id, user_id=event.user_id)
+    owner_id = game_state.owner_of(event.new_position)
 
-    if not landed_space.owned_by:
+    if not owner_id:
         # Unowned space
         log.info(f"User landed on unowned property: {landed_space.name}")
         if user_state.money_dollars >= landed_space.purchase_price:
@@ -84,7 +96,7 @@ async def handle_property_landing(event: PlayerMoved):
             )
         return
 
-    if landed_space.owned_by == user_state.user_id:
+    if owner_id == user_state.user_id:
         # Self-owned space
         log.info(f"User landed on their own property: {landed_space.name}")
         await show_dialog.alert(
@@ -93,12 +105,12 @@ async def handle_property_landing(event: PlayerMoved):
         )
         return EndTurn(game_id=event.game_id, user_id=event.user_id)
     
-    rent = 100  # Hard-coded value
+    rent = state_manager.get_rent(event.game_id, landed_space.space_index)
 
     # Opponent-owned space
     log.info(f"User landed on their opponent's property: {landed_space.name}")
     await show_dialog.pay_rent(
-        message=f"Your opponent owns this property. You must pay ${rent} (hard-coded placeholder value) in rent.",
+        message=f"Your opponent owns this property. You must pay ${rent} in rent.",
         space=landed_space,
         rent_amount=rent
     )
@@ -106,43 +118,35 @@ async def handle_property_landing(event: PlayerMoved):
 
 @event_bus.on(PlayerMoved)
 async def handle_action_landing(event: PlayerMoved):
-    if not isinstance(event.space, ActionSpace):
-        return
-
     game_state = state_manager.get_game_state(event.game_id)
-    user_state = state_manager.get_user_state(event.user_id)
     landed_space = game_state.game_board[event.new_position]
-    ws = websocket_service.get_websocket_by_user(user_state.user_id)
-    
+    if not isinstance(landed_space, ActionSpace):
+        return
+
     log.info(f"User landed on action space: {landed_space.name}")
-    await send_wsp_event(ws, WSPEvent(
-        event="showDialog",
-        data={
-            "space": landed_space.model_dump(),
-            "promptType": "actionSpace",
-            "message": f"You must perform {landed_space.action}"
-        }
-    ))
+    await ShowDialog(game_id=event.game_id, user_id=event.user_id).action_space(
+        message=f"You must perform {landed_space.action}",
+        space=landed_space
+    )
 
-    return EndTurn(**event.ids)
+    return EndTurn(game_id=event.game_id, user_id=event.user_id)
 
 
 @event_bus.on(PlayerRollDice)
 async def update_player_position(event: PlayerRollDice):
-    
-    user_state = state_manager.get_user_state(event.user_id)
+    # No side effects, so it can be re-run when the move conflicts with a concurrent change to the game
+    user_state = state_manager.get_user_state(event.game_id, event.user_id)
     game_state = state_manager.get_game_state(event.game_id)
 
     if not user_state:
         raise ValueError(f"Unable to update player position for user state which does not exist. User ID: {event.user_id}")
 
-    new_position = (user_state.position + event.dice_roll) % 40
-    new_space = game_state.game_board[new_position]
+    new_position = (user_state.position + event.dice_roll) % len(game_state.game_board)
 
     return MovePlayer(
         game_id=event.game_id,
         user_id=event.user_id,
+        version=game_state.version if event.version is None else event.version,
         old_position=user_state.position,
-        new_position=new_position,
-        space=new_space
+        new_position=new_position
     )
@@ -1,18 +1,35 @@
+import asyncio
 import random
-from typing import Dict
+from functools import partial
+from typing import Dict, Set
 from websockets.asyncio.server import ServerConnection
 
 from app import event_handler_registry, state_manager
 
+from config.board_loader import get_board_registry
+from config.config import ADMIN_TOKEN, BOT_TAKEOVER_ON_DISCONNECT, DEFAULT_BOARD_VARIANT, SUCCESSOR_URL
+
+from core.bot_players import get_bot_manager
+from core.game_migration import get_game_migrator, migrate_event
+from core.inbound_dispatcher import get_inbound_dispatcher
+from core.matchmaking import get_matchmaker
+from core.memory_accounting import game_report, subsystem_report, get_heap_profiler
 from core.state_manager import get_state_manager
 from core.websocket_service import get_websocket_service
-from core.wsp_helpers import state_update, send_wsp_event
-
-from models.wsp_schemas import WSPEvent
-from models.events import PlayerRollDice, SessionInit, PurchasedProperty, PayedRent
-from models.board_models import PropertySpace
-
-from utils.logger import get_logger
+from core.replay_buffer import get_replay_buffers
+from core.spectator_service import get_spectator_broadcaster
+from core.turn_deadlines import get_turn_deadlines
+from core.wsp_helpers import state_update, send_state, send_wsp_event, deliver, batched_outbound, board_definition_event, subscribe_game, unsubscribe_game
+
+from models.wsp_schemas import WSPEvent, ClientCapabilities
+from models.events import GameEvent, PlayerRollDice, SessionInit, PurchasedProperty, PassedOnProperty, PayedRent, TurnTimedOut
+from models.board_models import Board, PropertySpace
+from models.game_state import GameState
+
+from utils.backplane import GameOwner, get_backplane
+from utils.logger import get_logger, log_context, get_log_levels, set_log_level, set_game_log_level, set_sample_rate
+from utils.metrics import get_metrics
+from utils.wsp_codec import available_encodings, negotiate_encoding, negotiated_compression
 from utils.event_bus import DefaultPhase, get_event_bus
 
 
@@ -20,28 +37,324 @@ log = get_logger("event_handlers")
 event_bus = get_event_bus()
 state_manager = get_state_manager()
 websocket_service = get_websocket_service()
+bot_manager = get_bot_manager()
+replay_buffers = get_replay_buffers()
+spectator_broadcaster = get_spectator_broadcaster()
+game_migrator = get_game_migrator()
+turn_deadlines = get_turn_deadlines()
+matchmaker = get_matchmaker()
+inbound_dispatcher = get_inbound_dispatcher()
+
+DEFAULT_ACTIONS = {
+    TurnTimedOut: "endTurn",
+    PassedOnProperty: "passProperty",
+    PayedRent: "payRent"
+}
+"""Name sent to clients for each default a deadline can apply"""
 
 
 async def process_and_update(game_id: str):
-    await event_bus.process_all_phases()
+    async with batched_outbound():
+        await event_bus.process_all_phases(game_id)
+        game_state = state_manager.get_game_state(game_id)
+        await state_update(game_state)
+        await bot_manager.play_turns(game_id)
+    schedule_turn_deadline(game_id)
+
+
+def schedule_turn_deadline(game_id: str) -> None:
+    """Start the turn timeout of whoever holds the turn once a processing cycle has settled."""
     game_state = state_manager.get_game_state(game_id)
-    await state_update(game_state)
+    if game_state:
+        turn_deadlines.ensure_turn_deadline(game_state, bot_manager.get_bots(game_id))
+
+
+@turn_deadlines.on_expired
+async def handle_expired_deadline(game_id: str, user_id: str, default_event: GameEvent) -> None:
+    """Apply the default for a player who let their turn or dialog time out, in order with the game's inbound events."""
+    await inbound_dispatcher.dispatch(game_id, partial(apply_expired_default, game_id, user_id, default_event))
+
+
+async def apply_expired_default(game_id: str, user_id: str, default_event: GameEvent) -> None:
+    """Apply the default of an expired deadline, as if the player had sent it themselves."""
+    if not state_manager.is_players_turn(game_id, user_id):
+        return
+
+    async with batched_outbound():
+        ws = websocket_service.get_websocket(game_id, user_id)
+        if ws:
+            event = WSPEvent(
+                event="deadlineExpired",
+                data={
+                    "userId": user_id,
+                    "defaultAction": DEFAULT_ACTIONS.get(type(default_event))
+                }
+            )
+            event.seq = replay_buffers.get(game_id).record(event, user_id)
+            await deliver(ws, event)
+
+        await event_bus.publish(DefaultPhase.INPUT, default_event)
+        await process_and_update(game_id)
+
+
+def is_admin(data: Dict | None) -> bool:
+    """Whether the request carries the admin token. Admin events are disabled when no token is configured."""
+    return bool(ADMIN_TOKEN) and bool(data) and data.get("adminToken") == ADMIN_TOKEN
+
+
+def client_version(data: Dict | None) -> int | None:
+    """The game version the client decided on, echoed from the last stateUpdate it received. None if it sent none."""
+    version = data.get("version") if data else None
+    return version if isinstance(version, int) and not isinstance(version, bool) else None
+
+
+def stale_state_error(user_id: str) -> WSPEvent:
+    """Answer to a decision made on a state the game has since moved on from."""
+    return WSPEvent(
+        event="error",
+        data={"message": "The game changed since your last state update.", "errorValue": user_id},
+        error="staleState"
+    )
+
+
+def check_dialog_answer(game_id: str, user_id: str, prompt_type: str, version: int | None) -> WSPEvent | None:
+    """Close the player's open dialog for their answer, or return the error to answer them with.
+
+    A stale answer leaves the dialog open, the player can answer again on the current state.
+    """
+    if not state_manager.is_players_turn(game_id, user_id):
+        return no_pending_dialog_error(user_id)
+    if version is not None and version != state_manager.get_game_state(game_id).version:
+        return stale_state_error(user_id)
+    if not turn_deadlines.answer_dialog(game_id, user_id, prompt_type):
+        return no_pending_dialog_error(user_id)
+    return None
+
+
+def no_pending_dialog_error(user_id: str) -> WSPEvent:
+    """Answer to a dialog that isn't open, e.g. one that arrived after its deadline applied the default."""
+    return WSPEvent(
+        event="error",
+        data={"message": "There is no dialog awaiting your answer.", "errorValue": user_id},
+        error="noPendingDialog"
+    )
+
+
+def game_full_error(game_id: str) -> WSPEvent:
+    return WSPEvent(
+        event="error",
+        data={"message": f"Game {game_id} has no free seat.", "errorValue": game_id},
+        error="gameFull"
+    )
+
+
+def take_seat_for_direct_join(game_state: GameState, user_id: str) -> bool:
+    """Take a seat for a player joining a matchmade game without quickJoin, False if it is full.
+
+    Players already in the game rejoin their own seat, and games that weren't matchmade aren't seat counted.
+    """
+    if user_id in game_state.player_states or not matchmaker.is_matchmade(game_state.game_id):
+        return True
+    return matchmaker.take_seat(game_state.game_id)
+
+
+def admin_required_error() -> WSPEvent:
+    return WSPEvent(
+        event="error",
+        data={"message": "This event requires a valid admin token.", "errorValue": None},
+        error="unauthorized"
+    )
+
+
+async def find_game(game_id: str) -> GameState | None:
+    """The game's state, adopting it first if a draining process handed it to this one."""
+    game_state = state_manager.get_game_state(game_id)
+    if not game_state and game_id:
+        game_state = await game_migrator.adopt(game_id)
+    return game_state
+
+
+def hosted_elsewhere(game_id: str, owner: GameOwner) -> WSPEvent:
+    """Answer to a client joining a game another process hosts, sending it there if the host advertised its address."""
+    get_metrics().incr("games.hosted_elsewhere")
+    if owner.url:
+        return migrate_event(game_id, owner.url)
+    return WSPEvent(
+        event="error",
+        data={"message": f"Game {game_id} is hosted by another server.", "errorValue": game_id},
+        error="hostedElsewhere"
+    )
+
+
+async def claim_game(game_id: str) -> WSPEvent | None:
+    """Host the game in this process, or return the answer for a client of a game another process hosts.
+
+    Players of one game must all reach the same process, each process would otherwise play its own copy of the game.
+    """
+    backplane = get_backplane()
+    try:
+        owner = await backplane.claim_game(game_id)
+    except ConnectionError as e:
+        log.error(f"Can't claim game, the backplane is unavailable: {e}", extra=log_context(game_id=game_id))
+        return WSPEvent(
+            event="error",
+            data={"message": "Games can't be joined right now, try again shortly.", "errorValue": game_id},
+            error="unavailable"
+        )
+    if owner.origin_id != backplane.origin_id:
+        return hosted_elsewhere(game_id, owner)
+    return None
+
+
+async def negotiate_capabilities(ws: ServerConnection, data: Dict, board: Board) -> None:
+    """Record the protocol features the client opted into, sending it the game's static board if its cached copy is stale."""
+    capabilities = ClientCapabilities(
+        batch_frames=bool(data.get("batchFrames")),
+        encoding=negotiate_encoding(data.get("encodings"))
+    )
+
+    if "encodings" in data:
+        # Sent as JSON, the client switches to the agreed encoding once it has read it
+        await send_wsp_event(ws, WSPEvent(
+            event="capabilities",
+            data={
+                "encoding": capabilities.encoding,
+                "encodings": available_encodings(),
+                "compression": negotiated_compression(ws)
+            }
+        ))
+
+    if "boardHash" in data:
+        if data.get("boardHash") != board.hash:
+            await send_wsp_event(ws, board_definition_event(board), capabilities.encoding)
+        capabilities.board_hash = board.hash
+
+    websocket_service.set_capabilities(ws, capabilities)
+
+
+async def catch_up(ws: ServerConnection, game_state: GameState, user_id: str, last_seq: int) -> None:
+    """Send a reconnecting client the events it missed since last_seq."""
+    missed = replay_buffers.get(game_state.game_id).missed_since(last_seq, user_id)
+
+    if missed is None:
+        log.info(f"Events since {last_seq} are no longer buffered, sending {user_id} a full snapshot", extra=log_context(game_id=game_state.game_id, user_id=user_id))
+        await send_state(ws, game_state)
+        return
+
+    missed_events, missed_state_update = missed
+    log.info(f"Replaying {len(missed_events)} missed events to {user_id}", extra=log_context(game_id=game_state.game_id, user_id=user_id))
+    async with batched_outbound():
+        for missed_event in missed_events:
+            await deliver(ws, missed_event)
+        if missed_state_update:
+            await send_state(ws, game_state)
+
+
+async def handle_disconnected_players(disconnected_users: Dict[str, Set[str]]) -> None:
+    """Hand the seats of disconnected players to bots (or free them), in order with each game's inbound events."""
+    await asyncio.gather(*(
+        inbound_dispatcher.dispatch(gid, partial(hand_over_seats, gid, uids))
+        for gid, uids in disconnected_users.items() if gid
+    ))
+
+
+async def hand_over_seats(game_id: str, user_ids: Set[str]) -> None:
+    """Hand the seats of a game's disconnected players to bots (or free them), with one state update."""
+    game_state = state_manager.get_game_state(game_id=game_id)
+    if not game_state:
+        # E.g. a game id the client made up or was redirected from, it may still have a subscription
+        await unsubscribe_game(game_id)
+        return
+    for uid in user_ids:
+        if BOT_TAKEOVER_ON_DISCONNECT:
+            bot_manager.take_over(game_id=game_id, user_id=uid)
+        else:
+            state_manager.remove_player(game_id=game_id, user_id=uid)
+            matchmaker.release_seat(game_id)
+    async with batched_outbound():
+        await state_update(game_state)
+        await bot_manager.play_turns(game_id)
+    schedule_turn_deadline(game_id)
+    await unsubscribe_game(game_id)
+
+
+async def end_game(game_id: str) -> None:
+    """Forget a game nobody plays or watches anymore, its state is recycled for a later game."""
+    log.info("Ending game", extra=log_context(game_id=game_id))
+    turn_deadlines.remove_game(game_id)
+    matchmaker.remove_game(game_id)
+    bot_manager.remove_game(game_id)
+    replay_buffers.remove(game_id)
+    state_manager.remove_state(game_id)
+    await unsubscribe_game(game_id)
+    await get_backplane().release_game(game_id)
 
 
 @event_handler_registry.event("connectionClosed")
 async def handle_connection_closed(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> None:
-    disconnected_users = websocket_service.get_closed_websockets()
-    for gid, uids in disconnected_users.items():
-        for uid in uids:
-            state_manager.remove_player(game_id=gid, user_id=uid)
-        game_state = state_manager.get_game_state(game_id=gid)
-        await state_update(game_state)
+    if ws is not None:
+        closed = [ws]
+    else:
+        closed, _ = websocket_service.get_stale_connections(idle_timeout=float("inf"))
+    await handle_disconnected_players(websocket_service.unregister_websockets(closed))
+
+
+@event_handler_registry.event("addBot")
+async def handle_add_bot(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent | None:
+    """Fill an empty seat in the game with a bot player. Only the game's players, or an admin, may add bots.
+
+    Expected Data:
+    ```
+    {
+        "onlineGameId": "string",
+        "adminToken": "string"  // Optional, lets an admin add bots to any game
+    }
+    ```
+    """
+
+    game_state = state_manager.get_game_state(game_id)
+    if not game_state:
+        return WSPEvent(
+            event="error",
+            data={"message": f"Cannot add a bot to game {game_id} which does not exist.", "errorValue": game_id},
+            error="invalidGame"
+        )
+
+    if user_id not in game_state.player_states and not is_admin(data):
+        return WSPEvent(
+            event="error",
+            data={"message": "Only players of the game can add bots to it.", "errorValue": user_id},
+            error="notInGame"
+        )
+
+    if not matchmaker.take_seat(game_id):
+        return game_full_error(game_id)
+
+    bot_manager.add_bot(game_id)
+    async with batched_outbound():
+        await state_update(state_manager.get_game_state(game_id))
+        await bot_manager.play_turns(game_id)
+    schedule_turn_deadline(game_id)
 
 
 @event_handler_registry.event("payRentConfirmation")
 async def handle_pay_rent(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent | None:
+    """Answer the payRent dialog.
 
-    user_state = state_manager.get_user_state(user_id)
+    Expected Data:
+    ```
+    {
+        "version": int  // Optional, version of the last stateUpdate received, stale answers are rejected
+    }
+    ```
+    """
+
+    version = client_version(data)
+    error = check_dialog_answer(game_id, user_id, "payRent", version)
+    if error:
+        return error
+
+    user_state = state_manager.get_user_state(game_id, user_id)
     game_state = state_manager.get_game_state(game_id)
 
     space = game_state.game_board[user_state.position]
@@ -49,14 +362,15 @@ async def handle_pay_rent(ws: ServerConnection, game_id: str, user_id: str, data
     if not isinstance(space, PropertySpace):
         raise ValueError("Attempted to pay rent on a non-property space.")
 
-    opponent_id = space.owned_by
-    rent = 100
+    opponent_id = game_state.owner_of(space.space_index)
+    rent = state_manager.get_rent(game_id, space.space_index)
 
     await event_bus.publish(
         DefaultPhase.INPUT,
         PayedRent(
             game_id=game_id,
             user_id=user_id,
+            version=version,
             opponent_id=opponent_id,
             rent_dollars=rent
         )
@@ -67,8 +381,22 @@ async def handle_pay_rent(ws: ServerConnection, game_id: str, user_id: str, data
 
 @event_handler_registry.event("buyProperty")
 async def handle_buy_property(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent | None:
-    
-    user_state = state_manager.get_user_state(user_id)
+    """Answer the askPurchaseProperty dialog.
+
+    Expected Data:
+    ```
+    {
+        "version": int  // Optional, version of the last stateUpdate received, stale answers are rejected
+    }
+    ```
+    """
+
+    version = client_version(data)
+    error = check_dialog_answer(game_id, user_id, "askPurchaseProperty", version)
+    if error:
+        return error
+
+    user_state = state_manager.get_user_state(game_id, user_id)
     game_state = state_manager.get_game_state(game_id)
     space = game_state.game_board[user_state.position]
 
@@ -80,7 +408,8 @@ async def handle_buy_property(ws: ServerConnection, game_id: str, user_id: str,
         PurchasedProperty(
             game_id=game_id,
             user_id=user_id,
-            space=space
+            version=version,
+            space_index=space.space_index
         )
     )
 
@@ -90,26 +419,286 @@ async def handle_buy_property(ws: ServerConnection, game_id: str, user_id: str,
 @event_handler_registry.event("onlineGame")
 async def handle_online_game(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent | None:
 
+    game_state = await find_game(game_id)
+    if not game_state:
+        if game_migrator.draining:
+            return migrate_event(game_id, game_migrator.successor_url)
+        error = await claim_game(game_id)
+        if error:
+            return error
+    elif not take_seat_for_direct_join(game_state, user_id):
+        return game_full_error(game_id)
+    # Only games hosted here are subscribed, so a made up game id leaves no subscription behind
+    await subscribe_game(game_id)
+
     # Create state if it doesn't exist
     state_manager.initialize_session(user_id=user_id, game_id=game_id)
     game_state = state_manager.get_game_state(game_id)
 
     # Update the board so that the player occupies the Boot Sequence space
-    game_state.game_board[0].add_occupant(user_id)
-    state_manager.set_state(game_id, game_state)
+    state_manager.place_on_board(game_id=game_id, user_id=user_id)
 
     await state_update(game_state)
 
 
+@event_handler_registry.event("spectateGame")
+async def handle_spectate_game(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent | None:
+    """Subscribe the connection to a game as a read-only spectator.
+
+    Expected Data:
+    ```
+    {
+        "onlineGameId": "string",
+        "boardHash": "string",   // Optional, as in sessionInit
+        "encodings": ["string"]  // Optional, as in sessionInit
+    }
+    ```
+
+    Spectators receive `spectatorSnapshot` events at the spectator tick rate while the game changes.
+    Any other event they send afterwards is rejected.
+    """
+
+    game_state = await find_game(game_id)
+    if not game_state:
+        backplane = get_backplane()
+        try:
+            owner = await backplane.game_owner(game_id)
+        except ConnectionError:
+            owner = None
+        if owner is not None and owner.origin_id != backplane.origin_id:
+            return hosted_elsewhere(game_id, owner)
+        return WSPEvent(
+            event="error",
+            data={"message": f"Cannot spectate game {game_id} which does not exist.", "errorValue": game_id},
+            error="invalidGame"
+        )
+
+    await negotiate_capabilities(ws, data, game_state.board)
+    websocket_service.register_spectator(ws, game_id)
+    spectator_broadcaster.send_snapshot(game_id, {ws})
+
+
+@event_handler_registry.event("getMetrics", out_of_band=True)
+async def handle_get_metrics(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent:
+    """Report the server's instrumentation counters and gauges. Requires the admin token.
+
+    Expected Data:
+    ```
+    {
+        "adminToken": "string"
+    }
+    ```
+    """
+
+    if not is_admin(data):
+        return admin_required_error()
+
+    metrics = get_metrics()
+    return WSPEvent(
+        event="metrics",
+        data={
+            **metrics.snapshot(),
+            "serializationCacheHitRate": metrics.hit_rate("serialization_cache"),
+            "duplicateRequestRate": metrics.hit_rate("request_dedup"),
+            "inboundAvgWaitMs": metrics.get("inbound.wait_us") / 1000 / max(metrics.get("inbound.dispatched"), 1),
+            "commandConflictRate": metrics.get("event_bus.conflicts") / max(metrics.get("event_bus.batches"), 1)
+        }
+    )
+
+
+@event_handler_registry.event("getMemoryReport", out_of_band=True)
+async def handle_get_memory_report(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent:
+    """Report approximate retained bytes per subsystem, and per player of one game or of every game. Requires the admin token.
+
+    Expected Data:
+    ```
+    {
+        "adminToken": "string",
+        "onlineGameId": "string"  // Optional, only report this game
+    }
+    ```
+
+    Sizes are computed on request by walking the objects, nothing is tracked in between.
+    """
+
+    if not is_admin(data):
+        return admin_required_error()
+
+    if game_id:
+        game_state = state_manager.get_game_state(game_id)
+        if not game_state:
+            return WSPEvent(
+                event="error",
+                data={"message": f"Game {game_id} does not exist.", "errorValue": game_id},
+                error="invalidGame"
+            )
+        games = {game_id: game_report(game_state)}
+    else:
+        games = {gid: game_report(game_state) for gid, game_state in state_manager.game_states.items()}
+
+    return WSPEvent(
+        event="memoryReport",
+        data={
+            "subsystems": subsystem_report(),
+            "games": games
+        }
+    )
+
+
+@event_handler_registry.event("heapProfile", out_of_band=True)
+async def handle_heap_profile(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent:
+    """Control tracemalloc heap tracing at runtime. Requires the admin token.
+
+    Expected Data:
+    ```
+    {
+        "adminToken": "string",
+        "action": "start" | "top" | "diff" | "stop",
+        "limit": int,   // Optional, number of allocation sites reported by top and diff. 20 by default
+        "frames": int   // Optional, stack frames kept per allocation when starting. 1 by default
+    }
+    ```
+
+    `diff` reports the sites that grew the most since `start` or the previous `diff`.
+    Tracing slows every allocation down, stop it once done.
+    """
+
+    if not is_admin(data):
+        return admin_required_error()
+
+    profiler = get_heap_profiler()
+    action = data.get("action")
+    limit = int(data.get("limit") or 20)
+
+    try:
+        if action == "start":
+            profiler.start(frames=int(data.get("frames") or 1))
+            sites = []
+        elif action == "top":
+            sites = profiler.top(limit)
+        elif action == "diff":
+            sites = profiler.diff(limit)
+        elif action == "stop":
+            profiler.stop()
+            sites = []
+        else:
+            raise ValueError(f"Unknown heap profile action: {action}")
+    except ValueError as e:
+        return WSPEvent(
+            event="error",
+            data={"message": str(e), "errorValue": action},
+            error="invalidHeapProfileAction"
+        )
+
+    return WSPEvent(
+        event="heapProfile",
+        data={
+            "action": action,
+            "tracing": profiler.running,
+            "sites": sites
+        }
+    )
+
+
+@event_handler_registry.event("drain", out_of_band=True)
+async def handle_drain(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent:
+    """Stop creating games and hand every live game to a successor process. Requires the admin token.
+
+    Expected Data:
+    ```
+    {
+        "adminToken": "string",
+        "successorUrl": "string"  // Optional, where clients reconnect. MAS_SUCCESSOR_URL, or their current address, otherwise
+    }
+    ```
+
+    Each game's clients receive a `migrate` event and are disconnected, they resume with sessionInit (and lastSeq)
+    on the successor, which adopts the game from the shared handoff directory. Responds with a `drained` event.
+    The drain itself isn't queued behind any game, each game is handed off from its own queue once the events
+    queued before it have run.
+    """
+
+    if not is_admin(data):
+        return admin_required_error()
+
+    migrated = await game_migrator.drain(successor_url=data.get("successorUrl") or SUCCESSOR_URL)
+    return WSPEvent(
+        event="drained",
+        data={
+            "games": migrated,
+            "remaining": len(state_manager.game_states)
+        }
+    )
+
+
+@event_handler_registry.event("setLogLevel", out_of_band=True)
+async def handle_set_log_level(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent:
+    """Change log levels or sample rates at runtime. Requires the admin token.
+
+    Expected Data:
+    ```
+    {
+        "adminToken": "string",
+        "level": "DEBUG",               // Optional, new level name. null with gameId returns the game to the normal levels
+        "logger": "string",             // Optional, only change this logger. All loggers otherwise
+        "gameId": "string",             // Optional, only change the level of records about this game, across all loggers
+        "sampleRates": {"string": 0.1}  // Optional, share of records kept per sampling category
+    }
+    ```
+
+    Responds with the resulting levels and sample rates in a `logLevels` event.
+    """
+
+    if not is_admin(data):
+        return admin_required_error()
+
+    try:
+        if data.get("gameId"):
+            set_game_log_level(data["gameId"], data.get("level"))
+        elif data.get("level"):
+            set_log_level(data["level"], name=data.get("logger"))
+        for category, rate in (data.get("sampleRates") or {}).items():
+            set_sample_rate(category, float(rate))
+    except (ValueError, TypeError) as e:
+        return WSPEvent(
+            event="error",
+            data={"message": str(e), "errorValue": data.get("level") or data.get("logger")},
+            error="invalidLogLevel"
+        )
+
+    return WSPEvent(event="logLevels", data=get_log_levels())
+
+
 @event_handler_registry.event("monopolyMove")
 async def handle_monopoly_move(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent | None:
-    """Handle a Monopoly game move event."""
+    """Handle a Monopoly game move event.
+
+    Expected Data:
+    ```
+    {
+        "version": int  // Optional, version of the last stateUpdate received, stale moves are rejected
+    }
+    ```
+    """
+
+    if not state_manager.is_players_turn(game_id, user_id):
+        return WSPEvent(
+            event="error",
+            data={"message": "It is not your turn.", "errorValue": user_id},
+            error="outOfTurn"
+        )
 
+    version = client_version(data)
+    if version is not None and version != state_manager.get_game_state(game_id).version:
+        return stale_state_error(user_id)
+
+    turn_deadlines.cancel(game_id, user_id)
     await event_bus.publish(
         DefaultPhase.INPUT,
         PlayerRollDice(
             game_id=game_id,
             user_id=user_id,
+            version=version,
             dice_roll=(random.randint(1, 6) + random.randint(1, 6))
         )
     )
@@ -126,13 +715,78 @@ async def handle_session_init(ws: ServerConnection, game_id: str, user_id: str,
     {
         "sessionId": "string",
         "userId": "string",
-        "onlineGameId": "string"
+        "onlineGameId": "string",
+        "boardHash": "string",  // Optional, hash of the cached static board. Empty if none is cached yet
+        "lastSeq": int,         // Optional, seq of the last event received before reconnecting
+        "batchFrames": bool,    // Optional, accept events of one processing cycle batched into a single frame
+        "encodings": ["string"],  // Optional, binary encodings the client accepts by preference, e.g. ["msgpack", "cbor", "json"]
+        "boardVariant": "string"  // Optional, board variant of the game if it has to be created. The default variant otherwise
     }
     ```
+
+    Clients that send `boardHash` receive the static board once (only when their hash is stale)
+    and dynamic-only board payloads afterwards.
+
+    Clients that set `batchFrames` receive every event of a processing cycle as one `batch` event,
+    with the individual events in `data.events`.
+
+    Clients that send `encodings` first receive a JSON `capabilities` event with the encoding the server picked
+    and the permessage-deflate parameters agreed on in the handshake. Events are sent to them as binary frames
+    in that encoding from then on, and binary frames they send are decoded with it. Text frames are always JSON.
+
+    Reconnecting players that send `lastSeq` only receive the events they missed, or a snapshot of the
+    current state if those have fallen out of the game's replay buffer. Nothing is broadcast to the others.
+
+    Games handed off by a draining process are adopted on their first sessionInit here. While this process
+    is draining itself, clients asking for a game it doesn't have receive a `migrate` event instead.
+
+    A game is hosted by a single process. Clients asking another process for it receive a `migrate` event
+    to the host's address, or a `hostedElsewhere` error if the host advertised none.
+
+    Players joining a matchmade game directly take one of its free seats, they receive a `gameFull` error if it has none.
+    """
+
+    return await start_session(ws, game_id, user_id, data)
+
+
+async def start_session(ws: ServerConnection, game_id: str, user_id: str, data: Dict, seated: bool = False) -> WSPEvent | None:
+    """Initialize or restore the player's session, as described in handle_session_init.
+
+    `seated` skips taking a seat in a matchmade game, for players the matchmaker placed there.
     """
 
     session_id = data.get("sessionId")
 
+    game_state = await find_game(game_id)
+    if game_state:
+        board = game_state.board
+        if not seated and not take_seat_for_direct_join(game_state, user_id):
+            return game_full_error(game_id)
+    elif game_migrator.draining:
+        # New games start on the successor
+        return migrate_event(game_id, game_migrator.successor_url)
+    else:
+        board_variant = data.get("boardVariant") or DEFAULT_BOARD_VARIANT
+        board = get_board_registry().get(board_variant)
+        if board is None:
+            return WSPEvent(
+                event="error",
+                data={"message": f"Board variant {board_variant} does not exist.", "errorValue": board_variant},
+                error="invalidBoardVariant"
+            )
+        error = await claim_game(game_id)
+        if error:
+            return error
+    await subscribe_game(game_id)
+
+    await negotiate_capabilities(ws, data, board)
+
+    last_seq = data.get("lastSeq")
+    if last_seq is not None and game_state and user_id in game_state.player_states:
+        bot_manager.release(game_id=game_id, user_id=user_id)
+        await catch_up(ws, game_state, user_id, last_seq)
+        return
+
     await event_bus.publish(
         DefaultPhase.INPUT,
         SessionInit(
@@ -142,5 +796,69 @@ async def handle_session_init(ws: ServerConnection, game_id: str, user_id: str,
         )
     )
 
-    state_manager.initialize_session(user_id=user_id, game_id=game_id)
+    state_manager.initialize_session(user_id=user_id, game_id=game_id, board=board)
+    bot_manager.release(game_id=game_id, user_id=user_id)
     await process_and_update(game_id)
+
+
+@event_handler_registry.event("quickJoin")
+async def handle_quick_join(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent | None:
+    """Seat the player in an open game of the board variant, or in a new one, and initialize their session there.
+
+    Expected Data:
+    ```
+    {
+        "userId": "string",
+        "sessionId": "string",
+        "boardVariant": "string",  // Optional, the default variant otherwise
+        "boardHash": "string",     // Optional, as in sessionInit
+        "batchFrames": bool,       // Optional, as in sessionInit
+        "encodings": ["string"]    // Optional, as in sessionInit
+    }
+    ```
+
+    The player first receives a `matched` event with the `onlineGameId` to use from then on,
+    then everything a sessionInit for that game sends, once the game's events queued before it have run.
+    """
+
+    if game_migrator.draining:
+        return migrate_event(None, game_migrator.successor_url)
+
+    board_variant = data.get("boardVariant") or DEFAULT_BOARD_VARIANT
+    if get_board_registry().get(board_variant) is None:
+        return WSPEvent(
+            event="error",
+            data={"message": f"Board variant {board_variant} does not exist.", "errorValue": board_variant},
+            error="invalidBoardVariant"
+        )
+
+    matched_game_id = await matchmaker.join(user_id, board_variant)
+    if matched_game_id is None:
+        # The connection closed while waiting for a seat
+        return None
+    error = await claim_game(matched_game_id)
+    if error:
+        return error
+    websocket_service.register_websocket(ws=ws, user_id=user_id, game_id=matched_game_id)
+    await subscribe_game(matched_game_id)
+    await send_wsp_event(ws, WSPEvent(
+        event="matched",
+        data={
+            "onlineGameId": matched_game_id,
+            "boardVariant": board_variant
+        }
+    ))
+
+    async def init_matched_session() -> None:
+        response = await start_session(
+            ws=ws,
+            game_id=matched_game_id,
+            user_id=user_id,
+            data={**data, "onlineGameId": matched_game_id},
+            seated=True
+        )
+        if response:
+            await deliver(ws, response)
+
+    # quickJoin itself runs in the connection's queue, the session joins the game in the game's own queue
+    await inbound_dispatcher.dispatch(matched_game_id, init_matched_session)
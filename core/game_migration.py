@@ -0,0 +1,325 @@
+import asyncio
+import dataclasses
+import json
+import os
+import time
+import zlib
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import websockets
+
+from config.board_loader import get_board_registry
+from config.config import HANDOFF_DIR, SUCCESSOR_URL
+
+from core.bot_players import get_bot_manager
+from core.inbound_dispatcher import get_inbound_dispatcher
+from core.matchmaking import get_matchmaker
+from core.replay_buffer import get_replay_buffers
+from core.state_manager import get_state_manager
+from core.turn_deadlines import get_turn_deadlines
+from core.websocket_service import get_websocket_service
+from core.wsp_helpers import batched_outbound, unsubscribe_game
+
+from models import events
+from models.game_state import GameState, UserState
+from models.wsp_schemas import WSPEvent
+
+from utils.backplane import get_backplane
+from utils.event_bus import get_event_bus
+from utils.logger import get_logger, log_context
+from utils.metrics import get_metrics
+
+
+log = get_logger("game_migration")
+
+SNAPSHOT_VERSION = 1
+
+_EVENT_TYPES = {
+    cls.__name__: cls for cls in vars(events).values()
+    if isinstance(cls, type) and issubclass(cls, events.GameEvent)
+}
+"""Event classes that may be pending in a snapshot, by name"""
+
+
+def _encode_event(event: events.GameEvent) -> List:
+    return [type(event).__name__, dataclasses.asdict(event)]
+
+
+def _decode_event(encoded: List) -> events.GameEvent:
+    event_type, fields = encoded
+    return _EVENT_TYPES[event_type](**fields)
+
+
+def snapshot_game(
+    game_state: GameState,
+    pending: List,
+    bots: List[str],
+    last_seq: int,
+    deadline: Optional[Tuple] = None,
+    dialogs: Optional[Dict[str, str]] = None
+) -> bytes:
+    """Encode everything needed to continue a game in another process as compressed JSON.
+
+    The board is referenced by variant and hash, the successor must have the same board file.
+    `pending` holds the (phase, event) pairs queued on the EventBus for the game, `deadline` the
+    (user_id, default_event, seconds left) of the player the game is waiting on and `dialogs` the
+    prompt types of the dialogs players have yet to answer.
+    """
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "gameId": game_state.game_id,
+        "boardVariant": game_state.board.variant,
+        "boardHash": game_state.board.hash,
+        "players": [user_state.model_dump() for user_state in game_state.player_states.values()],
+        "owners": list(game_state.owners.items()),
+        "hotels": list(game_state.hotels.items()),
+        "occupants": list(game_state.occupants.items()),
+        "turnOrder": game_state.turn_order,
+        "currentTurn": game_state.current_turn,
+        "currentTurnUid": game_state.current_turn_uid,
+        "stateVersion": game_state.version,  # Pending events carry the version they were decided on
+        "bots": bots,
+        "lastSeq": last_seq,
+        "pendingEvents": [[phase.name, *_encode_event(event)] for phase, event in pending],
+        "deadline": [deadline[0], _encode_event(deadline[1]), deadline[2]] if deadline else None,
+        "dialogs": dialogs or {},
+        "migratedAt": time.time()
+    }
+    return zlib.compress(json.dumps(snapshot, separators=(",", ":")).encode())
+
+
+def decode_snapshot(data: bytes) -> Dict:
+    try:
+        snapshot = json.loads(zlib.decompress(data))
+    except (zlib.error, ValueError) as e:
+        raise ValueError(f"Unreadable game snapshot: {e}")
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported game snapshot version {snapshot.get('version')}.")
+    return snapshot
+
+
+def restore_game(snapshot: Dict) -> GameState:
+    """Rebuild a GameState from a decoded snapshot, on the same board definition it was created with."""
+    board = get_board_registry().get_by_hash(snapshot["boardHash"])
+    if board is None:
+        raise ValueError(
+            f"Board {snapshot['boardVariant']} ({snapshot['boardHash']}) of game {snapshot['gameId']} is not loaded in this process."
+        )
+
+    return GameState(
+        game_id=snapshot["gameId"],
+        player_states={player["user_id"]: UserState(**player) for player in snapshot["players"]},
+        board=board,
+        owners={space_index: user_id for space_index, user_id in snapshot["owners"]},
+        hotels={space_index: hotels for space_index, hotels in snapshot["hotels"]},
+        occupants={space_index: list(user_ids) for space_index, user_ids in snapshot["occupants"]},
+        turn_order=snapshot["turnOrder"],
+        current_turn=snapshot["currentTurn"],
+        current_turn_uid=snapshot["currentTurnUid"],
+        version=snapshot.get("stateVersion", 0)
+    )
+
+
+def migrate_event(game_id: Optional[str], successor_url: Optional[str], last_seq: Optional[int] = None) -> WSPEvent:
+    """Tells a client to reconnect to the successor (or its current address) and resume the game with sessionInit.
+
+    Without a game_id the client was quick joining, and sends its quickJoin again after reconnecting.
+    """
+    return WSPEvent(
+        event="migrate",
+        data={
+            "onlineGameId": game_id,
+            "reconnectUrl": successor_url,
+            "lastSeq": last_seq
+        }
+    )
+
+
+class GameMigrator:
+    """Hands live games from a draining process to its successor.
+
+    Draining stops this process from creating games and moves every game through the handoff directory from
+    the game's inbound queue: once the events queued before the drain have run, the game is snapshotted, written,
+    removed from this process and its clients are told to reconnect, all without yielding to other handlers. The successor adopts a game the first
+    time one of its clients arrives, so a game is only unavailable between its snapshot and the first reconnect.
+    Both processes must share the handoff directory and have the game's board file. The draining process stops
+    hosting the game on the backplane once it is handed off, and the successor claims it when adopting.
+
+    Use case:
+    ```
+    migrator = get_game_migrator()
+    await migrator.drain(successor_url="wss://next.example.com")   # old process
+    game_state = await migrator.adopt(game_id)                      # successor
+    ```
+    """
+
+    def __init__(self, handoff_dir: Path = HANDOFF_DIR):
+        self.handoff_dir = handoff_dir
+        self.draining = False
+        self.successor_url: Optional[str] = None
+        self.state_manager = get_state_manager()
+        self.websocket_service = get_websocket_service()
+        self.bot_manager = get_bot_manager()
+        self.replay_buffers = get_replay_buffers()
+        self.turn_deadlines = get_turn_deadlines()
+        self.matchmaker = get_matchmaker()
+        self.inbound_dispatcher = get_inbound_dispatcher()
+
+    def _handoff_path(self, game_id: str) -> Path:
+        return self.handoff_dir / f"{quote(game_id, safe='')}.snapshot"
+
+    async def drain(self, successor_url: Optional[str] = SUCCESSOR_URL) -> int:
+        """Stop creating games and hand every live game to the successor. Returns the number of games handed off."""
+        self.draining = True
+        self.successor_url = successor_url
+        log.info(f"Draining {len(self.state_manager.game_states)} games, clients reconnect to {successor_url or 'their current address'}")
+
+        migrated = []
+        started_at = time.perf_counter()
+
+        async def migrate(game_id: str) -> None:
+            try:
+                if await self.migrate_game(game_id):
+                    migrated.append(game_id)
+            except (OSError, ValueError) as e:
+                log.error(f"Failed to hand off game {game_id}, it stays in this process: {e}", extra=log_context(game_id=game_id))
+
+        # Each game is handed off from its own queue, after the events queued before the drain
+        await asyncio.gather(*(
+            self.inbound_dispatcher.dispatch(game_id, partial(migrate, game_id)) for game_id in list(self.state_manager.game_states)
+        ))
+
+        get_metrics().set_gauge("migration.drain_ms", (time.perf_counter() - started_at) * 1000)
+        log.info(f"Drained {len(migrated)} games in {(time.perf_counter() - started_at) * 1000:.1f}ms")
+        return len(migrated)
+
+    async def migrate_game(self, game_id: str) -> bool:
+        """Snapshot a game into the handoff directory, forget it and send its clients to the successor.
+
+        Runs as a job of the game's inbound queue, so no processing cycle of the game is in progress.
+        """
+        event_bus = get_event_bus()
+
+        # Nothing below yields until the game is gone, no handler can change it after it has been snapshotted
+        started_at = time.perf_counter()
+        game_state = self.state_manager.get_game_state(game_id)
+        if game_state is None:
+            return False
+
+        pending = event_bus.take_pending(game_id)
+        buffer = self.replay_buffers.peek(game_id)
+        last_seq = buffer.last_seq if buffer else 0
+        deadline = self.turn_deadlines.pending(game_id)
+        dialogs = self.turn_deadlines.open_dialogs(game_id)
+        data = snapshot_game(game_state, pending, sorted(self.bot_manager.get_bots(game_id)), last_seq, deadline, dialogs)
+
+        path = self._handoff_path(game_id)
+        temp_path = path.with_suffix(".tmp")
+        try:
+            self.handoff_dir.mkdir(parents=True, exist_ok=True)
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+        except OSError:
+            # The game stays here, with the events it had queued
+            for phase, event in pending:
+                await event_bus.publish(phase, event)
+            raise
+
+        self.state_manager.remove_state(game_id)
+        self.turn_deadlines.remove_game(game_id)
+        self.matchmaker.remove_game(game_id)
+        self.bot_manager.remove_game(game_id)
+        self.replay_buffers.remove(game_id)
+
+        connections = list((self.websocket_service.get_websockets_by_game(game_id) or {}).values())
+        connections.extend(self.websocket_service.get_spectators(game_id))
+        self.websocket_service.unregister_websockets(connections)
+
+        metrics = get_metrics()
+        metrics.incr("migration.games_out")
+        metrics.set_gauge("migration.snapshot_bytes", len(data))
+        metrics.set_gauge("migration.snapshot_ms", (time.perf_counter() - started_at) * 1000)
+
+        frame = migrate_event(game_id, self.successor_url, last_seq).model_dump_json()
+        for ws in connections:
+            try:
+                await ws.send(frame)
+                await ws.close(code=1012, reason="Game moved to another server")
+            except websockets.ConnectionClosed:
+                pass
+        await unsubscribe_game(game_id)
+        await get_backplane().release_game(game_id)
+        log.info(f"Handed off game with {len(connections)} connections, {len(data)} bytes", extra=log_context(game_id=game_id))
+        return True
+
+    async def adopt(self, game_id: str) -> GameState | None:
+        """Take over a game handed off by a draining process, if there is one for game_id."""
+        if self.draining:
+            # Never take back a game this process is handing off
+            return None
+        path = self._handoff_path(game_id)
+        claimed_path = path.with_suffix(f".{os.getpid()}.claimed")
+        try:
+            # Renaming claims the snapshot, so only one successor process adopts the game
+            os.rename(path, claimed_path)
+        except FileNotFoundError:
+            return None
+
+        backplane = get_backplane()
+        try:
+            owner = await backplane.claim_game(game_id)
+        except ConnectionError as e:
+            log.error(f"Can't claim handed off game, leaving it for a later sessionInit: {e}", extra=log_context(game_id=game_id))
+            os.replace(claimed_path, path)
+            return None
+        if owner.origin_id != backplane.origin_id:
+            log.error("Handed off game is hosted by another process, keeping its snapshot for inspection", extra=log_context(game_id=game_id))
+            os.replace(claimed_path, path.with_suffix(".failed"))
+            return None
+
+        started_at = time.perf_counter()
+        try:
+            snapshot = decode_snapshot(claimed_path.read_bytes())
+            game_state = restore_game(snapshot)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            log.error(f"Failed to adopt handed off game, keeping its snapshot for inspection: {e}", extra=log_context(game_id=game_id))
+            os.replace(claimed_path, path.with_suffix(".failed"))
+            await backplane.release_game(game_id)
+            return None
+        claimed_path.unlink()
+
+        self.state_manager.add_state(game_state)
+        for bot_id in snapshot["bots"]:
+            self.bot_manager.take_over(game_id=game_id, user_id=bot_id)
+        self.replay_buffers.get(game_id).last_seq = snapshot["lastSeq"]
+
+        event_bus = get_event_bus()
+        for phase_name, *encoded in snapshot["pendingEvents"]:
+            await event_bus.publish(event_bus.Phase[phase_name], _decode_event(encoded))
+        if snapshot["pendingEvents"]:
+            # Like any processing cycle, what the listeners send goes out once the cycle settled
+            async with batched_outbound():
+                await event_bus.process_all_phases(game_id)
+        self.turn_deadlines.restore_dialogs(game_id, snapshot.get("dialogs", {}))
+        if snapshot.get("deadline"):
+            # The player keeps the time they had left, the handoff itself doesn't count against them
+            deadline_user_id, default_event, seconds_left = snapshot["deadline"]
+            self.turn_deadlines.arm(game_id, deadline_user_id, _decode_event(default_event), seconds_left)
+
+        metrics = get_metrics()
+        metrics.incr("migration.games_in")
+        metrics.set_gauge("migration.restore_ms", (time.perf_counter() - started_at) * 1000)
+        metrics.set_gauge("migration.downtime_ms", (time.time() - snapshot["migratedAt"]) * 1000)
+        log.info(
+            f"Adopted game {(time.time() - snapshot['migratedAt']) * 1000:.1f}ms after it was handed off",
+            extra=log_context(game_id=game_id)
+        )
+        return game_state
+
+
+@lru_cache(maxsize=1)
+def get_game_migrator() -> GameMigrator:
+    return GameMigrator()
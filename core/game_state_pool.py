@@ -0,0 +1,149 @@
+import asyncio
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from config.board_loader import get_board_registry
+from config.config import GAME_STATE_POOL_SIZE, GAME_STATE_POOL_REFILL_INTERVAL_SECONDS, GAME_STATE_POOL_REFILL_BATCH
+
+from models.board_models import Board
+from models.game_state import GameState
+
+from utils.event_bus import get_event_bus
+from utils.logger import get_logger
+from utils.metrics import get_metrics
+
+
+log = get_logger("game_state_pool")
+
+
+class GameStatePool:
+    """Idle, pre-built game states per board, so creating a game is a pop instead of building a model.
+
+    Pooled states are empty and have the serialized fragments of every space already built, so the first
+    state update of a new game only encodes what its players changed. Ended games are reset and returned
+    to the pool. A background task tops the pool up while the EventBus is idle, a few states at a time,
+    for the default board and every board games were recently created on.
+
+    Use case:
+    ```
+    pool = get_game_state_pool()
+    pool.start()
+    game_state = pool.acquire("game-1", board)
+    pool.release(game_state)
+    ```
+    """
+
+    _idle: Dict[str, List[GameState]]
+    """Maps board hash to its idle states"""
+    _boards: Dict[str, Board]
+    """Maps board hash to the boards the pool keeps states for"""
+    _cold: List[GameState]
+    """Recycled states whose fragments still have to be rebuilt, some may have been acquired again since"""
+
+    def __init__(
+        self,
+        size: int = GAME_STATE_POOL_SIZE,
+        refill_interval: float = GAME_STATE_POOL_REFILL_INTERVAL_SECONDS,
+        refill_batch: int = GAME_STATE_POOL_REFILL_BATCH
+    ):
+        self.size = size
+        self.refill_interval = refill_interval
+        self.refill_batch = refill_batch
+        self._idle = {}
+        self._boards = {}
+        self._cold = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return sum(len(states) for states in self._idle.values())
+
+    def idle_states(self) -> List[GameState]:
+        return [game_state for states in self._idle.values() for game_state in states]
+
+    def acquire(self, game_id: str, board: Board) -> GameState:
+        """An empty state for a new game on the board, built on the spot only if the pool ran dry."""
+        self._boards.setdefault(board.hash, board)
+        idle = self._idle.get(board.hash)
+        metrics = get_metrics()
+        if idle:
+            game_state = idle.pop()
+            game_state.game_id = game_id
+            metrics.incr("game_state_pool.hits")
+            return game_state
+
+        metrics.incr("game_state_pool.misses")
+        return GameState(game_id=game_id, player_states={}, board=board)
+
+    def release(self, game_state: GameState) -> None:
+        """Reset an ended game's state and keep it for a later game on the same board.
+
+        The caller must hold no other reference to the state, it will belong to another game.
+        """
+        board = game_state.board
+        idle = self._idle.setdefault(board.hash, [])
+        if len(idle) >= self.size or get_board_registry().get_by_hash(board.hash) is not board:
+            # Full, or the board was reloaded since and new games won't use it anymore
+            return
+        game_state.reset()
+        idle.append(game_state)
+        self._cold.append(game_state)
+        get_metrics().incr("game_state_pool.recycled")
+
+    def _current_boards(self) -> List[Board]:
+        """The default board and the boards games were created on that are still loaded, dropping pools of the others."""
+        registry = get_board_registry()
+        default_board = registry.get()
+        if default_board is not None:
+            self._boards.setdefault(default_board.hash, default_board)
+        for board_hash, board in list(self._boards.items()):
+            if registry.get_by_hash(board_hash) is not board:
+                del self._boards[board_hash]
+                self._idle.pop(board_hash, None)
+        return list(self._boards.values())
+
+    def refill(self, limit: Optional[int] = None) -> int:
+        """Build or warm up to limit states (refill_batch by default), returns the number of states worked on."""
+        limit = self.refill_batch if limit is None else limit
+        worked = 0
+        while self._cold and worked < limit:
+            game_state = self._cold.pop()
+            if not game_state.game_id:
+                # Still idle, rebuild the fragments of the spaces its last game touched
+                game_state.warm()
+                worked += 1
+
+        for board in self._current_boards():
+            idle = self._idle.setdefault(board.hash, [])
+            while len(idle) < self.size and worked < limit:
+                game_state = GameState(game_id="", player_states={}, board=board)
+                game_state.warm()
+                idle.insert(0, game_state)
+                worked += 1
+        get_metrics().set_gauge("game_state_pool.idle", len(self))
+        return worked
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            log.info(f"Game state pool keeping {self.size} idle states per board")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        event_bus = get_event_bus()
+        while True:
+            await asyncio.sleep(self.refill_interval)
+            try:
+                # Keep topping up while there is work left, yielding to handlers between batches
+                while event_bus.idle and self.refill():
+                    await asyncio.sleep(0)
+            except Exception as e:
+                log.error(f"Error refilling the game state pool: {e}")
+
+
+@lru_cache(maxsize=1)
+def get_game_state_pool() -> GameStatePool:
+    return GameStatePool()
@@ -0,0 +1,212 @@
+import asyncio
+import uuid
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config.board_loader import get_board_registry
+from config.config import SEATS_PER_GAME, MATCHMAKING_BATCH_INTERVAL_SECONDS
+
+from core.state_manager import get_state_manager
+
+from utils.logger import get_logger
+from utils.metrics import get_metrics
+
+
+log = get_logger("matchmaking")
+
+MATCHMADE_GAME_PREFIX = "match-"
+
+
+class Lobby:
+    """Open matchmade games of one board variant, bucketed by their number of free seats.
+
+    Each bucket keeps its games in the order they opened, so placing a player looks at a fixed number of
+    buckets and takes the oldest game of the fullest one: O(SEATS_PER_GAME) whatever the number of games.
+    """
+
+    _buckets: List[Dict[str, None]]
+    """Games with 1..seats_per_game free seats at that index, the dicts are used as ordered sets"""
+    _free_seats: Dict[str, int]
+    """Maps every matchmade game, including full ones, to its number of free seats"""
+
+    def __init__(self, seats_per_game: int = SEATS_PER_GAME):
+        self.seats_per_game = seats_per_game
+        self._buckets = [{} for _ in range(seats_per_game + 1)]
+        self._free_seats = {}
+
+    def __len__(self) -> int:
+        """Number of games with at least one free seat."""
+        return sum(len(bucket) for bucket in self._buckets[1:])
+
+    def set_free_seats(self, game_id: str, free_seats: int) -> None:
+        previous = self._free_seats.get(game_id)
+        if previous is not None:
+            self._buckets[previous].pop(game_id, None)
+        self._free_seats[game_id] = free_seats
+        if free_seats > 0:
+            self._buckets[free_seats][game_id] = None
+
+    def free_seats(self, game_id: str) -> Optional[int]:
+        return self._free_seats.get(game_id)
+
+    def remove(self, game_id: str) -> None:
+        free_seats = self._free_seats.pop(game_id, None)
+        if free_seats is not None:
+            self._buckets[free_seats].pop(game_id, None)
+
+    def fullest_open_game(self) -> Tuple[str, int] | None:
+        """The oldest game among those with the fewest free seats, and its free seats."""
+        for free_seats in range(1, self.seats_per_game + 1):
+            bucket = self._buckets[free_seats]
+            if bucket:
+                return next(iter(bucket)), free_seats
+        return None
+
+
+class Matchmaker:
+    """Places quick-joining players into open games of their board variant, creating games as needed.
+
+    Joins are queued and placed in batches, one per MATCHMAKING_BATCH_INTERVAL_SECONDS, so a burst of joins
+    fills the open games first and then creates the games for everyone left over in one go.
+
+    Use case:
+    ```
+    matchmaker = get_matchmaker()
+    game_id = await matchmaker.join(user_id, "default")
+    ```
+    """
+
+    _lobbies: Dict[str, Lobby]
+    """Maps board variant to its lobby"""
+    _variants: Dict[str, str]
+    """Maps matchmade game_id to its board variant"""
+    _pending: Dict[str, List[Tuple[str, asyncio.Future]]]
+    """Maps board variant to the (user_id, future) of joins waiting for the next batch"""
+
+    def __init__(self, seats_per_game: int = SEATS_PER_GAME, batch_interval: float = MATCHMAKING_BATCH_INTERVAL_SECONDS):
+        self.seats_per_game = seats_per_game
+        self.batch_interval = batch_interval
+        self._lobbies = {}
+        self._variants = {}
+        self._pending = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.state_manager = get_state_manager()
+
+    def _lobby(self, variant: str) -> Lobby:
+        lobby = self._lobbies.get(variant)
+        if lobby is None:
+            lobby = self._lobbies[variant] = Lobby(self.seats_per_game)
+        return lobby
+
+    async def join(self, user_id: str, variant: str) -> Optional[str]:
+        """Wait for the next batch and return the game_id of the seat the player was given, None if cancelled."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(variant, []).append((user_id, future))
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_interval, self.flush)
+        return await future
+
+    def cancel(self, user_id: str) -> None:
+        """Withdraw the player's waiting joins, e.g. when their connection closed. Their join returns None."""
+        for joins in self._pending.values():
+            for user_join in [user_join for user_join in joins if user_join[0] == user_id]:
+                joins.remove(user_join)
+                if not user_join[1].done():
+                    user_join[1].set_result(None)
+
+    def flush(self) -> None:
+        """Place every queued join."""
+        self._flush_handle = None
+        pending, self._pending = self._pending, {}
+        for variant, joins in pending.items():
+            try:
+                self._place(variant, joins)
+            except Exception as e:
+                log.error(f"Failed to place {len(joins)} players in board variant {variant}: {e}")
+                for _, future in joins:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _place(self, variant: str, joins: List[Tuple[str, asyncio.Future]]) -> None:
+        lobby = self._lobby(variant)
+        metrics = get_metrics()
+        created = 0
+        position = 0
+        # Joins whose caller stopped waiting, e.g. a cancelled task, don't take a seat
+        joins = [(user_id, future) for user_id, future in joins if not future.done()]
+
+        while position < len(joins):
+            open_game = lobby.fullest_open_game()
+            if open_game is None:
+                break
+            game_id, free_seats = open_game
+            seated = min(free_seats, len(joins) - position)
+            lobby.set_free_seats(game_id, free_seats - seated)
+            for _, future in joins[position:position + seated]:
+                future.set_result(game_id)
+            position += seated
+
+        if position < len(joins):
+            board = get_board_registry().get(variant)
+            if board is None:
+                raise ValueError(f"Board variant {variant} does not exist.")
+            # Everyone left over gets new games, created together
+            while position < len(joins):
+                game_id = f"{MATCHMADE_GAME_PREFIX}{uuid.uuid4().hex[:12]}"
+                self.state_manager.create_state(game_id, board)
+                self._variants[game_id] = variant
+                seated = min(self.seats_per_game, len(joins) - position)
+                lobby.set_free_seats(game_id, self.seats_per_game - seated)
+                for _, future in joins[position:position + seated]:
+                    future.set_result(game_id)
+                position += seated
+                created += 1
+
+        metrics.incr("matchmaking.joins", len(joins))
+        metrics.incr("matchmaking.games_created", created)
+        metrics.set_gauge(f"matchmaking.open_games.{variant}", len(lobby))
+
+    def is_matchmade(self, game_id: str) -> bool:
+        return game_id in self._variants
+
+    def take_seat(self, game_id: str) -> bool:
+        """Take a free seat of a game outside quickJoin, e.g. for a bot or a direct join. Returns False if the game is full.
+
+        Only matchmade games have a seat count here, other games are full at seats_per_game players.
+        """
+        variant = self._variants.get(game_id)
+        if variant is None:
+            game_state = self.state_manager.get_game_state(game_id)
+            return game_state is None or len(game_state.player_states) < self.seats_per_game
+        lobby = self._lobby(variant)
+        free_seats = lobby.free_seats(game_id)
+        if not free_seats:
+            return False
+        lobby.set_free_seats(game_id, free_seats - 1)
+        return True
+
+    def release_seat(self, game_id: str) -> None:
+        """Reopen a seat of a matchmade game, e.g. when its player left without a bot taking over."""
+        variant = self._variants.get(game_id)
+        if variant is None:
+            return
+        lobby = self._lobby(variant)
+        free_seats = lobby.free_seats(game_id)
+        if free_seats is not None and free_seats < self.seats_per_game:
+            lobby.set_free_seats(game_id, free_seats + 1)
+
+    def remove_game(self, game_id: str) -> None:
+        """Stop placing players in a game, e.g. once it has been handed to another process."""
+        variant = self._variants.pop(game_id, None)
+        if variant is not None:
+            self._lobby(variant).remove(game_id)
+
+    def open_games(self) -> Dict[str, int]:
+        """Number of games with free seats per board variant."""
+        return {variant: len(lobby) for variant, lobby in self._lobbies.items()}
+
+
+@lru_cache(maxsize=1)
+def get_matchmaker() -> Matchmaker:
+    return Matchmaker()
@@ -0,0 +1,195 @@
+import sys
+import tracemalloc
+from collections import deque
+from dataclasses import fields, is_dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+from pydantic import BaseModel
+from websockets.asyncio.server import ServerConnection
+
+from core.game_state_pool import get_game_state_pool
+from core.replay_buffer import get_replay_buffers
+from core.state_manager import get_state_manager
+from core.websocket_service import get_websocket_service
+
+from models.board_models import Board
+from models.game_state import GameState
+
+from utils.event_bus import get_event_bus
+from utils.logger import get_logger
+from utils.request_dedup import get_request_deduplicator
+
+
+log = get_logger("memory_accounting")
+
+_OPAQUE_TYPES = (type, ServerConnection, Board, type(sys), type(len), type(lambda: None))
+"""Never followed when sizing: shared definitions, connections (sized by their write buffers) and code"""
+
+
+def retained_size(*roots: object, seen: Optional[Set[int]] = None) -> int:
+    """Approximate bytes reachable from the roots, counting each object once across calls that share `seen`.
+
+    Follows containers, pydantic models (fields and private attributes), slotted dataclasses and instance
+    dicts. Board definitions are shared between games and are reported separately, so they aren't followed.
+    """
+    if seen is None:
+        seen = set()
+    total = 0
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _OPAQUE_TYPES):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        elif isinstance(obj, BaseModel):
+            stack.append(obj.__dict__)
+            if obj.__pydantic_private__:
+                stack.append(obj.__pydantic_private__)
+        elif is_dataclass(obj):
+            stack.extend(getattr(obj, field.name) for field in fields(obj))
+        elif hasattr(obj, "__dict__"):
+            stack.append(obj.__dict__)
+    return total
+
+
+def _write_buffer_size(connections: Iterable[ServerConnection]) -> int:
+    total = 0
+    for ws in connections:
+        transport = ws.transport
+        if transport is not None:
+            total += transport.get_write_buffer_size()
+    return total
+
+
+def game_report(game_state: GameState) -> Dict:
+    """Approximate retained bytes of one game, split into its players and what it holds besides them."""
+    state_manager = get_state_manager()
+    websocket_service = get_websocket_service()
+    seen: Set[int] = set()
+
+    players = {
+        user_id: retained_size(user_state, seen=seen)
+        for user_id, user_state in game_state.player_states.items()
+    }
+    board_state = retained_size(game_state.owners, game_state.hotels, game_state.occupants, seen=seen)
+    state = retained_size(game_state, seen=seen)
+    ownership_index = retained_size(state_manager.ownership_indexes.get(game_state.game_id), seen=seen)
+    replay_buffer = retained_size(get_replay_buffers().peek(game_state.game_id), seen=seen)
+    connections = list((websocket_service.get_websockets_by_game(game_state.game_id) or {}).values())
+    connections += list(websocket_service.get_spectators(game_state.game_id))
+    write_buffers = _write_buffer_size(connections)
+
+    return {
+        "totalBytes": sum(players.values()) + board_state + state + ownership_index + replay_buffer + write_buffers,
+        "players": players,
+        "boardStateBytes": board_state,
+        "gameStateBytes": state,
+        "ownershipIndexBytes": ownership_index,
+        "replayBufferBytes": replay_buffer,
+        "writeBufferBytes": write_buffers,
+        "boardVariant": game_state.board.variant
+    }
+
+
+def subsystem_report() -> Dict:
+    """Approximate retained bytes per subsystem, each shared object counted once in the first subsystem reaching it."""
+    state_manager = get_state_manager()
+    websocket_service = get_websocket_service()
+    seen: Set[int] = set()
+
+    boards = {}
+    for game_state in state_manager.game_states.values():
+        boards.setdefault(game_state.board.hash, game_state.board)
+
+    return {
+        "stateManagerBytes": retained_size(
+            state_manager.game_states, state_manager.user_states, state_manager.ownership_indexes, seen=seen
+        ),
+        "boardDefinitionBytes": sum(
+            retained_size(board.spaces, board.static_spaces, seen=seen) for board in boards.values()
+        ),
+        "boardDefinitions": len(boards),
+        "gameStatePoolBytes": retained_size(get_game_state_pool().idle_states(), seen=seen),
+        "replayBuffersBytes": retained_size(get_replay_buffers(), seen=seen),
+        "eventBusQueuesBytes": retained_size(get_event_bus().queues, seen=seen),
+        "requestDedupBytes": retained_size(get_request_deduplicator(), seen=seen),
+        "websocketServiceBytes": retained_size(websocket_service.__dict__, seen=seen),
+        "writeBuffersBytes": _write_buffer_size(websocket_service.get_connections()),
+        "games": len(state_manager.game_states),
+        "players": len(state_manager.user_games),
+        "seats": len(state_manager.user_states)
+    }
+
+
+class HeapProfiler:
+    """On-demand tracemalloc sessions. Nothing is traced, and nothing costs anything, until start() is called.
+
+    Use case:
+    ```
+    profiler = get_heap_profiler()
+    profiler.start()
+    ...
+    profiler.diff(limit=20)  # Allocation growth by source line since start, or since the previous diff
+    profiler.stop()
+    ```
+    """
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            log.info(f"Starting heap tracing with {frames} frames per allocation")
+            tracemalloc.start(frames)
+        self._baseline = self._snapshot()
+
+    def stop(self) -> None:
+        if tracemalloc.is_tracing():
+            log.info("Stopping heap tracing")
+            tracemalloc.stop()
+        self._baseline = None
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        # The profiler's own allocations would otherwise top every diff
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ))
+
+    def top(self, limit: int = 20) -> List[Dict]:
+        """Largest allocation sites currently traced."""
+        if not tracemalloc.is_tracing():
+            raise ValueError("Heap tracing is not running.")
+        return [
+            {"site": str(stat.traceback), "sizeBytes": stat.size, "count": stat.count}
+            for stat in self._snapshot().statistics("lineno")[:limit]
+        ]
+
+    def diff(self, limit: int = 20) -> List[Dict]:
+        """Allocation sites that grew the most since the previous snapshot, which becomes this one."""
+        if not tracemalloc.is_tracing() or self._baseline is None:
+            raise ValueError("Heap tracing is not running.")
+        snapshot = self._snapshot()
+        stats = snapshot.compare_to(self._baseline, "lineno")[:limit]
+        self._baseline = snapshot
+        return [
+            {"site": str(stat.traceback), "sizeDiffBytes": stat.size_diff, "sizeBytes": stat.size, "countDiff": stat.count_diff}
+            for stat in stats
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_heap_profiler() -> HeapProfiler:
+    return HeapProfiler()
@@ -0,0 +1,150 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.board_models import Board, BoardSpace, PropertySpace
+
+
+CLOUD_PROVIDER_GROUP = "cloud_provider"
+UTILITY_GROUP = "utility"
+
+HOTEL_RENT_MULTIPLIERS = (1, 5, 15, 45, 62, 78)
+"""Multiplier on a property's base rent, indexed by the number of hotels"""
+MONOPOLY_RENT_MULTIPLIER = 2
+"""Multiplier on base rent for a property without hotels when its owner holds the whole color group"""
+CLOUD_PROVIDER_RENTS = (25, 50, 100, 200)
+"""Railroad-style rent, indexed by the number of cloud providers the owner holds minus one"""
+UTILITY_RENTS = (28, 70)
+"""Utility rent (4x and 10x an average roll of 7), indexed by the number of utilities the owner holds minus one"""
+
+
+def color_group(space: PropertySpace) -> str:
+    """Group a property belongs to for rent purposes, its rent_group or otherwise its color.
+
+    Raises:
+        ValueError: If the property has neither.
+    """
+    group = space.rent_group or space.visual_properties.color
+    if not group:
+        raise ValueError(f"Property {space.space_id} has neither a rent_group nor a color")
+    return group
+
+
+class RentTable:
+    """Rent for every property of a board, precomputed so a lookup is a couple of list indexes."""
+
+    groups: List[Optional[str]]
+    """Rent group of each space index, None for non-property spaces"""
+    group_sizes: Dict[str, int]
+    """Number of properties in each rent group"""
+    street_rents: List[Tuple[int, ...]]
+    """Rent of each color property indexed by hotel count, empty for other spaces"""
+    group_rents: Dict[str, Tuple[int, ...]]
+    """Rent of railroad-style groups indexed by the number of group properties owned minus one"""
+
+    def __init__(self, board: Sequence[BoardSpace]):
+        self.groups = []
+        self.group_sizes = {}
+        self.street_rents = []
+        self.group_rents = {
+            CLOUD_PROVIDER_GROUP: CLOUD_PROVIDER_RENTS,
+            UTILITY_GROUP: UTILITY_RENTS
+        }
+
+        for space in board:
+            if not isinstance(space, PropertySpace):
+                self.groups.append(None)
+                self.street_rents.append(())
+                continue
+
+            group = color_group(space)
+            self.groups.append(group)
+            self.group_sizes[group] = self.group_sizes.get(group, 0) + 1
+
+            if group in self.group_rents:
+                self.street_rents.append(())
+            elif space.rent_prices:
+                self.street_rents.append(tuple(space.rent_prices))
+            else:
+                base_rent = max(space.purchase_price // 10, 1)
+                self.street_rents.append(tuple(base_rent * multiplier for multiplier in HOTEL_RENT_MULTIPLIERS))
+
+    def base_rent(self, space_index: int) -> int:
+        """Rent charged when the owner holds only this property of its group and no hotels."""
+        return self.rent(space_index, hotels=0, owned_in_group=1)
+
+    def rent(self, space_index: int, hotels: int, owned_in_group: int) -> int:
+        """Rent for landing on a property given its hotels and how many of its group the owner holds."""
+        group = self.groups[space_index]
+        if group is None or owned_in_group < 1:
+            return 0
+
+        group_rents = self.group_rents.get(group)
+        if group_rents:
+            return group_rents[min(owned_in_group, len(group_rents)) - 1]
+
+        rents = self.street_rents[space_index]
+        if hotels:
+            return rents[min(hotels, len(rents) - 1)]
+        if owned_in_group == self.group_sizes[group]:
+            return rents[0] * MONOPOLY_RENT_MULTIPLIER
+        return rents[0]
+
+
+class OwnershipIndex:
+    """Per-game index of who owns what, kept up to date as properties are bought and returned to the bank."""
+
+    owner_masks: Dict[str, int]
+    """Maps user_id to a bitset of the space indexes they own"""
+    group_counts: Dict[Tuple[str, str], int]
+    """Maps (user_id, group) to the number of properties of that group the user owns"""
+
+    def __init__(self, rent_table: RentTable):
+        self.rent_table = rent_table
+        self.owner_masks = {}
+        self.group_counts = {}
+
+    @classmethod
+    def from_owners(cls, rent_table: RentTable, owners: Dict[int, str]) -> "OwnershipIndex":
+        """Build an index from a game's owner of each space index."""
+        index = cls(rent_table)
+        for space_index, user_id in owners.items():
+            index.add(user_id, space_index)
+        return index
+
+    def add(self, user_id: str, space_index: int) -> None:
+        mask = self.owner_masks.get(user_id, 0)
+        if mask & (1 << space_index):
+            return
+        self.owner_masks[user_id] = mask | (1 << space_index)
+        key = (user_id, self.rent_table.groups[space_index])
+        self.group_counts[key] = self.group_counts.get(key, 0) + 1
+
+    def remove(self, user_id: str, space_index: int) -> None:
+        mask = self.owner_masks.get(user_id, 0)
+        if not mask & (1 << space_index):
+            return
+        self.owner_masks[user_id] = mask & ~(1 << space_index)
+        key = (user_id, self.rent_table.groups[space_index])
+        self.group_counts[key] -= 1
+
+    def owns(self, user_id: str, space_index: int) -> bool:
+        return bool(self.owner_masks.get(user_id, 0) & (1 << space_index))
+
+    def owned_in_group(self, user_id: str, group: str) -> int:
+        return self.group_counts.get((user_id, group), 0)
+
+    def has_monopoly(self, user_id: str, group: str) -> bool:
+        return self.owned_in_group(user_id, group) == self.rent_table.group_sizes.get(group)
+
+    def rent_for(self, space_index: int, owner_id: Optional[str], hotels: int = 0) -> int:
+        """Rent owed by a non-owner landing on the space, 0 if it is unowned."""
+        if not owner_id:
+            return 0
+        group = self.rent_table.groups[space_index]
+        return self.rent_table.rent(space_index, hotels, self.owned_in_group(owner_id, group))
+
+
+@lru_cache(maxsize=32)
+def get_rent_table(board: Board) -> RentTable:
+    """Rent table of a board, computed once per board definition."""
+    return RentTable(board.spaces)
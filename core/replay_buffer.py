@@ -0,0 +1,83 @@
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config.config import REPLAY_BUFFER_SIZE
+
+from models.wsp_schemas import WSPEvent
+
+
+STATE_UPDATE_MARKER = None
+"""Stored in place of state updates, which are snapshots and are replayed as the current state instead"""
+
+
+class ReplayBuffer:
+    """Bounded history of the outbound events of one game, numbered by sequence."""
+
+    events: Deque[Tuple[int, Optional[str], Optional[WSPEvent]]]
+    """(seq, recipient user_id or None for broadcasts, event or STATE_UPDATE_MARKER)"""
+
+    def __init__(self, maxlen: int = REPLAY_BUFFER_SIZE):
+        self.events = deque(maxlen=maxlen)
+        self.last_seq = 0
+
+    def record(self, event: Optional[WSPEvent], user_id: Optional[str] = None) -> int:
+        """Record an outbound event, returns its sequence number."""
+        self.last_seq += 1
+        self.events.append((self.last_seq, user_id, event))
+        return self.last_seq
+
+    def record_state_update(self) -> int:
+        return self.record(STATE_UPDATE_MARKER)
+
+    def missed_since(self, last_seq: int, user_id: str) -> Tuple[List[WSPEvent], bool] | None:
+        """Events addressed to the user after last_seq, and whether a state update was among them.
+
+        Returns None when some of the missed events have already fallen out of the buffer.
+        """
+        if last_seq >= self.last_seq:
+            return [], False
+
+        oldest_seq = self.events[0][0] if self.events else self.last_seq + 1
+        if last_seq + 1 < oldest_seq:
+            return None
+
+        missed_events = []
+        missed_state_update = False
+        for seq, recipient, event in reversed(self.events):
+            if seq <= last_seq:
+                break
+            if event is STATE_UPDATE_MARKER:
+                missed_state_update = True
+            elif recipient is None or recipient == user_id:
+                missed_events.append(event)
+
+        missed_events.reverse()
+        return missed_events, missed_state_update
+
+
+class ReplayBuffers:
+    """Holds the ReplayBuffer of every game."""
+
+    _buffers: Dict[str, ReplayBuffer]
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, game_id: str) -> ReplayBuffer:
+        buffer = self._buffers.get(game_id)
+        if buffer is None:
+            buffer = self._buffers[game_id] = ReplayBuffer()
+        return buffer
+
+    def peek(self, game_id: str) -> ReplayBuffer | None:
+        """The game's buffer if it has one, without creating it."""
+        return self._buffers.get(game_id)
+
+    def remove(self, game_id: str) -> None:
+        self._buffers.pop(game_id, None)
+
+
+@lru_cache(maxsize=1)
+def get_replay_buffers() -> ReplayBuffers:
+    return ReplayBuffers()
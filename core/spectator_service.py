@@ -0,0 +1,102 @@
+import asyncio
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from websockets.asyncio.server import ServerConnection, broadcast
+
+from config.config import SPECTATOR_TICK_RATE_HZ, SPECTATOR_MAX_WRITE_BUFFER
+
+from core.state_manager import get_state_manager
+from core.websocket_service import get_websocket_service
+
+from models.wsp_schemas import WSPEvent
+
+from utils.logger import get_logger
+from utils.metrics import get_metrics
+from utils.wsp_codec import encode_event
+
+
+log = get_logger("spectator_service")
+
+
+class SpectatorBroadcaster:
+    """Sends coalesced game snapshots to spectators at a fixed tick rate.
+
+    Games are only marked as changed on the player path, the encoding and sending happen on the
+    broadcaster's own task. Each snapshot is encoded once per payload variant and wire encoding and written
+    to every spectator without awaiting them, so spectators never hold up players.
+    """
+
+    _changed_games: Set[str]
+    """Games whose state changed since the last tick"""
+
+    def __init__(self, tick_rate_hz: float = SPECTATOR_TICK_RATE_HZ):
+        self.tick_interval = 1 / tick_rate_hz
+        self._changed_games = set()
+        self._task: Optional[asyncio.Task] = None
+        self.websocket_service = get_websocket_service()
+        self.state_manager = get_state_manager()
+
+    def mark_changed(self, game_id: str) -> None:
+        self._changed_games.add(game_id)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            log.info(f"Spectator broadcaster running at {1 / self.tick_interval:g} snapshots per second")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                log.error(f"Error broadcasting spectator snapshots: {e}")
+
+    def flush(self) -> None:
+        """Send one snapshot of every changed game to its spectators."""
+        changed_games, self._changed_games = self._changed_games, set()
+        for game_id in changed_games:
+            spectators = self.websocket_service.get_spectators(game_id)
+            if spectators:
+                self.send_snapshot(game_id, spectators)
+
+    def send_snapshot(self, game_id: str, spectators: Set[ServerConnection]) -> None:
+        game_state = self.state_manager.get_game_state(game_id)
+        if not game_state:
+            return
+
+        metrics = get_metrics()
+        board_hash = game_state.board.hash
+        events: Dict[bool, WSPEvent] = {}
+        recipients: Dict[Tuple[bool, str], List[ServerConnection]] = {}
+
+        for ws in spectators:
+            transport = ws.transport
+            if transport is not None and transport.get_write_buffer_size() > SPECTATOR_MAX_WRITE_BUFFER:
+                # The spectator still has older snapshots buffered, this one is superseded by the next tick anyway
+                metrics.incr("spectators.snapshots_skipped")
+                continue
+            capabilities = self.websocket_service.get_capabilities(ws)
+            recipients.setdefault((capabilities.board_hash == board_hash, capabilities.encoding), []).append(ws)
+
+        for (dynamic_only, encoding), connections in recipients.items():
+            if dynamic_only not in events:
+                events[dynamic_only] = WSPEvent(
+                    event="spectatorSnapshot",
+                    data={
+                        "state": game_state.to_dynamic_dict() if dynamic_only else game_state.to_dict()
+                    }
+                )
+            broadcast(connections, encode_event(events[dynamic_only], encoding))
+            metrics.incr("spectators.snapshots_sent", len(connections))
+
+
+@lru_cache(maxsize=1)
+def get_spectator_broadcaster() -> SpectatorBroadcaster:
+    return SpectatorBroadcaster()
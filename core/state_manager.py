@@ -1,34 +1,55 @@
 from functools import lru_cache
-from typing import Dict, Any, List, Optional
-from copy import deepcopy
+from typing import Dict, Any, List, Optional, Tuple
 
-from config.config import SESSION_PERSIST_PATH, template_game_board
+from config.board_loader import get_board
+from config.config import SESSION_PERSIST_PATH
+
+from core.game_state_pool import get_game_state_pool
+from core.rent_engine import OwnershipIndex, get_rent_table
 
 from models.game_state import UserState, GameState
+from models.board_models import Board, PropertySpace
 from models.commands import StateCommand, MovePlayer, BuyProperty, ModifyFunds, EndTurn
 
 from utils.session_manager import SessionManager
-from utils.logger import get_logger
+from utils.logger import get_logger, log_context, sampled
 
 
 log = get_logger("state_manager")
 
 
 class StateManager:
-    """Singleton class that manages user states and sessions."""
+    """Singleton class that manages user states and sessions.
+
+    A user has one UserState per game they play, so the same user can play several games at once.
+    """
+
+    user_states: Dict[Tuple[str, str], UserState]
+    """Maps (game_id, user_id) to the player's state in that game, the same object as in the game's player_states"""
+    user_games: Dict[str, Dict[str, None]]
+    """Maps user_id to the games they have a state in, the dicts are used as ordered sets"""
+
     def __init__(self):
         self.game_states: Dict[str, GameState] = {}
-        self.user_states: Dict[str, UserState] = {}
-        self.user_games: Dict[str, GameState] = {}
-        self.session_manager = SessionManager(
-            persist_path=str(SESSION_PERSIST_PATH),
-            log=get_logger("session_manager")
-        )
+        self.user_states = {}
+        self.user_games = {}
+        self.ownership_indexes: Dict[str, OwnershipIndex] = {}
+        self._session_manager: SessionManager | None = None
+
+    @property
+    def session_manager(self) -> SessionManager:
+        """SQLite session store, opened on first use."""
+        if self._session_manager is None:
+            self._session_manager = SessionManager(
+                persist_path=str(SESSION_PERSIST_PATH),
+                log=get_logger("session_manager")
+            )
+        return self._session_manager
 
-    def initialize_session(self, user_id: str, game_id: str) -> None:
+    def initialize_session(self, user_id: str, game_id: str, board: Optional[Board] = None) -> None:
         game_state = self.get_game_state(game_id)
         if not game_state:
-            game_state = self.create_state(game_id)
+            game_state = self.create_state(game_id, board)
         if user_id not in game_state.player_states:
             self.initialize_state({"game_id": game_id, "user_id": user_id, "money_dollars": 1500, "current_space_id": "boot_sequence"})
         self.add_player(game_id=game_id, user_id=user_id)
@@ -45,20 +66,27 @@ class StateManager:
             raise ValueError("Missing game id, or user state is included without user id.")
 
         if user_id and user_state:
-            self.user_states[user_id] = user_state
+            self._track_player(game_id, user_id, user_state)
         
         if game_state:
-            if user_id and user_state:
+            if user_id and user_state and game_state.player_states.get(user_id) is not user_state:
                 game_state.player_states[user_id] = user_state
+                game_state.mark_player_dirty(user_id)
             self.game_states[game_id] = game_state
             
     def apply(self, command: StateCommand):
-        log.info(f"Applying command {type(command).__name__}")
-
         user_id = command.user_id
         game_id = command.game_id
+        if sampled("state_manager.commands", game_id):
+            log.info(f"Applying command {type(command).__name__}", extra=log_context(game_id=game_id, user_id=user_id))
+
         game_state = self.game_states.get(game_id)
-        user_state = self.user_states.get(user_id)
+        user_state = self.user_states.get((game_id, user_id))
+
+        if user_state is None and not isinstance(command, EndTurn):
+            # E.g. rent owed to an owner who has since left the game
+            log.warning(f"Ignoring {type(command).__name__} for a player who is not in the game", extra=log_context(game_id=game_id, user_id=user_id))
+            return
 
         if isinstance(command, MovePlayer):
             new_space = game_state.game_board[command.new_position]
@@ -66,27 +94,34 @@ class StateManager:
             user_state.position = command.new_position
             user_state.current_space_id = new_space.space_id
 
-            for board_space in game_state.game_board:
-                board_space.remove_occupant(user_id)
-
-            new_space.add_occupant(user_state.user_id)
+            game_state.remove_occupant(command.old_position, user_id)
+            game_state.add_occupant(command.new_position, user_state.user_id)
+            game_state.mark_player_dirty(user_id)
 
         elif isinstance(command, BuyProperty):
-            user_state.money_dollars -= command.space.purchase_price
-            user_state.owned_properties.append(command.space.space_id)
+            space = game_state.game_board[command.space_index]
+            user_state.money_dollars -= space.purchase_price
+            user_state.owned_properties.append(space.space_id)
             
-            game_state.game_board[command.space.space_index].owned_by = user_id
+            game_state.set_owner(command.space_index, user_id)
+            self.get_ownership_index(game_id).add(user_id, command.space_index)
+            game_state.mark_player_dirty(user_id)
 
         elif isinstance(command, ModifyFunds):
             user_state.money_dollars += command.money_dollars
+            game_state.mark_player_dirty(user_id)
         
         elif isinstance(command, EndTurn):
-            player_list = sorted([uid for uid in game_state.player_states.keys()])
-            player_count = len(player_list)
-            log.info(f"Update current turn for {player_count} players from {game_state.current_turn} to {(game_state.current_turn + 1) % player_count}")
+            player_count = len(game_state.turn_order)
+            if sampled("state_manager.commands", game_id):
+                log.info(
+                    f"Update current turn for {player_count} players from {game_state.current_turn} to {(game_state.current_turn + 1) % player_count}",
+                    extra=log_context(game_id=game_id, user_id=user_id)
+                )
             game_state.current_turn = (game_state.current_turn + 1) % player_count
-            game_state.current_turn_uid = player_list[game_state.current_turn]
+            game_state.current_turn_uid = game_state.turn_order[game_state.current_turn]
 
+        game_state.version += 1
         self.update_states(
             game_id=command.game_id,
             user_id=command.user_id,
@@ -94,42 +129,107 @@ class StateManager:
             user_state=user_state
         )
 
-    def apply_all(self, commands: List[StateCommand]):
+    def apply_all(self, commands: List[StateCommand]) -> bool:
+        """Apply commands derived from one read of the state, all of them or none (compare-and-set).
+
+        Commands with a version only apply while their game is still at that version, any change to the game
+        since they were derived is a conflict. Returns False, with nothing applied, on a conflict.
+        """
+        for command in commands:
+            if command.version is not None:
+                game_state = self.game_states.get(command.game_id)
+                if game_state is None or game_state.version != command.version:
+                    return False
         for command in commands:
             self.apply(command)
+        return True
 
     def add_player(self, game_id: str, user_id: str) -> None:
         """Add a player to the game state."""
-        log.info(f"Adding player {user_id} to game {game_id}")
+        log.info(f"Adding player {user_id} to game {game_id}", extra=log_context(game_id=game_id, user_id=user_id))
         state = self.get_game_state(game_id)
         if state:
             if user_id not in state.player_states:
-                state.player_states[user_id] = UserState(
+                # Keep the state initialize_state may have prepared, so both maps share one object
+                state.player_states[user_id] = self.user_states.get((game_id, user_id)) or UserState(
                     user_id=user_id,
                     money_dollars=1500,
                     position=0,
                     current_space_id='boot_sequence',
                     owned_properties=[]
                 )
-                state.current_turn_uid = user_id
+            self._track_player(game_id, user_id, state.player_states[user_id])
+            if user_id not in state.turn_order:
+                state.turn_order.append(user_id)
+                if not state.current_turn_uid:
+                    state.current_turn = len(state.turn_order) - 1
+                    state.current_turn_uid = user_id
+            state.version += 1
         else:
             raise ValueError(f"Game state for game_id {game_id} does not exist.")
         
         self.set_state(game_id, state)
     
     def remove_player(self, game_id: str, user_id: str) -> None:
-        """Remove a player from the game state."""
-        log.info(f"Removing player {user_id} from game {game_id}")
+        """Remove a player from the game state, their properties go back to the bank."""
+        log.info(f"Removing player {user_id} from game {game_id}", extra=log_context(game_id=game_id, user_id=user_id))
         state = self.get_game_state(game_id)
         if state:
             if user_id in state.player_states:
-                del state.player_states[user_id]
-                state.current_turn_uid = list(state.player_states.keys())[0] if state.player_states else ""
+                position = state.player_states.pop(user_id).position
+                state.remove_occupant(position, user_id)
+                state.mark_player_dirty(user_id)
+            ownership_index = self.get_ownership_index(game_id)
+            for space_index in [space_index for space_index, owner_id in state.owners.items() if owner_id == user_id]:
+                state.clear_owner(space_index)
+                ownership_index.remove(user_id, space_index)
+            if user_id in state.turn_order:
+                self._remove_from_turn_order(state, user_id)
+            self._untrack_player(game_id, user_id)
+            state.version += 1
         else:
             raise ValueError(f"Game state for game_id {game_id} does not exist.")
         
         self.set_state(game_id, state)
     
+    def place_on_board(self, game_id: str, user_id: str, space_index: int = 0) -> None:
+        """Show the player as occupying a space, the Boot Sequence space by default."""
+        state = self.get_game_state(game_id)
+        state.add_occupant(space_index, user_id)
+
+    def _track_player(self, game_id: str, user_id: str, user_state: UserState) -> None:
+        self.user_states[(game_id, user_id)] = user_state
+        self.user_games.setdefault(user_id, {})[game_id] = None
+
+    def _untrack_player(self, game_id: str, user_id: str) -> None:
+        self.user_states.pop((game_id, user_id), None)
+        games = self.user_games.get(user_id)
+        if games is not None:
+            games.pop(game_id, None)
+            if not games:
+                del self.user_games[user_id]
+
+    def _remove_from_turn_order(self, state: GameState, user_id: str) -> None:
+        """Take a player out of the turn ring, keeping the turn with the same player or passing it to the next one."""
+        removed_index = state.turn_order.index(user_id)
+        state.turn_order.pop(removed_index)
+
+        if not state.turn_order:
+            state.current_turn = 0
+            state.current_turn_uid = ''
+            return
+
+        if removed_index < state.current_turn:
+            state.current_turn -= 1
+        # If the removed player held the turn, the next player in the ring has now shifted into their slot
+        state.current_turn %= len(state.turn_order)
+        state.current_turn_uid = state.turn_order[state.current_turn]
+
+    def is_players_turn(self, game_id: str, user_id: str) -> bool:
+        """Check whether it is the given user's turn in the game."""
+        state = self.game_states.get(game_id)
+        return bool(state) and state.current_turn_uid == user_id
+
     def initialize_state(self, initial_state: Dict) -> None:
         """Initialize state for a given user."""
         log.info("Initializing state...")
@@ -145,19 +245,65 @@ class StateManager:
             # Handle the case where initial_state has unexpected keys
             raise ValueError(f"Invalid initial state data: {e}")
         
-    def create_state(self, game_id: str) -> GameState:
-        """Create a new state for a given user."""
-        log.info("Creating new state...")
-        new_state = GameState(
-            game_id=game_id,
-            player_states={},
-            game_board=[deepcopy(space) for space in template_game_board]
-        )
+    def create_state(self, game_id: str, board: Optional[Board] = None) -> GameState:
+        """Create a new state for a given user, on the default board variant unless another board is given.
+
+        The game shares the board definition, only its owners, hotels and occupants are per-game state.
+        The state comes from the pre-built pool when it has one for the board.
+        """
+        log.info("Creating new state...", extra=log_context(game_id=game_id))
+        new_state = get_game_state_pool().acquire(game_id, board or get_board())
+        self.ownership_indexes[game_id] = OwnershipIndex(get_rent_table(new_state.board))
         self.set_state(game_id, new_state)
         return new_state
     
-    def get_user_state(self, user_id: str) -> UserState | None:
-        return self.user_states.get(user_id)
+    def add_state(self, game_state: GameState) -> None:
+        """Take over a complete game, e.g. one restored from a snapshot. Its ownership index is rebuilt on first use."""
+        log.info("Adding restored state...", extra=log_context(game_id=game_state.game_id))
+        for user_id, user_state in game_state.player_states.items():
+            self._track_player(game_state.game_id, user_id, user_state)
+        self.ownership_indexes.pop(game_state.game_id, None)
+        self.set_state(game_state.game_id, game_state)
+
+    def remove_state(self, game_id: str) -> None:
+        """Forget a game and its players, e.g. once it ended or has been handed to another process.
+
+        Its GameState goes back to the pool for a later game, callers must not keep references to it.
+        """
+        game_state = self.game_states.pop(game_id, None)
+        self.ownership_indexes.pop(game_id, None)
+        if game_state:
+            for user_id in game_state.player_states:
+                self._untrack_player(game_id, user_id)
+            get_game_state_pool().release(game_state)
+
+    def get_ownership_index(self, game_id: str) -> OwnershipIndex:
+        """Retrieve the ownership index for a game, building it from the board if it isn't cached yet."""
+        index = self.ownership_indexes.get(game_id)
+        if index is None:
+            game_state = self.get_game_state(game_id)
+            index = OwnershipIndex.from_owners(get_rent_table(game_state.board), game_state.owners)
+            self.ownership_indexes[game_id] = index
+        return index
+
+    def get_rent(self, game_id: str, space_index: int) -> int:
+        """Rent owed for landing on a space, 0 for unowned and non-property spaces."""
+        game_state = self.get_game_state(game_id)
+        if not isinstance(game_state.game_board[space_index], PropertySpace):
+            return 0
+        return self.get_ownership_index(game_id).rent_for(
+            space_index,
+            game_state.owner_of(space_index),
+            game_state.hotels.get(space_index, 0)
+        )
+
+    def get_user_state(self, game_id: str, user_id: str) -> UserState | None:
+        """Retrieve a player's state in a game."""
+        return self.user_states.get((game_id, user_id))
+
+    def get_user_games(self, user_id: str) -> List[str]:
+        """The games a user has a state in, in the order they joined them."""
+        return list(self.user_games.get(user_id, ()))
 
     def get_game_state(self, game_id: str) -> GameState | None:
         """Retrieve the state for a given game."""
@@ -165,7 +311,8 @@ class StateManager:
         cached_state = self.game_states.get(game_id)
         
         if cached_state:
-            log.info('Fetching state from cache...')
+            if sampled("state_manager.lookups", game_id):
+                log.info('Fetching state from cache...', extra=log_context(game_id=game_id))
             return cached_state
         # else:
             # log.info('Fetching state from persistent storage...')
@@ -177,14 +324,20 @@ class StateManager:
             return None
 
         retrieved_state = GameState(**state_data)
+        if not retrieved_state.turn_order:
+            retrieved_state.turn_order = list(retrieved_state.player_states.keys())
         log.warning('Overwriting cache with retrieved state... Watch for stale object references!')
         self.set_state(game_id, retrieved_state)  # Cache it
+        for user_id, user_state in retrieved_state.player_states.items():
+            self._track_player(game_id, user_id, user_state)
+        self.ownership_indexes.pop(game_id, None)  # Rebuilt from the retrieved board on next use
 
         return retrieved_state
 
     def set_state(self, game_id: str, state: GameState | Dict[str, Any]) -> None:
         """Set or update the state for a given user."""
-        log.info("Setting state...")
+        if sampled("state_manager.lookups", game_id):
+            log.info("Setting state...", extra=log_context(game_id=game_id))
         self.game_states[game_id] = state if isinstance(state, GameState) else GameState(**state)  # Cache
         # self.session_manager.save_session(game_id, game_id, self.game_states[game_id].to_dict())          # Persist
 
@@ -0,0 +1,166 @@
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from config.config import TURN_TIMEOUT_SECONDS
+
+from models.events import GameEvent, TurnTimedOut
+from models.game_state import GameState
+
+from utils.logger import get_logger, log_context
+from utils.metrics import get_metrics
+from utils.timer_wheel import Timer, get_timer_wheel
+
+
+log = get_logger("turn_deadlines")
+
+
+ExpiryHandler = Callable[[str, str, GameEvent], Awaitable[None]]
+"""Called with (game_id, user_id, default_event) when a player lets a deadline pass"""
+
+
+class Deadline:
+    __slots__ = ("user_id", "default_event", "expires_at", "timer")
+
+    def __init__(self, user_id: str, default_event: GameEvent, expires_at: float, timer: Timer):
+        self.user_id = user_id
+        self.default_event = default_event
+        self.expires_at = expires_at
+        self.timer = timer
+
+
+class TurnDeadlines:
+    """At most one deadline per game, for the player the game is waiting on, driven by the timer wheel.
+
+    A deadline is either the turn timeout (the player hasn't rolled, defaults to ending their turn) or a
+    decision timeout armed with a dialog (defaults to the answer a bot would be forced into, e.g. paying the rent).
+    Deadlines are cancelled when their player acts, and re-armed for whoever holds the turn at the end of
+    each processing cycle.
+
+    Dialogs waiting on an answer are tracked separately from their deadline, so an answer is accepted once and
+    only while its dialog is open: answering closes it, and so does its deadline applying the default.
+
+    Use case:
+    ```
+    deadlines = get_turn_deadlines()
+
+    @deadlines.on_expired
+    async def handle_expired(game_id, user_id, default_event): ...
+
+    deadlines.arm(game_id, user_id, PassedOnProperty(...), timeout=DECISION_TIMEOUT_SECONDS)
+    deadlines.cancel(game_id, user_id)
+
+    deadlines.open_dialog(game_id, user_id, "payRent", PayedRent(...), timeout=DECISION_TIMEOUT_SECONDS)
+    if not deadlines.answer_dialog(game_id, user_id, "payRent"):
+        ...  # Answered already, or the default was applied
+    ```
+    """
+
+    _deadlines: Dict[str, Deadline]
+    """Maps game_id to the deadline of the player the game is waiting on"""
+    _dialogs: Dict[str, Dict[str, str]]
+    """Maps game_id to the players with an open dialog, and the prompt type they have yet to answer"""
+
+    def __init__(self, turn_timeout: float = TURN_TIMEOUT_SECONDS):
+        self.turn_timeout = turn_timeout
+        self._deadlines = {}
+        self._dialogs = {}
+        self._expiry_handler: Optional[ExpiryHandler] = None
+        self.wheel = get_timer_wheel()
+
+    def on_expired(self, func: ExpiryHandler) -> ExpiryHandler:
+        self._expiry_handler = func
+        return func
+
+    def arm(self, game_id: str, user_id: str, default_event: GameEvent, timeout: float) -> None:
+        """Replace the game's deadline: default_event is published for user_id unless they act within timeout."""
+        self.cancel(game_id)
+        timer = self.wheel.schedule(timeout, self._expire, game_id)
+        self._deadlines[game_id] = Deadline(user_id, default_event, time.monotonic() + timeout, timer)
+
+    def cancel(self, game_id: str, user_id: Optional[str] = None) -> None:
+        """Cancel the game's deadline, only if it belongs to user_id when one is given."""
+        deadline = self._deadlines.get(game_id)
+        if deadline is None or (user_id is not None and deadline.user_id != user_id):
+            return
+        deadline.timer.cancel()
+        del self._deadlines[game_id]
+
+    def open_dialog(self, game_id: str, user_id: str, prompt_type: str, default_event: GameEvent, timeout: float) -> None:
+        """Wait on the player's answer to a dialog, applying default_event unless they answer within timeout."""
+        self._dialogs.setdefault(game_id, {})[user_id] = prompt_type
+        self.arm(game_id, user_id, default_event, timeout)
+
+    def answer_dialog(self, game_id: str, user_id: str, prompt_type: str) -> bool:
+        """Close the player's open dialog of prompt_type and cancel its deadline.
+
+        Returns False if there is no such dialog, e.g. it was answered already or its default was applied.
+        """
+        dialogs = self._dialogs.get(game_id)
+        if not dialogs or dialogs.get(user_id) != prompt_type:
+            return False
+        self._close_dialog(game_id, user_id)
+        self.cancel(game_id, user_id)
+        return True
+
+    def open_dialogs(self, game_id: str) -> Dict[str, str]:
+        """user_id to prompt type of the game's unanswered dialogs."""
+        return dict(self._dialogs.get(game_id, {}))
+
+    def restore_dialogs(self, game_id: str, dialogs: Dict[str, str]) -> None:
+        """Reopen the dialogs of a game handed over from another process, their deadline is armed separately."""
+        if dialogs:
+            self._dialogs[game_id] = dict(dialogs)
+
+    def remove_game(self, game_id: str) -> None:
+        """Cancel the game's deadline and close its dialogs."""
+        self.cancel(game_id)
+        self._dialogs.pop(game_id, None)
+
+    def _close_dialog(self, game_id: str, user_id: str) -> None:
+        dialogs = self._dialogs.get(game_id)
+        if dialogs is not None:
+            dialogs.pop(user_id, None)
+            if not dialogs:
+                del self._dialogs[game_id]
+
+    def ensure_turn_deadline(self, game_state: GameState, bots: Set[str]) -> None:
+        """Arm the turn timeout for the player holding the turn, unless they already have a deadline.
+
+        Bots play immediately and a player alone in a game has nobody to wait for, neither gets a deadline.
+        """
+        user_id = game_state.current_turn_uid
+        if not user_id or user_id in bots or len(game_state.turn_order) < 2:
+            self.cancel(game_state.game_id)
+            return
+        deadline = self._deadlines.get(game_state.game_id)
+        if deadline is not None and deadline.user_id == user_id:
+            return
+        self.arm(game_state.game_id, user_id, TurnTimedOut(game_id=game_state.game_id, user_id=user_id), self.turn_timeout)
+
+    def pending(self, game_id: str) -> Tuple[str, GameEvent, float] | None:
+        """(user_id, default_event, seconds left) of the game's deadline, if it has one."""
+        deadline = self._deadlines.get(game_id)
+        if deadline is None:
+            return None
+        return deadline.user_id, deadline.default_event, max(deadline.expires_at - time.monotonic(), 0.0)
+
+    async def _expire(self, game_id: str) -> None:
+        deadline = self._deadlines.pop(game_id, None)
+        if deadline is None:
+            return
+        # The default answers the dialog, an answer arriving after it is late
+        self._close_dialog(game_id, deadline.user_id)
+        if self._expiry_handler is None:
+            return
+        get_metrics().incr("deadlines.expired")
+        log.info(
+            f"Deadline of {deadline.user_id} expired, applying {type(deadline.default_event).__name__}",
+            extra=log_context(game_id=game_id, user_id=deadline.user_id)
+        )
+        await self._expiry_handler(game_id, deadline.user_id, deadline.default_event)
+
+
+@lru_cache(maxsize=1)
+def get_turn_deadlines() -> TurnDeadlines:
+    return TurnDeadlines()
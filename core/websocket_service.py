@@ -1,42 +1,155 @@
 from websockets.asyncio.server import ServerConnection
 from websockets.protocol import State
-from typing import List, Dict, Set
+from typing import Iterable, List, Dict, Set, Tuple
 from functools import lru_cache
+from weakref import WeakKeyDictionary, WeakSet
+import time
+
+from config.config import MAX_CONNECTIONS, MAX_CONNECTIONS_PER_IP
+
+from models.wsp_schemas import ClientCapabilities
+from utils.metrics import get_metrics
 
 
 class WebsocketService:
-    _websockets_by_user: Dict[str, ServerConnection]
-    """Maps user_id to a websocket"""
     _websockets_by_game: Dict[str, Dict[str, ServerConnection]]
     """Maps game_id to a Dictionary that maps user_id to websocket, but only users in the game and they're corresponding websocket"""
+    _capabilities: WeakKeyDictionary
+    """Maps websocket to the ClientCapabilities negotiated at sessionInit, entries go away with the connection"""
+    _spectators_by_game: Dict[str, WeakSet]
+    """Maps game_id to the read-only websockets following the game"""
+    _spectated_game: WeakKeyDictionary
+    """Maps a spectator's websocket to the game_id it follows"""
+    _bindings: Dict[ServerConnection, Set[Tuple[str, str]]]
+    """Maps websocket to the (game_id, user_id) pairs registered on it"""
+    _last_activity: Dict[ServerConnection, float]
+    """Maps every open websocket to the monotonic time it last sent a message"""
+    _connections_by_ip: Dict[str, int]
+    """Number of open websockets per remote address"""
 
     def __init__(self):
-        self._websockets_by_user = {}
         self._websockets_by_game = {}
-    
+        self._capabilities = WeakKeyDictionary()
+        self._spectators_by_game = {}
+        self._spectated_game = WeakKeyDictionary()
+        self._bindings = {}
+        self._last_activity = {}
+        self._connections_by_ip = {}
+
+    def admit_connection(self, ws: ServerConnection) -> bool:
+        """Track a new connection, refusing it when the global or per-address limit is reached."""
+        ip = self._remote_ip(ws)
+        if len(self._last_activity) >= MAX_CONNECTIONS or self._connections_by_ip.get(ip, 0) >= MAX_CONNECTIONS_PER_IP:
+            get_metrics().incr("connections.refused")
+            return False
+        self._last_activity[ws] = time.monotonic()
+        self._connections_by_ip[ip] = self._connections_by_ip.get(ip, 0) + 1
+        get_metrics().set_gauge("connections.open", len(self._last_activity))
+        return True
+
+    def release_connection(self, ws: ServerConnection) -> None:
+        if self._last_activity.pop(ws, None) is None:
+            return
+        ip = self._remote_ip(ws)
+        remaining = self._connections_by_ip.get(ip, 0) - 1
+        if remaining > 0:
+            self._connections_by_ip[ip] = remaining
+        else:
+            self._connections_by_ip.pop(ip, None)
+        get_metrics().set_gauge("connections.open", len(self._last_activity))
+
+    def get_connections(self) -> List[ServerConnection]:
+        return list(self._last_activity)
+
+    def touch(self, ws: ServerConnection) -> None:
+        """Record inbound activity on a connection."""
+        if ws in self._last_activity:
+            self._last_activity[ws] = time.monotonic()
+
+    def get_stale_connections(self, idle_timeout: float) -> Tuple[List[ServerConnection], List[ServerConnection]]:
+        """Connections that are no longer open, and open connections idle for longer than idle_timeout.
+
+        Spectators are never idle, they only listen once subscribed. The keepalive pings close the ones that went away.
+        """
+        idle_before = time.monotonic() - idle_timeout
+        closed = []
+        idle = []
+        for ws, last_activity in self._last_activity.items():
+            if ws.state is not State.OPEN:
+                closed.append(ws)
+            elif last_activity < idle_before and not self.is_spectator(ws):
+                idle.append(ws)
+        return closed, idle
+
+    @staticmethod
+    def _remote_ip(ws: ServerConnection) -> str:
+        remote_address = ws.remote_address
+        return str(remote_address[0]) if remote_address else ""
+
     def register_websocket(self, ws: ServerConnection, user_id: str, game_id: str) -> None:
-        self._websockets_by_user[user_id] = ws
         if self._websockets_by_game.get(game_id) is None:
             self._websockets_by_game[game_id] = {}
         self._websockets_by_game[game_id][user_id] = ws
+        self._bindings.setdefault(ws, set()).add((game_id, user_id))
+
+    def is_registered(self, ws: ServerConnection, game_id: str) -> bool:
+        """Whether a player registered the connection for the game."""
+        return any(bound_game_id == game_id for bound_game_id, _ in self._bindings.get(ws, ()))
+
+    def unregister_websockets(self, websockets: Iterable[ServerConnection]) -> Dict[str, Set[str]]:
+        """Forget connections in one pass, returns the user ids that lost their connection per game.
+
+        Users that already registered a newer connection keep it and are not returned.
+        """
+        disconnected: Dict[str, Set[str]] = {}
+        for ws in websockets:
+            self.release_connection(ws)
+            self._unregister_spectator(ws)
+            for game_id, user_id in self._bindings.pop(ws, ()):
+                game_websockets = self._websockets_by_game.get(game_id)
+                if game_websockets is not None and game_websockets.get(user_id) is ws:
+                    del game_websockets[user_id]
+                    disconnected.setdefault(game_id, set()).add(user_id)
+                    if not game_websockets:
+                        del self._websockets_by_game[game_id]
+        return disconnected
     
-    def get_websocket_by_user(self, user_id: str) -> ServerConnection | None:
-        return self._websockets_by_user.get(user_id)
+    def register_spectator(self, ws: ServerConnection, game_id: str) -> None:
+        self._unregister_spectator(ws)
+        if self._spectators_by_game.get(game_id) is None:
+            self._spectators_by_game[game_id] = WeakSet()
+        self._spectators_by_game[game_id].add(ws)
+        self._spectated_game[ws] = game_id
+
+    def _unregister_spectator(self, ws: ServerConnection) -> None:
+        game_id = self._spectated_game.pop(ws, None)
+        spectators = self._spectators_by_game.get(game_id)
+        if spectators is not None:
+            spectators.discard(ws)
+            if not spectators:
+                del self._spectators_by_game[game_id]
+
+    def is_spectator(self, ws: ServerConnection) -> bool:
+        return ws in self._spectated_game
+
+    def get_spectators(self, game_id: str) -> Set[ServerConnection]:
+        spectators = self._spectators_by_game.get(game_id)
+        return set(spectators) if spectators else set()
+
+    def set_capabilities(self, ws: ServerConnection, capabilities: ClientCapabilities) -> None:
+        self._capabilities[ws] = capabilities
+
+    def get_capabilities(self, ws: ServerConnection) -> ClientCapabilities:
+        """Capabilities of a connection, the defaults of an old client if it never negotiated any."""
+        return self._capabilities.get(ws) or ClientCapabilities()
+
+    def get_websocket(self, game_id: str, user_id: str) -> ServerConnection | None:
+        """The connection a player registered for a game, a user playing several games may use one per game."""
+        game_websockets = self._websockets_by_game.get(game_id)
+        return game_websockets.get(user_id) if game_websockets else None
 
     def get_websockets_by_game(self, game_id: str) -> Dict[str, ServerConnection] | None:
         return self._websockets_by_game.get(game_id)
-    
-    def get_closed_websockets(self) -> Dict[str, Set]:
-        """Returns the game and user ids for each user that has disconnected"""
-        output = {}
-        for game_id, user_ws in self._websockets_by_game.items():
-            disconnected_user_ids = {
-                user_id for user_id, ws in user_ws.items()
-                if ws.state is State.CLOSED
-            }
-            if disconnected_user_ids:
-                output[game_id] = disconnected_user_ids
-        return output
 
 
 @lru_cache(maxsize=1)
@@ -1,36 +1,146 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+import json
+import websockets
+from websockets.asyncio.server import broadcast
 from utils.wsp_utils import send_wsp_event
+from utils.logger import get_logger, log_context, sampled
+from utils.backplane import get_backplane
+from utils.wsp_codec import JSON_ENCODING, encode_event
 from models.wsp_schemas import WSPEvent
 from models.game_state import GameState
 from websockets.asyncio.server import ServerConnection
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, List, Optional
+from config.config import DECISION_TIMEOUT_SECONDS
+from core.state_manager import get_state_manager
 from core.websocket_service import get_websocket_service
-from models.board_models import BoardSpace
+from core.replay_buffer import get_replay_buffers
+from core.spectator_service import get_spectator_broadcaster
+from core.turn_deadlines import get_turn_deadlines
+from models.board_models import Board, BoardSpace
+from models.events import GameEvent, PassedOnProperty, PayedRent
 
 
+log = get_logger("wsp_helpers")
 websocket_service = get_websocket_service()
+state_manager = get_state_manager()
+replay_buffers = get_replay_buffers()
+spectator_broadcaster = get_spectator_broadcaster()
+turn_deadlines = get_turn_deadlines()
+
+
+_outbound_batch: ContextVar[Optional[Dict[ServerConnection, List[WSPEvent]]]] = ContextVar("outbound_batch", default=None)
+"""Events held per connection during the current processing cycle, None outside of a cycle"""
+
+
+async def deliver(ws: ServerConnection, event: WSPEvent) -> None:
+    """Send an event to a client, or hold it until the end of the current processing cycle."""
+    batch = _outbound_batch.get()
+    if batch is None:
+        await send_wsp_event(ws, event, websocket_service.get_capabilities(ws).encoding)
+        return
+    batch.setdefault(ws, []).append(event)
+
+
+async def _flush(batch: Dict[ServerConnection, List[WSPEvent]]) -> None:
+    for ws, events in batch.items():
+        try:
+            capabilities = websocket_service.get_capabilities(ws)
+            if len(events) > 1 and capabilities.batch_frames:
+                await send_wsp_event(ws, WSPEvent(
+                    event="batch",
+                    data={
+                        "events": [event.model_dump() for event in events]
+                    }
+                ), capabilities.encoding)
+                continue
+            for event in events:
+                await send_wsp_event(ws, event, capabilities.encoding)
+        except websockets.ConnectionClosed:
+            log.info(f"Connection closed before {len(events)} batched events could be delivered")
+
+
+@asynccontextmanager
+async def batched_outbound() -> AsyncIterator[None]:
+    """Collect every event sent during the block and flush them per connection when it exits.
+
+    Clients that negotiated batchFrames receive one frame per connection, others receive the events one by one.
+    Nested blocks join the outermost batch.
+    """
+    if _outbound_batch.get() is not None:
+        yield
+        return
+
+    batch = {}
+    token = _outbound_batch.set(batch)
+    try:
+        yield
+    finally:
+        _outbound_batch.reset(token)
+        await _flush(batch)
+
+
+def has_cached_board(ws: ServerConnection, board_hash: str) -> bool:
+    """Whether the client holds the game's static board and only needs dynamic fields."""
+    return websocket_service.get_capabilities(ws).board_hash == board_hash
+
+
+def space_payload(ws: ServerConnection, game_state: GameState, space: BoardSpace) -> Dict:
+    return game_state.space_fragment(space.space_index, dynamic_only=has_cached_board(ws, game_state.board.hash))
+
+
+@lru_cache(maxsize=32)
+def board_definition_event(board: Board) -> WSPEvent:
+    """The static board, published once per client and cached by them under its hash."""
+    return WSPEvent(
+        event="boardDefinition",
+        data={
+            "boardHash": board.hash,
+            "boardVariant": board.variant,
+            "board": list(board.static_spaces)
+        }
+    )
 
 
 class ShowDialog:
-    def __init__(self, ws: ServerConnection):
-        self.ws = ws
+    def __init__(self, *, game_id: str, user_id: str):
+        self.game_id = game_id
+        self.user_id = user_id
+        self.ws = websocket_service.get_websocket(game_id, user_id)
     
     async def _show_dialog(self, *,
         prompt_type: str,
         message: str,
         space: Optional[BoardSpace] = None,
         action: Optional[str] = None,
-        rent_amount: Optional[int] = None
+        rent_amount: Optional[int] = None,
+        default_decision: Optional[GameEvent] = None
     ) -> None:
-        await send_wsp_event(self.ws, WSPEvent(
+        if not self.ws:
+            # Players without a connection (e.g. bots) have nothing to show the dialog on
+            return
+        if default_decision is not None:
+            # Dialogs waiting on an answer take their default when the player doesn't answer in time
+            turn_deadlines.open_dialog(self.game_id, self.user_id, prompt_type, default_decision, DECISION_TIMEOUT_SECONDS)
+        event = WSPEvent(
             event="showDialog",
             data={
                 "promptType": prompt_type,
                 "message": message,
-                "space": space.model_dump() if space else None,
+                "space": space_payload(self.ws, state_manager.get_game_state(self.game_id), space) if space else None,
                 "action": action,
                 "rentAmount": rent_amount
             }
-        ))
+        )
+        event.seq = replay_buffers.get(self.game_id).record(event, self.user_id)
+        try:
+            await deliver(self.ws, event)
+        except websockets.ConnectionClosed:
+            log.info(
+                f"Dialog for {self.user_id} not delivered, it will be replayed when they reconnect",
+                extra=log_context(game_id=self.game_id, user_id=self.user_id, event="showDialog")
+            )
 
     async def alert(self, *, space: BoardSpace, message: str) -> None:
         await self._show_dialog(
@@ -39,11 +149,19 @@ class ShowDialog:
             space=space
         )
     
+    async def action_space(self, *, space: BoardSpace, message: str) -> None:
+        await self._show_dialog(
+            prompt_type="actionSpace",
+            message=message,
+            space=space
+        )
+
     async def ask_purchase_property(self, *, space: BoardSpace, message: str) -> None:
         await self._show_dialog(
             prompt_type="askPurchaseProperty",
             message=message,
-            space=space
+            space=space,
+            default_decision=PassedOnProperty(game_id=self.game_id, user_id=self.user_id, space_index=space.space_index)
         )
     
     async def pay_rent(self, *, space: BoardSpace, message: str, rent_amount: int) -> None:
@@ -51,25 +169,129 @@ class ShowDialog:
             prompt_type="payRent",
             message=message,
             space=space,
-            rent_amount=rent_amount
+            rent_amount=rent_amount,
+            default_decision=PayedRent(
+                game_id=self.game_id,
+                user_id=self.user_id,
+                opponent_id=state_manager.get_game_state(self.game_id).owner_of(space.space_index),
+                rent_dollars=rent_amount
+            )
+        )
+
+
+def _state_variant_event(state: GameState | Dict, variant: str, seq: Optional[int], cache: Dict[str, WSPEvent]) -> WSPEvent:
+    """The stateUpdate of one payload variant, "full" or "dynamic", built at most once per broadcast.
+
+    Clients of the same variant share the event, so it is also encoded once per wire encoding.
+    """
+    event = cache.get(variant)
+    if event is None:
+        if variant == "dynamic":
+            state_data = state.to_dynamic_dict()
+        else:
+            state_data = state.to_dict() if isinstance(state, GameState) else state
+        event = cache[variant] = WSPEvent(
+            event="stateUpdate",
+            data={
+                "state": state_data,
+                # Echoed back with the player's decisions, which are rejected once the game has moved past it
+                "version": state.version if isinstance(state, GameState) else None
+            },
+            seq=seq
         )
+    return event
+
+
+def _state_event(ws: ServerConnection, state: GameState | Dict, seq: Optional[int], cache: Dict[str, WSPEvent]) -> WSPEvent:
+    """Build the stateUpdate for one client, with only the dynamic fields if it cached the game's board."""
+    dynamic_only = isinstance(state, GameState) and has_cached_board(ws, state.board.hash)
+    return _state_variant_event(state, "dynamic" if dynamic_only else "full", seq, cache)
+
+
+async def send_state(ws: ServerConnection, state: GameState) -> None:
+    """Send the current state to a single client, e.g. one that is catching up after a reconnect."""
+    await deliver(ws, _state_event(ws, state, replay_buffers.get(state.game_id).last_seq, {}))
+
+
+def game_channel(game_id: str) -> str:
+    return f"game:{game_id}"
+
+
+async def subscribe_game(game_id: str) -> None:
+    """Receive the game's broadcasts from other server processes, once the game is hosted here and has a socket in it."""
+    backplane = get_backplane()
+    if not backplane.is_subscribed(game_channel(game_id)):
+        await backplane.subscribe(game_channel(game_id), _on_remote_state_update)
+
+
+async def unsubscribe_game(game_id: str) -> None:
+    """Stop receiving the game's broadcasts once this process has no sockets left in it."""
+    backplane = get_backplane()
+    if backplane.is_subscribed(game_channel(game_id)) and not websocket_service.get_websockets_by_game(game_id=game_id):
+        await backplane.unsubscribe(game_channel(game_id))
+
+
+async def _on_remote_state_update(channel: str, message: str) -> None:
+    """Forward a state update published by another process to this process's sockets in the game."""
+    game_id = channel.split(":", 1)[1]
+    websockets = websocket_service.get_websockets_by_game(game_id=game_id)
+    if not websockets:
+        return
+
+    frames = json.loads(message)
+    events: Dict[str, WSPEvent] = {}
+    for ws in websockets.values():
+        variant = "dynamic" if has_cached_board(ws, frames["boardHash"]) else "full"
+        encoding = websocket_service.get_capabilities(ws).encoding
+        if encoding == JSON_ENCODING:
+            broadcast([ws], frames[variant])
+            continue
+        # Published frames are JSON, binary clients get them re-encoded once per variant and encoding
+        if variant not in events:
+            events[variant] = WSPEvent.model_validate_json(frames[variant])
+        broadcast([ws], encode_event(events[variant], encoding))
+
+
+def _publish_state_update(state: GameState, seq: Optional[int], cache: Dict[str, WSPEvent]) -> None:
+    """Publish the encoded state update once per game for sockets connected to other server processes."""
+    backplane = get_backplane()
+    channel = game_channel(state.game_id)
+    if not backplane.has_remote_subscribers(channel):
+        return
+
+    backplane.publish(channel, json.dumps({
+        "boardHash": state.board.hash,
+        **{
+            variant: encode_event(_state_variant_event(state, variant, seq, cache))
+            for variant in ("full", "dynamic")
+        }
+    }))
 
 
 async def state_update(state: GameState | Dict) -> None:
-    """Send a state update event over the websocket connection."""
+    """Send a state update event over the websocket connection.
 
-    state_data = state.to_dict() if isinstance(state, GameState) else state
+    Clients that cache the static board receive only the dynamic fields of the state.
+    Spectators receive the change with the next snapshot tick.
+    """
+
+    spectator_broadcaster.mark_changed(state.game_id)
     websockets = websocket_service.get_websockets_by_game(game_id=state.game_id)
 
-    try:
-        for ws in websockets.values():
-            print("Sending state update...")
-            await send_wsp_event(ws, WSPEvent(
-                event="stateUpdate",
-                data={
-                    "state": state_data
-                }
-            ))
-            print("State update sent!")
-    except Exception as e:
-        print(f"Error broadcasting websocket message: {e}")
+    if not websockets:
+        return
+
+    seq = replay_buffers.get(state.game_id).record_state_update()
+    cache = {}
+
+    for ws in websockets.values():
+        try:
+            await deliver(ws, _state_event(ws, state, seq, cache))
+        except Exception as e:
+            log.error(f"Error broadcasting websocket message: {e}", extra=log_context(game_id=state.game_id, event="stateUpdate"))
+
+    if sampled("state_update", state.game_id):
+        log.info(f"State update {seq} sent to {len(websockets)} connections", extra=log_context(game_id=state.game_id, event="stateUpdate"))
+
+    if isinstance(state, GameState):
+        _publish_state_update(state, seq, cache)
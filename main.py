@@ -1,16 +1,78 @@
 from server import event_router
+from config.board_loader import get_board, get_board_registry
+from config.config import PING_INTERVAL_SECONDS, PING_TIMEOUT_SECONDS
+from core.bot_players import get_board_tables
+from core.connection_reaper import get_connection_reaper
+from core.game_migration import get_game_migrator
+from core.game_state_pool import get_game_state_pool
+from core.rent_engine import get_rent_table
+from core.spectator_service import get_spectator_broadcaster
+from utils.backplane import get_backplane
 from utils.logger import get_logger
+from utils.metrics import get_metrics
+from utils.timer_wheel import get_timer_wheel
+from utils.wsp_codec import deflate_extension_factory
 import websockets
 import asyncio
+import signal
+import time
 
 
 log = get_logger("websocket_server")
 
 
+async def startup() -> None:
+    """Load the boards, build the default board's lookup tables and start background services, timing each step.
+
+    Everything here is also built lazily on first use, running it before accepting connections keeps
+    that cost off the first player's request. Step durations are kept in the `startup.<step>_ms` gauges.
+    """
+    metrics = get_metrics()
+    started_at = time.perf_counter()
+    steps = (
+        ("board", get_board),
+        ("rent_table", lambda: get_rent_table(get_board())),
+        ("bot_tables", lambda: get_board_tables(get_board())),
+        ("board_watcher", lambda: get_board_registry().start()),
+        ("spectators", lambda: get_spectator_broadcaster().start()),
+        ("reaper", lambda: get_connection_reaper().start()),
+        ("timers", lambda: get_timer_wheel().start()),
+        ("state_pool", lambda: get_game_state_pool().start()),
+        ("backplane", get_backplane().start)
+    )
+    for name, step in steps:
+        step_started_at = time.perf_counter()
+        result = step()
+        if asyncio.iscoroutine(result):
+            await result
+        metrics.set_gauge(f"startup.{name}_ms", (time.perf_counter() - step_started_at) * 1000)
+
+    total_ms = (time.perf_counter() - started_at) * 1000
+    metrics.set_gauge("startup.total_ms", total_ms)
+    log.info(f"Startup completed in {total_ms:.1f}ms")
+
+
 async def main():
-    log.info("WebSocket server running on ws://localhost:8080")
-    async with websockets.serve(event_router, "0.0.0.0", 8080):
-        await asyncio.Future()  # run forever
+    await startup()
+
+    # SIGTERM drains the process: every live game is handed to the successor before exiting
+    stop = asyncio.get_running_loop().create_future()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: stop.done() or stop.set_result(None))
+
+    async with websockets.serve(
+        event_router,
+        "0.0.0.0",
+        8080,
+        ping_interval=PING_INTERVAL_SECONDS,
+        ping_timeout=PING_TIMEOUT_SECONDS,
+        compression=None,
+        extensions=[deflate_extension_factory()]
+    ):
+        log.info("WebSocket server running on ws://localhost:8080")
+        await stop
+        log.info("Received SIGTERM, draining...")
+        await get_game_migrator().drain()
+        await get_backplane().close()
 
 
 if __name__ == '__main__':
@@ -1,7 +1,12 @@
-from typing import Optional, Literal, List, Literal, Set
+from dataclasses import dataclass
+from typing import Dict, Optional, Literal, List, Literal, Set, Tuple
 from pydantic import BaseModel, PrivateAttr, Field
 
 
+DYNAMIC_FIELDS = {"owned_by": True, "hotels": True, "visual_properties": {"occupied_by"}}
+"""Space fields that change during a game, excluded from the static board definition. Their per-game values live in GameState"""
+
+
 class VisualProperties(BaseModel):
     color: Optional[str] = None
     icon: Optional[str] = None
@@ -16,13 +21,9 @@ class BoardSpace(BaseModel):
     space_index: int
     visual_properties: VisualProperties = Field(default_factory=VisualProperties)
 
-    def add_occupant(self, user_id: str) -> None:
-        if user_id not in self.visual_properties.occupied_by:
-            self.visual_properties.occupied_by.append(user_id)
-    
-    def remove_occupant(self, user_id: str) -> None:
-        while user_id in self.visual_properties.occupied_by:
-            self.visual_properties.occupied_by.remove(user_id)
+    def static_dump(self) -> Dict:
+        """Fields that never change during a game, sent to clients once per board."""
+        return self.model_dump(exclude=DYNAMIC_FIELDS)
 
 
 class PropertySpace(BoardSpace):
@@ -31,6 +32,8 @@ class PropertySpace(BoardSpace):
     mortgage_value: int
     hotels: int = 0
     rent_prices: List[int] = []
+    rent_group: Optional[Literal["cloud_provider", "utility"]] = None
+    """Railroad-style group of a property without a color, colored properties are grouped by color"""
     owned_by: Optional[str] = None # user_id of the owner, None if unowned
     """User ID or None"""
 
@@ -47,3 +50,25 @@ def space_from_json(data: dict) -> BoardSpace:
         return ActionSpace(**data)
     else:
         raise ValueError(f"Unknown space_type: {data.get('space_type')}")
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Board:
+    """A parsed board definition, shared by every game created from it and never modified."""
+
+    variant: str
+    """Variant id the board was registered under"""
+    hash: str
+    """Content hash of the board file, clients cache the board definition under it"""
+    spaces: Tuple[BoardSpace, ...]
+    static_spaces: Tuple[Dict, ...]
+    """static_dump of each space, computed once per board"""
+
+    @classmethod
+    def from_spaces(cls, variant: str, board_hash: str, spaces: List[BoardSpace]) -> "Board":
+        return cls(
+            variant=variant,
+            hash=board_hash,
+            spaces=tuple(spaces),
+            static_spaces=tuple(space.static_dump() for space in spaces)
+        )
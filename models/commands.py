@@ -1,34 +1,45 @@
-from typing import List, Optional
-from pydantic import BaseModel
+from dataclasses import dataclass
+from typing import Optional
 from models.events import PlayerMoved, GameEvent
-from models.board_models import PropertySpace, BoardSpace
 
 
-class StateCommand(BaseModel):
+@dataclass(frozen=True, slots=True, kw_only=True)
+class StateCommand:
+    """Internal command applied by the StateManager. Spaces are referred to by their index on the game board."""
     game_id: str
     user_id: Optional[str] = ""
+    version: Optional[int] = None
+    """Version of the game state the command was derived from, it only applies while the game is still at it"""
 
-    def to_event(self) -> GameEvent:
-        ...
+    def to_event(self) -> GameEvent | None:
+        return None
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class EndTurn(StateCommand):
     ...
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class MovePlayer(StateCommand):
     old_position: int
     new_position: int
-    space: BoardSpace
 
     def to_event(self) -> PlayerMoved:
-        return PlayerMoved(**self.__dict__)
+        return PlayerMoved(
+            game_id=self.game_id,
+            user_id=self.user_id,
+            old_position=self.old_position,
+            new_position=self.new_position
+        )
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class BuyProperty(StateCommand):
-    space: PropertySpace
+    space_index: int
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class ModifyFunds(StateCommand):
     money_dollars: int
     """The amount of money the user's balance should increase/decrease by"""
@@ -1,54 +1,67 @@
-from typing import Dict, Optional
-from pydantic import BaseModel
-from models.board_models import PropertySpace, BoardSpace
+from dataclasses import dataclass
+from typing import Optional
 
 
-class GameEvent(BaseModel):
+@dataclass(frozen=True, slots=True, kw_only=True)
+class GameEvent:
+    """Internal event passed through the EventBus. Spaces are referred to by their index on the game board."""
     game_id: str
     user_id: Optional[str]
-
-    @property
-    def ids(self) -> Dict:
-        return {
-            'game_id': self.game_id,
-            'user_id': self.user_id
-        }
+    version: Optional[int] = None
+    """Version of the game state the event was decided on, None if it doesn't depend on one"""
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class SessionInit(GameEvent):
     user_id: str
     session_id: str
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class PlayerRollDice(GameEvent):
     dice_roll: int
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class PlayerMoved(GameEvent):
     old_position: int
     new_position: int
-    space: BoardSpace
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class LandedOnUnownedSpace(GameEvent):
     user_position: int
-    space: PropertySpace
+    space_index: int
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class LandedOnSelfOwnedSpace(GameEvent):
     user_position: int
-    space: PropertySpace
+    space_index: int
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class LandedOnOpponentSpace(GameEvent):
     user_position: int
-    space: PropertySpace
+    space_index: int
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class PurchasedProperty(GameEvent):
-    space: PropertySpace
+    space_index: int
 
 
+@dataclass(frozen=True, slots=True, kw_only=True)
 class PayedRent(GameEvent):
     opponent_id: str
     rent_dollars: int
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class PassedOnProperty(GameEvent):
+    space_index: int
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class TurnTimedOut(GameEvent):
+    user_id: str
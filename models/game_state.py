@@ -1,6 +1,7 @@
-from typing import Dict, List
-from models.board_models import BoardSpace
-from pydantic import BaseModel
+from typing import Dict, List, Optional, Tuple
+from models.board_models import Board, BoardSpace, PropertySpace
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from utils.metrics import get_metrics
 import random
 
 
@@ -15,11 +16,196 @@ class UserState(BaseModel):
 
 class GameState(BaseModel):
     """Placeholder for future game state management."""
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     game_id: str
     player_states: Dict[str, UserState]  # Maps user_id to UserState
-    game_board: List[BoardSpace]
-    current_turn: int = 0 # Player list index of the player whose turn it is
+    board: Board
+    """Board definition the game was created with, shared with other games and never modified"""
+    owners: Dict[int, str] = Field(default_factory=dict)
+    """Maps space_index to the user_id owning the property"""
+    hotels: Dict[int, int] = Field(default_factory=dict)
+    """Maps space_index to the number of hotels on the property"""
+    occupants: Dict[int, List[str]] = Field(default_factory=dict)
+    """Maps space_index to the user_ids of the players on the space"""
+    turn_order: List[str] = Field(default_factory=list)
+    """Ring of user_ids in the order they take turns"""
+    current_turn: int = 0 # Index in turn_order of the player whose turn it is
     current_turn_uid: str = ''
+    version: int = 0
+    """Incremented by the StateManager on every change, for optimistic concurrency control"""
     
+    _space_fragments: Dict[int, Dict] = PrivateAttr(default_factory=dict)
+    """Serialized spaces by space_index, a missing entry marks the space as dirty"""
+    _dynamic_space_fragments: Dict[int, Dict] = PrivateAttr(default_factory=dict)
+    """Dynamic-only serialized spaces by space_index, a missing entry marks the space as dirty"""
+    _player_fragments: Dict[str, Dict] = PrivateAttr(default_factory=dict)
+    """Serialized player states by user_id, a missing entry marks the player as dirty"""
+
+    @property
+    def game_board(self) -> Tuple[BoardSpace, ...]:
+        return self.board.spaces
+
+    def owner_of(self, space_index: int) -> Optional[str]:
+        return self.owners.get(space_index)
+
+    def set_owner(self, space_index: int, user_id: str) -> None:
+        self.owners[space_index] = user_id
+        self.mark_space_dirty(space_index)
+
+    def clear_owner(self, space_index: int) -> None:
+        """Return the property to the bank, with its hotels."""
+        self.owners.pop(space_index, None)
+        self.hotels.pop(space_index, None)
+        self.mark_space_dirty(space_index)
+
+    def add_occupant(self, space_index: int, user_id: str) -> None:
+        occupants = self.occupants.setdefault(space_index, [])
+        if user_id not in occupants:
+            occupants.append(user_id)
+            self.mark_space_dirty(space_index)
+
+    def remove_occupant(self, space_index: int, user_id: str) -> None:
+        occupants = self.occupants.get(space_index)
+        if occupants and user_id in occupants:
+            occupants.remove(user_id)
+            if not occupants:
+                del self.occupants[space_index]
+            self.mark_space_dirty(space_index)
+
+    def reset(self) -> None:
+        """Empty the game for reuse on the same board, keeping the cached fragments of spaces it never touched."""
+        for space_index in {*self.owners, *self.hotels, *self.occupants}:
+            self.mark_space_dirty(space_index)
+        self.game_id = ""
+        self.player_states = {}
+        self.owners = {}
+        self.hotels = {}
+        self.occupants = {}
+        self.turn_order = []
+        self.current_turn = 0
+        self.current_turn_uid = ""
+        self._player_fragments = {}
+
+    def warm(self) -> int:
+        """Build the full fragment of every space missing one, returns the number built."""
+        missing = [space_index for space_index in range(len(self.board.spaces)) if space_index not in self._space_fragments]
+        for space_index in missing:
+            self._space_fragments[space_index] = self._build_space_fragment(space_index)
+        return len(missing)
+
+    def has_dynamic_state(self, space_index: int) -> bool:
+        return space_index in self.occupants or space_index in self.owners or bool(self.hotels.get(space_index))
+
+    def mark_space_dirty(self, space_index: int) -> None:
+        self._space_fragments.pop(space_index, None)
+        self._dynamic_space_fragments.pop(space_index, None)
+
+    def mark_player_dirty(self, user_id: str) -> None:
+        self._player_fragments.pop(user_id, None)
+
+    def _build_space_fragment(self, space_index: int) -> Dict:
+        static = self.board.static_spaces[space_index]
+        fragment = {
+            **static,
+            "visual_properties": {**static["visual_properties"], "occupied_by": list(self.occupants.get(space_index, ()))}
+        }
+        if isinstance(self.board.spaces[space_index], PropertySpace):
+            fragment["owned_by"] = self.owners.get(space_index)
+            fragment["hotels"] = self.hotels.get(space_index, 0)
+        return fragment
+
+    def _build_dynamic_space_fragment(self, space_index: int) -> Dict:
+        fragment = {
+            "space_index": space_index,
+            "occupied_by": list(self.occupants.get(space_index, ()))
+        }
+        if isinstance(self.board.spaces[space_index], PropertySpace):
+            fragment["owned_by"] = self.owners.get(space_index)
+            fragment["hotels"] = self.hotels.get(space_index, 0)
+        return fragment
+
+    def space_fragment(self, space_index: int, dynamic_only: bool = False) -> Dict:
+        """Serialized space with this game's owner, hotels and occupants, or only those fields when dynamic_only."""
+        if dynamic_only:
+            fragment = self._dynamic_space_fragments.get(space_index)
+            if fragment is None:
+                fragment = self._dynamic_space_fragments[space_index] = self._build_dynamic_space_fragment(space_index)
+        else:
+            fragment = self._space_fragments.get(space_index)
+            if fragment is None:
+                fragment = self._space_fragments[space_index] = self._build_space_fragment(space_index)
+        return fragment
+
+    def _serialize_players(self) -> Dict[str, Dict]:
+        hits = 0
+        players = {}
+        for user_id, user_state in self.player_states.items():
+            fragment = self._player_fragments.get(user_id)
+            if fragment is None:
+                fragment = self._player_fragments[user_id] = user_state.model_dump()
+            else:
+                hits += 1
+            players[user_id] = fragment
+        self._record_cache_lookups(hits, len(players) - hits)
+        return players
+
+    def _record_cache_lookups(self, hits: int, misses: int) -> None:
+        metrics = get_metrics()
+        metrics.incr("serialization_cache.hits", hits)
+        metrics.incr("serialization_cache.misses", misses)
+
     def to_dict(self) -> Dict:
-        return self.model_dump()
+        """Serialize the full state, re-encoding only the spaces and players marked dirty since the last call.
+
+        The returned fragments are shared between calls and must not be mutated.
+        """
+        hits = 0
+        board = []
+        for space_index in range(len(self.board.spaces)):
+            fragment = self._space_fragments.get(space_index)
+            if fragment is None:
+                fragment = self._space_fragments[space_index] = self._build_space_fragment(space_index)
+            else:
+                hits += 1
+            board.append(fragment)
+        self._record_cache_lookups(hits, len(board) - hits)
+
+        return {
+            "game_id": self.game_id,
+            "player_states": self._serialize_players(),
+            "game_board": board,
+            "turn_order": list(self.turn_order),
+            "current_turn": self.current_turn,
+            "current_turn_uid": self.current_turn_uid
+        }
+
+    def to_dynamic_dict(self) -> Dict:
+        """Serialize only what changes during a game, for clients that cache the static board.
+
+        Only spaces with an owner, hotels or occupants are included, all other spaces are in their static state.
+        The returned fragments are shared between calls and must not be mutated.
+        """
+        hits = 0
+        lookups = 0
+        spaces = []
+        for space_index in range(len(self.board.spaces)):
+            if not self.has_dynamic_state(space_index):
+                continue
+            lookups += 1
+            fragment = self._dynamic_space_fragments.get(space_index)
+            if fragment is None:
+                fragment = self._dynamic_space_fragments[space_index] = self._build_dynamic_space_fragment(space_index)
+            else:
+                hits += 1
+            spaces.append(fragment)
+        self._record_cache_lookups(hits, lookups - hits)
+
+        return {
+            "game_id": self.game_id,
+            "player_states": self._serialize_players(),
+            "turn_order": list(self.turn_order),
+            "current_turn": self.current_turn,
+            "current_turn_uid": self.current_turn_uid,
+            "spaces": spaces
+        }
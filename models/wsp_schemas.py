@@ -1,9 +1,35 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 from typing import Dict, Optional
 
 
 class WSPEvent(BaseModel):
     """A basic Websocket Protocol Event schema"""
+    model_config = ConfigDict(populate_by_name=True, serialize_by_alias=True)
+
     event: str = Field(description="The request event type")
     data: Optional[Dict] = Field(None, description="An optional request payload")
     error: Optional[str] = Field(None, description="Optional error message")
+    # Left out of frames when unset, unlike data and error which older clients expect on every event
+    seq: Optional[int] = Field(None, exclude_if=lambda seq: seq is None, description="Per-game sequence number of outbound events, echoed back as lastSeq on reconnect")
+    request_id: Optional[str] = Field(None, alias="requestId", exclude_if=lambda request_id: request_id is None, description="Optional client-chosen id of a request, a retry with the same id is answered without running it again")
+
+    _frames: Optional[Dict[str, str | bytes]] = PrivateAttr(None)
+    """Encoded frames of the event by wire encoding, filled on first send"""
+
+    def __copy__(self) -> "WSPEvent":
+        # Copies start without frames, they are encoded from the copy's own fields, e.g. after model_copy(update=...)
+        copied = super().__copy__()
+        copied._frames = None
+        return copied
+
+    def __deepcopy__(self, memo: Optional[Dict] = None) -> "WSPEvent":
+        copied = super().__deepcopy__(memo)
+        copied._frames = None
+        return copied
+
+
+class ClientCapabilities(BaseModel):
+    """Protocol features a client opted into during sessionInit"""
+    board_hash: Optional[str] = Field(None, description="Hash of the static board the client has cached, None if it expects full board payloads")
+    batch_frames: bool = Field(False, description="Whether the client accepts several events batched into a single frame")
+    encoding: str = Field("json", description="Wire encoding of the binary frames sent to the client, text frames are always JSON")
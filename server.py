@@ -1,67 +1,152 @@
+import asyncio
+from functools import partial
 import websockets
-from utils.logger import get_logger
+from utils.logger import get_logger, log_context, sampled
 from websockets.asyncio.server import ServerConnection
 from app import event_handler_registry
 import core.event_handlers  # Ensure event handlers are registered
 import core.event_bus_listeners
+from core.admission_control import get_admission_controller
+from core.inbound_dispatcher import get_inbound_dispatcher
+from core.matchmaking import get_matchmaker
 from core.websocket_service import get_websocket_service
-from utils.wsp_utils import validate_wsp, send_wsp_event
+from core.wsp_helpers import deliver
+from utils.wsp_utils import validate_wsp
+from utils.wsp_codec import JSON_ENCODING
 from models.wsp_schemas import WSPEvent
+from utils.metrics import get_metrics
 
 
-# Track all connected clients
-_connected_clients = set()
-
 log = get_logger("websocket-server")
 websocket_service = get_websocket_service()
+admission_controller = get_admission_controller()
+inbound_dispatcher = get_inbound_dispatcher()
+matchmaker = get_matchmaker()
+
+SPECTATOR_READ_ONLY_ERROR = WSPEvent(
+    event="error",
+    data={"message": "Spectators cannot send game events.", "errorValue": None},
+    error="readOnly"
+).model_dump_json()
+
+RATE_LIMITED_ERROR = WSPEvent(
+    event="error",
+    data={"message": "Too many events, this one was dropped.", "errorValue": None},
+    error="rateLimited"
+).model_dump_json()
+
+
+async def process_event(websocket: ServerConnection, user_id: str | None, game_id: str | None, event: WSPEvent) -> None:
+    """Run the event's handler and send its response, if it has one."""
+    try:
+        response_event = await event_handler_registry.handle_event(
+            ws=websocket,
+            user_id=user_id,
+            game_id=game_id,
+            event=event
+        )
+
+        if not response_event:
+            if sampled("server.received", game_id):
+                log.info(f"No response event generated for incoming event: {event.event}", extra=log_context(game_id=game_id, user_id=user_id, event=event.event))
+            return
+
+        await deliver(websocket, response_event)
+
+    except websockets.ConnectionClosed:
+        pass
+
+    except Exception as e:
+        log.error(f"Error handling event {event.event}: {e}", extra=log_context(game_id=game_id, user_id=user_id, event=event.event))
+        # As when handlers ran on the reader itself, a failing handler ends the connection
+        await websocket.close(code=1011, reason="Internal error")
 
 
 async def event_router(websocket: ServerConnection) -> None:
-    """Handler for websocket connections. Messages are expected to be JSON."""
+    """Handler for websocket connections. Messages are expected to be JSON.
+
+    The connection is read continuously: each event is dispatched into its game's processing queue and the
+    next frame is read without waiting for the handler. Out-of-band events are answered right away.
+    """
+
+    if not websocket_service.admit_connection(websocket):
+        log.info(f"Refusing client {websocket.remote_address}, connection limit reached")
+        await websocket.close(code=1013, reason="Connection limit reached")
+        return
 
-    # Add client on connect
-    _connected_clients.add(websocket)
     log.info(f"Client connected: {websocket}")
+    dispatched = set()
+    quick_joining = set()
 
     try:
         # Wait for websocket events
         async for message in websocket:
+            websocket_service.touch(websocket)
+
+            if not admission_controller.admit_message(websocket):
+                # Shed before parsing so a flood costs as little as possible
+                await websocket.send(RATE_LIMITED_ERROR)
+                continue
+
+            if websocket_service.is_spectator(websocket):
+                # Spectators are read-only, nothing they send may reach an event handler
+                await websocket.send(SPECTATOR_READ_ONLY_ERROR)
+                continue
 
-            # Validate incoming message
-            event = validate_wsp(message)
+            # Validate incoming message, text frames are always JSON and binary frames use the negotiated encoding
+            encoding = JSON_ENCODING if isinstance(message, str) else websocket_service.get_capabilities(websocket).encoding
+            event = validate_wsp(message, encoding)
 
             user_id = event.data.get('userId')
             game_id = event.data.get('onlineGameId')
-            websocket_service.register_websocket(
-                ws=websocket,
-                user_id=user_id,
-                game_id=game_id
-            )
+            charged_game_id = game_id if game_id and websocket_service.is_registered(websocket, game_id) else None
+            if not admission_controller.admit_event(user_id, charged_game_id):
+                await websocket.send(RATE_LIMITED_ERROR)
+                continue
 
-            log.info(f"Received:\n\n{event.model_dump_json(indent=4)}")
-            response_event = await event_handler_registry.handle_event(
-                ws=websocket,
-                user_id=user_id,
-                game_id=game_id,
-                event=event
-            )
+            if user_id and event.event != "spectateGame":
+                # Spectators follow a game read-only, they never take over a player's connection
+                websocket_service.register_websocket(
+                    ws=websocket,
+                    user_id=user_id,
+                    game_id=game_id
+                )
 
-            if not response_event:
-                log.info(f"No response event generated for incoming event: {event.event}")
+            if sampled("server.received", game_id):
+                log.info(f"Received:\n\n{event.model_dump_json(indent=4)}", extra=log_context(game_id=game_id, user_id=user_id, event=event.event))
+
+            if event.event == "quickJoin" and user_id:
+                quick_joining.add(user_id)
+
+            if event_handler_registry.is_out_of_band(event.event):
+                # Cheap reads don't wait behind the game's queued events
+                get_metrics().incr("inbound.out_of_band")
+                await process_event(websocket, user_id, game_id, event)
                 continue
 
-            await send_wsp_event(websocket, response_event)
+            # Events outside any game are still ordered among the connection's own
+            done = inbound_dispatcher.dispatch(game_id or websocket, partial(process_event, websocket, user_id, game_id, event))
+            dispatched.add(done)
+            done.add_done_callback(dispatched.discard)
 
     except websockets.ConnectionClosed:
-        log.info("Client disconnected, broadcasting disconnect...")
-        await event_handler_registry.handle_event(
-            ws=None,
-            user_id=None,
-            game_id=None,
-            event=WSPEvent(event="connectionClosed")
-        )
+        pass
 
     finally:
-        # Always remove on disconnect
-        if websocket in _connected_clients:
-            _connected_clients.remove(websocket)
+        # Clean closes end the loop without raising, both paths broadcast the disconnect
+        log.info("Client disconnected, broadcasting disconnect...")
+        try:
+            for user_id in quick_joining:
+                # Players still waiting for a seat don't get one
+                matchmaker.cancel(user_id)
+            if dispatched:
+                # The player's queued events run before their seat is handed over
+                await asyncio.gather(*dispatched)
+            await event_handler_registry.handle_event(
+                ws=websocket,
+                user_id=None,
+                game_id=None,
+                event=WSPEvent(event="connectionClosed")
+            )
+        finally:
+            websocket_service.release_connection(websocket)
@@ -0,0 +1,55 @@
+"""Fixtures shared by the test suite.
+
+The server's services are process-wide singletons, registered once when `server` is imported, so tests
+share them and keep apart by using games of their own.
+"""
+import itertools
+import logging
+
+import pytest
+
+logging.disable(logging.CRITICAL)
+
+import server  # noqa: E402,F401  Registers the WSP handlers and EventBus listeners
+from app import event_handler_registry  # noqa: E402
+from core import event_handlers  # noqa: E402
+from core.state_manager import get_state_manager  # noqa: E402
+from models.wsp_schemas import WSPEvent  # noqa: E402
+
+# Manual websocket servers for client development, run directly rather than collected
+collect_ignore = ["test_main.py", "test_server.py"]
+
+_game_ids = itertools.count()
+
+
+@pytest.fixture
+def game_id() -> str:
+    return f"test-game-{next(_game_ids)}"
+
+
+@pytest.fixture
+def two_player_game(game_id):
+    """A game of alice and bob, alice holds the turn."""
+    state_manager = get_state_manager()
+    state_manager.create_state(game_id)
+    for user_id in ("alice", "bob"):
+        state_manager.add_player(game_id, user_id)
+        state_manager.place_on_board(game_id, user_id)
+    return state_manager.get_game_state(game_id)
+
+
+@pytest.fixture
+def send():
+    """Run a WSP event through the handler registry as a client without a socket would send it, returns the response."""
+    async def send(game_id: str, user_id: str, event: str, data: dict | None = None, request_id: str | None = None):
+        return await event_handler_registry.handle_event(
+            None, user_id, game_id, WSPEvent(event=event, data=data, request_id=request_id)
+        )
+    return send
+
+
+@pytest.fixture
+def admin_token(monkeypatch) -> str:
+    """Enable the admin events for the test, returns the token they must carry."""
+    monkeypatch.setattr(event_handlers, "ADMIN_TOKEN", "test-admin-token")
+    return "test-admin-token"
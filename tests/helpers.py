@@ -0,0 +1,60 @@
+"""Helpers shared by the tests."""
+import time
+
+from websockets.protocol import State
+
+from app import event_handler_registry
+from core.state_manager import get_state_manager
+from core.websocket_service import get_websocket_service
+from models.board_models import PropertySpace
+from models.commands import MovePlayer
+from models.wsp_schemas import WSPEvent
+from utils.timer_wheel import get_timer_wheel
+
+
+def move_to_property(game_state, user_id: str) -> int:
+    """Put the player on the first property of the board, returns its index."""
+    space_index = next(space.space_index for space in game_state.game_board if isinstance(space, PropertySpace))
+    get_state_manager().apply(MovePlayer(
+        game_id=game_state.game_id,
+        user_id=user_id,
+        old_position=game_state.player_states[user_id].position,
+        new_position=space_index
+    ))
+    return space_index
+
+
+class FakeConnection:
+    """Stands in for a client's ServerConnection, keeping the frames sent to it."""
+
+    def __init__(self, state: State = State.OPEN):
+        self.state = state
+        self.remote_address = ("127.0.0.1", 5000)
+        self.transport = None  # Nothing buffered, as for a connection whose transport is gone
+        self.sent = []
+
+    async def send(self, message) -> None:
+        self.sent.append(message)
+
+
+async def connect(game_id: str, user_id: str, **data) -> FakeConnection:
+    """Connect a player to the game with a sessionInit carrying data, as the server would route it."""
+    ws = FakeConnection()
+    get_websocket_service().register_websocket(ws=ws, user_id=user_id, game_id=game_id)
+    response = await event_handler_registry.handle_event(
+        ws, user_id, game_id, WSPEvent(event="sessionInit", data={"userId": user_id, "onlineGameId": game_id, **data})
+    )
+    assert response is None
+    return ws
+
+
+_elapsed = 0.0
+"""Time the tests moved the process-wide wheel ahead of the clock"""
+
+
+async def expire_deadlines() -> None:
+    """Fire every timer of the process-wide wheel that is due within a minute."""
+    global _elapsed
+    _elapsed += 60
+    wheel = get_timer_wheel()
+    await wheel.fire(wheel.advance(time.monotonic() + _elapsed))
@@ -0,0 +1,32 @@
+from core.admission_control import AdmissionController, KeyedTokenBuckets, TokenBucket
+
+from tests.helpers import FakeConnection
+
+
+def test_shed_messages_of_one_connection_leave_the_global_budget_to_others():
+    controller = AdmissionController()
+    controller.global_bucket = TokenBucket(rate=0, capacity=30)
+    flooder, other = FakeConnection(), FakeConnection()
+
+    admitted = sum(controller.admit_message(flooder) for _ in range(1000))
+    assert admitted < 30
+    assert controller.admit_message(other)
+
+
+def test_keyed_buckets_forget_the_least_recently_used_key():
+    buckets = KeyedTokenBuckets(rate=0, capacity=1, max_keys=2)
+    assert buckets.try_take("a", 0)
+    assert buckets.try_take("b", 0)
+    assert not buckets.try_take("a", 0)  # Uses "a" again, "b" becomes the least recent
+    assert buckets.try_take("c", 0)
+
+    assert len(buckets) == 2
+    assert not buckets.try_take("a", 0)
+    assert buckets.try_take("b", 0)  # Forgotten, starts over with a full bucket
+
+
+def test_unbounded_user_ids_keep_the_buckets_bounded():
+    buckets = KeyedTokenBuckets(rate=10, capacity=20, max_keys=100)
+    for i in range(1000):
+        buckets.try_take(f"user-{i}", 0)
+    assert len(buckets) == 100
@@ -0,0 +1,59 @@
+from core.event_handlers import handle_disconnected_players
+from core.state_manager import get_state_manager
+from core.wsp_helpers import game_channel, subscribe_game
+from utils.backplane import InProcessBackplane, get_backplane
+
+
+async def test_game_is_hosted_by_the_first_process_to_claim_it(game_id):
+    first, second = InProcessBackplane(), InProcessBackplane()
+
+    assert (await first.claim_game(game_id)).origin_id == first.origin_id
+    assert (await second.claim_game(game_id)).origin_id == first.origin_id
+
+    await second.release_game(game_id)  # Not its game, nothing changes
+    assert (await second.game_owner(game_id)).origin_id == first.origin_id
+
+    await first.release_game(game_id)
+    assert await second.game_owner(game_id) is None
+
+
+async def test_join_of_a_game_hosted_elsewhere_is_sent_to_its_host(game_id, send):
+    other_process = InProcessBackplane(public_url="wss://other.example.com")
+    await other_process.claim_game(game_id)
+
+    response = await send(game_id, "alice", "onlineGame", {"userId": "alice", "onlineGameId": game_id})
+
+    assert response.event == "migrate"
+    assert response.data["reconnectUrl"] == "wss://other.example.com"
+    assert get_state_manager().get_game_state(game_id) is None
+    assert not get_backplane().is_subscribed(game_channel(game_id))
+    await other_process.release_game(game_id)
+
+
+async def test_join_is_rejected_when_the_host_has_no_address(game_id, send):
+    other_process = InProcessBackplane()
+    await other_process.claim_game(game_id)
+
+    response = await send(game_id, "alice", "onlineGame", {"userId": "alice", "onlineGameId": game_id})
+
+    assert response.error == "hostedElsewhere"
+    await other_process.release_game(game_id)
+
+
+async def test_first_join_claims_the_game(game_id, send):
+    assert await send(game_id, "alice", "onlineGame", {"userId": "alice", "onlineGameId": game_id}) is None
+
+    backplane = get_backplane()
+    assert (await backplane.game_owner(game_id)).origin_id == backplane.origin_id
+    assert "alice" in get_state_manager().get_game_state(game_id).player_states
+    assert backplane.is_subscribed(game_channel(game_id))
+
+
+async def test_disconnect_from_an_unknown_game_drops_its_subscription(game_id):
+    # E.g. subscribed while the game was hosted here, and the game is gone by the time the client leaves
+    backplane = get_backplane()
+    await subscribe_game(game_id)
+
+    await handle_disconnected_players({game_id: {"alice"}})
+
+    assert not backplane.is_subscribed(game_channel(game_id))
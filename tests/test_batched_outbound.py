@@ -0,0 +1,47 @@
+import json
+import random
+
+import pytest
+
+from app import event_handler_registry
+from models.wsp_schemas import WSPEvent
+
+from tests.helpers import connect
+
+
+@pytest.fixture
+def roll_three(monkeypatch):
+    """Dice of 1 and 2, which take a player on the start space to the unowned Tech Debt Drive."""
+    dice = iter([1, 2])
+    monkeypatch.setattr(random, "randint", lambda low, high: next(dice))
+
+
+async def move(ws, game_id: str, user_id: str) -> list:
+    ws.sent.clear()
+    response = await event_handler_registry.handle_event(
+        ws, user_id, game_id, WSPEvent(event="monopolyMove", data={"userId": user_id, "onlineGameId": game_id})
+    )
+    assert response is None
+    return [json.loads(frame) for frame in ws.sent]
+
+
+async def test_batching_client_receives_one_frame_per_move(two_player_game, roll_three):
+    game_id = two_player_game.game_id
+    ws = await connect(game_id, "alice", batchFrames=True)
+
+    batch, = await move(ws, game_id, "alice")
+
+    assert batch["event"] == "batch"
+    events = batch["data"]["events"]
+    assert sorted(event["event"] for event in events) == ["showDialog", "stateUpdate"]
+    dialog = next(event for event in events if event["event"] == "showDialog")
+    assert dialog["data"]["promptType"] == "askPurchaseProperty"
+
+
+async def test_client_without_batching_receives_separate_frames(two_player_game, roll_three):
+    game_id = two_player_game.game_id
+    ws = await connect(game_id, "alice")
+
+    frames = await move(ws, game_id, "alice")
+
+    assert sorted(frame["event"] for frame in frames) == ["showDialog", "stateUpdate"]
@@ -0,0 +1,96 @@
+import pickle
+
+from config.board_loader import BoardRegistry, _schema_hash, load_board
+from config.config import BOARD_PATH, DEFAULT_BOARD_VARIANT
+
+
+def write_board(tmp_path, name: str = "board.jsonl"):
+    path = tmp_path / name
+    path.write_bytes(BOARD_PATH.read_bytes())
+    return path
+
+
+def test_board_is_read_from_its_cache(tmp_path):
+    path = write_board(tmp_path)
+    cache_dir = tmp_path / "cache"
+    board = load_board(path, cache_dir=cache_dir)
+
+    cache_path, = cache_dir.glob("*.pickle")
+    assert cache_path.name == f"board-{board.hash}-{_schema_hash()}.pickle"
+    spaces = pickle.loads(cache_path.read_bytes())
+    spaces[0] = spaces[0].model_copy(update={"name": "From the cache"})
+    cache_path.write_bytes(pickle.dumps(spaces))
+
+    assert load_board(path, cache_dir=cache_dir).spaces[0].name == "From the cache"
+
+
+def test_cache_of_other_board_models_is_not_read(tmp_path):
+    path = write_board(tmp_path)
+    cache_dir = tmp_path / "cache"
+    board = load_board(path, cache_dir=cache_dir)
+    # Written by a version of the models that no longer matches
+    (cache_dir / f"board-{board.hash}-00000000.pickle").write_bytes(pickle.dumps(["stale"]))
+
+    assert load_board(path, cache_dir=cache_dir).spaces == board.spaces
+
+
+def test_unreadable_cache_is_a_miss(tmp_path):
+    path = write_board(tmp_path)
+    cache_dir = tmp_path / "cache"
+    board = load_board(path, cache_dir=cache_dir)
+    cache_path, = cache_dir.glob("*.pickle")
+    cache_path.write_bytes(pickle.dumps(board.spaces)[:-10])
+
+    assert load_board(path, cache_dir=cache_dir).spaces == board.spaces
+    assert pickle.loads(cache_path.read_bytes()) == list(board.spaces)
+
+
+def variant_registry(tmp_path) -> BoardRegistry:
+    variants_dir = tmp_path / "boards"
+    variants_dir.mkdir()
+    write_board(variants_dir, "speed_run.jsonl")
+    return BoardRegistry(default_path=write_board(tmp_path), variants_dir=variants_dir)
+
+
+def test_variants_are_found_by_id_and_hash(tmp_path):
+    registry = variant_registry(tmp_path)
+
+    assert registry.variants() == [DEFAULT_BOARD_VARIANT, "speed_run"]
+    board = registry.get("speed_run")
+    assert board.variant == "speed_run"
+    assert registry.get_by_hash(board.hash).hash == board.hash
+    assert registry.get("missing") is None
+
+
+async def test_reload_swaps_only_changed_boards(tmp_path):
+    registry = variant_registry(tmp_path)
+    default_board = registry.get()
+    old_board = registry.get("speed_run")
+    assert not await registry.reload()
+
+    path = tmp_path / "boards" / "speed_run.jsonl"
+    path.write_bytes(path.read_bytes().replace(b"Legacy Code Lane", b"Legacy Code Avenue", 1))
+    assert await registry.reload()
+
+    new_board = registry.get("speed_run")
+    assert new_board is not old_board
+    assert registry.get_by_hash(new_board.hash) is new_board
+    assert registry.get() is default_board
+    # Games created before the reload keep the board they were created with
+    assert old_board.spaces[1].name == "Legacy Code Lane"
+    assert new_board.spaces[1].name == "Legacy Code Avenue"
+
+
+async def test_removed_variant_is_dropped_on_reload(tmp_path):
+    registry = variant_registry(tmp_path)
+    registry.get()
+    (tmp_path / "boards" / "speed_run.jsonl").unlink()
+
+    assert await registry.reload()
+    assert registry.variants() == [DEFAULT_BOARD_VARIANT]
+
+
+async def test_session_in_unknown_variant_is_refused(game_id, send):
+    response = await send(game_id, "alice", "sessionInit", {"userId": "alice", "boardVariant": "missing"})
+
+    assert response.error == "invalidBoardVariant"
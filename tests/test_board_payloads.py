@@ -0,0 +1,54 @@
+import json
+
+from core.wsp_helpers import ShowDialog
+from models.board_models import PropertySpace
+
+from tests.helpers import connect
+
+DYNAMIC_SPACE_FIELDS = {"space_index", "owned_by", "hotels", "occupied_by"}
+
+
+def frames(ws) -> list:
+    return [json.loads(frame) for frame in ws.sent]
+
+
+async def test_stale_board_hash_receives_the_board_definition(two_player_game):
+    ws = await connect(two_player_game.game_id, "bob", boardHash="stale")
+
+    board_definition, state_update = frames(ws)
+    assert board_definition["event"] == "boardDefinition"
+    assert board_definition["data"]["boardHash"] == two_player_game.board.hash
+    assert board_definition["data"]["board"] == list(two_player_game.board.static_spaces)
+    # The client caches the board from then on
+    assert state_update["event"] == "stateUpdate"
+    assert "game_board" not in state_update["data"]["state"]
+
+
+async def test_cached_board_receives_only_dynamic_fields(two_player_game):
+    game_id = two_player_game.game_id
+    ws = await connect(game_id, "alice", boardHash=two_player_game.board.hash)
+    space = next(space for space in two_player_game.game_board if isinstance(space, PropertySpace))
+    await ShowDialog(game_id=game_id, user_id="alice").alert(space=space, message="Nice view")
+
+    state_update, dialog = frames(ws)
+    assert state_update["event"] == "stateUpdate"
+    state = state_update["data"]["state"]
+    assert "game_board" not in state
+    assert {space["space_index"] for space in state["spaces"]} == {0}  # Only the occupied start space
+    assert all(set(space) <= DYNAMIC_SPACE_FIELDS for space in state["spaces"])
+    assert dialog["event"] == "showDialog"
+    assert set(dialog["data"]["space"]) == DYNAMIC_SPACE_FIELDS
+
+
+async def test_client_without_a_board_hash_receives_the_full_board(two_player_game):
+    game_id = two_player_game.game_id
+    ws = await connect(game_id, "alice")
+    space = next(space for space in two_player_game.game_board if isinstance(space, PropertySpace))
+    await ShowDialog(game_id=game_id, user_id="alice").alert(space=space, message="Nice view")
+
+    state_update, dialog = frames(ws)
+    board = state_update["data"]["state"]["game_board"]
+    assert len(board) == len(two_player_game.board.spaces)
+    assert board[space.space_index]["name"] == space.name
+    assert "spaces" not in state_update["data"]["state"]
+    assert dialog["data"]["space"]["name"] == space.name
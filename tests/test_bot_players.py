@@ -0,0 +1,42 @@
+from core.bot_players import BOT_ID_PREFIX, get_bot_manager
+from core.turn_deadlines import get_turn_deadlines
+from models.events import PassedOnProperty
+
+from tests.helpers import move_to_property
+
+
+async def test_players_add_bots_up_to_the_seat_limit(two_player_game, send):
+    game_id = two_player_game.game_id
+
+    assert await send(game_id, "alice", "addBot") is None
+    assert await send(game_id, "alice", "addBot") is None
+    response = await send(game_id, "alice", "addBot")
+
+    assert response.error == "gameFull"
+    assert len(two_player_game.player_states) == 4
+    assert len(get_bot_manager().get_bots(game_id)) == 2
+
+
+async def test_only_players_add_bots(two_player_game, send):
+    response = await send(two_player_game.game_id, "mallory", "addBot")
+
+    assert response.error == "notInGame"
+    assert not any(user_id.startswith(BOT_ID_PREFIX) for user_id in two_player_game.player_states)
+
+
+async def test_bot_taking_over_mid_turn_answers_the_open_dialog(two_player_game):
+    game_id = two_player_game.game_id
+    turn_deadlines = get_turn_deadlines()
+    space_index = move_to_property(two_player_game, "alice")
+    turn_deadlines.open_dialog(
+        game_id, "alice", "askPurchaseProperty", PassedOnProperty(game_id=game_id, user_id="alice", space_index=space_index), 30
+    )
+
+    bot_manager = get_bot_manager()
+    bot_manager.take_over(game_id, "alice")
+    await bot_manager.play_turns(game_id)
+
+    assert two_player_game.player_states["alice"].position == space_index
+    assert "alice" not in turn_deadlines.open_dialogs(game_id)
+    assert two_player_game.current_turn_uid == "bob"
+    bot_manager.release(game_id, "alice")
@@ -0,0 +1,123 @@
+import asyncio
+from dataclasses import dataclass
+
+from core.state_manager import get_state_manager
+from core.turn_deadlines import get_turn_deadlines
+from core.wsp_helpers import _state_variant_event
+from models.commands import ModifyFunds
+from models.events import GameEvent, PassedOnProperty, PayedRent, PlayerRollDice
+from utils.event_bus import DefaultPhase, get_event_bus
+from utils.metrics import get_metrics
+
+from tests.helpers import move_to_property
+
+
+def open_purchase_dialog(game_state, user_id: str) -> int:
+    space_index = move_to_property(game_state, user_id)
+    get_turn_deadlines().open_dialog(
+        game_state.game_id,
+        user_id,
+        "askPurchaseProperty",
+        PassedOnProperty(game_id=game_state.game_id, user_id=user_id, space_index=space_index),
+        30
+    )
+    return space_index
+
+
+async def test_state_updates_carry_the_version(two_player_game):
+    event = _state_variant_event(two_player_game, "full", 1, {})
+    assert event.data["version"] == two_player_game.version
+
+
+async def test_every_change_moves_the_version(two_player_game):
+    version = two_player_game.version
+    get_state_manager().apply(ModifyFunds(game_id=two_player_game.game_id, user_id="alice", money_dollars=10))
+    assert two_player_game.version == version + 1
+
+    get_state_manager().add_player(two_player_game.game_id, "carol")
+    assert two_player_game.version == version + 2
+
+
+async def test_stale_answer_is_rejected_and_dialog_stays_open(two_player_game, send):
+    game_id = two_player_game.game_id
+    space_index = open_purchase_dialog(two_player_game, "alice")
+    seen_version = two_player_game.version
+    # A concurrent change the client's decision didn't account for
+    get_state_manager().apply(ModifyFunds(game_id=game_id, user_id="alice", money_dollars=-100))
+
+    response = await send(game_id, "alice", "buyProperty", {"version": seen_version})
+    assert response.error == "staleState"
+    assert two_player_game.owner_of(space_index) is None
+    assert two_player_game.current_turn_uid == "alice"
+
+    assert await send(game_id, "alice", "buyProperty", {"version": two_player_game.version}) is None
+    assert two_player_game.owner_of(space_index) == "alice"
+
+
+async def test_stale_move_is_rejected(two_player_game, send):
+    game_id = two_player_game.game_id
+    stale_version = two_player_game.version - 1
+
+    response = await send(game_id, "alice", "monopolyMove", {"version": stale_version})
+    assert response.error == "staleState"
+    assert two_player_game.player_states["alice"].position == 0
+
+
+async def test_event_decided_on_a_stale_version_is_rejected(two_player_game):
+    game_id = two_player_game.game_id
+    event_bus = get_event_bus()
+    metrics = get_metrics()
+    rejected = metrics.get("event_bus.rejected")
+    money = {user_id: user_state.money_dollars for user_id, user_state in two_player_game.player_states.items()}
+
+    stale = PayedRent(game_id=game_id, user_id="alice", version=two_player_game.version, opponent_id="bob", rent_dollars=50)
+    # Applied first, e.g. the default of the dialog the stale answer was meant for
+    await event_bus.publish(DefaultPhase.INPUT, PayedRent(game_id=game_id, user_id="alice", opponent_id="bob", rent_dollars=10))
+    await event_bus.publish(DefaultPhase.INPUT, stale)
+    await event_bus.process_all_phases(game_id)
+
+    assert metrics.get("event_bus.rejected") == rejected + 1
+    assert two_player_game.player_states["alice"].money_dollars == money["alice"] - 10
+    assert two_player_game.player_states["bob"].money_dollars == money["bob"] + 10
+    assert two_player_game.current_turn_uid == "bob"
+
+
+async def test_listener_derived_commands_are_derived_again_on_conflict(two_player_game):
+    game_id = two_player_game.game_id
+    event_bus = get_event_bus()
+    metrics = get_metrics()
+    retries = metrics.get("event_bus.retries")
+    rejected = metrics.get("event_bus.rejected")
+
+    # Both listeners read the same version, the roll's move conflicts with the rent applied before it
+    await event_bus.publish(DefaultPhase.INPUT, PayedRent(game_id=game_id, user_id="alice", opponent_id="bob", rent_dollars=10))
+    await event_bus.publish(DefaultPhase.INPUT, PlayerRollDice(game_id=game_id, user_id="bob", dice_roll=3))
+    await event_bus.process_all_phases(game_id)
+
+    assert metrics.get("event_bus.retries") == retries + 1
+    assert metrics.get("event_bus.rejected") == rejected
+    assert two_player_game.player_states["bob"].position == 3
+
+
+@dataclass(frozen=True, slots=True, kw_only=True)
+class Suspending(GameEvent):
+    ...
+
+
+async def test_games_processed_concurrently_run_only_their_own_events(game_id):
+    event_bus = get_event_bus()
+    ran = []
+
+    @event_bus.on(Suspending)
+    async def on_suspending(event):
+        await asyncio.sleep(0)  # E.g. sending a dialog outside a batch
+        ran.append(event.game_id)
+
+    other_game_id = f"{game_id}-other"
+    for gid in (game_id, game_id, other_game_id):
+        await event_bus.publish(DefaultPhase.INPUT, Suspending(game_id=gid, user_id="alice"))
+
+    await asyncio.gather(event_bus.process_all_phases(game_id), event_bus.process_all_phases(other_game_id))
+
+    assert sorted(ran) == sorted([game_id, game_id, other_game_id])
+    assert game_id not in event_bus.queues and other_game_id not in event_bus.queues
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from core.game_migration import GameMigrator, _decode_event, decode_snapshot, restore_game, snapshot_game
+from core.inbound_dispatcher import get_inbound_dispatcher
+from core.replay_buffer import get_replay_buffers
+from core.state_manager import get_state_manager
+from core.turn_deadlines import get_turn_deadlines
+from models.commands import BuyProperty, ModifyFunds
+from models.events import PassedOnProperty
+from utils.event_bus import DefaultPhase
+
+from tests.helpers import move_to_property
+
+
+def game_fields(game_state) -> dict:
+    return {
+        "players": {user_id: user_state.model_dump() for user_id, user_state in game_state.player_states.items()},
+        "board": game_state.board.hash,
+        "owners": dict(game_state.owners),
+        "hotels": dict(game_state.hotels),
+        "occupants": dict(game_state.occupants),
+        "turn_order": list(game_state.turn_order),
+        "current_turn": game_state.current_turn,
+        "current_turn_uid": game_state.current_turn_uid,
+        "version": game_state.version
+    }
+
+
+def test_snapshot_round_trip(two_player_game):
+    game_id = two_player_game.game_id
+    space_index = move_to_property(two_player_game, "alice")
+    get_state_manager().apply(BuyProperty(game_id=game_id, user_id="alice", space_index=space_index))
+    passed = PassedOnProperty(game_id=game_id, user_id="bob", space_index=space_index, version=two_player_game.version)
+
+    snapshot = decode_snapshot(snapshot_game(
+        two_player_game, [(DefaultPhase.INPUT, passed)], ["bob"], 7, ("bob", passed, 12.5), {"bob": "askPurchaseProperty"}
+    ))
+    restored = restore_game(snapshot)
+
+    assert restored is not two_player_game
+    assert game_fields(restored) == game_fields(two_player_game)
+    assert restored.owners[space_index] == "alice"
+    assert snapshot["bots"] == ["bob"]
+    assert snapshot["lastSeq"] == 7
+    phase_name, *encoded = snapshot["pendingEvents"][0]
+    assert (phase_name, _decode_event(encoded)) == ("INPUT", passed)
+    user_id, default_event, seconds_left = snapshot["deadline"]
+    assert (user_id, _decode_event(default_event), seconds_left) == ("bob", passed, 12.5)
+    assert snapshot["dialogs"] == {"bob": "askPurchaseProperty"}
+
+
+def test_unreadable_snapshot_raises_value_error():
+    with pytest.raises(ValueError):
+        decode_snapshot(b"not a snapshot")
+
+
+async def test_handed_off_game_is_adopted_with_its_dialog(two_player_game, tmp_path):
+    game_id = two_player_game.game_id
+    state_manager = get_state_manager()
+    turn_deadlines = get_turn_deadlines()
+    space_index = move_to_property(two_player_game, "alice")
+    turn_deadlines.open_dialog(
+        game_id, "alice", "askPurchaseProperty", PassedOnProperty(game_id=game_id, user_id="alice", space_index=space_index), 30
+    )
+    last_seq = get_replay_buffers().get(game_id).record_state_update()
+    before = game_fields(two_player_game)
+
+    migrator = GameMigrator(handoff_dir=tmp_path)
+    assert await migrator.migrate_game(game_id)
+    assert state_manager.get_game_state(game_id) is None
+    assert turn_deadlines.pending(game_id) is None
+
+    successor = GameMigrator(handoff_dir=tmp_path)
+    adopted = await successor.adopt(game_id)
+
+    assert adopted is state_manager.get_game_state(game_id)
+    assert game_fields(adopted) == before
+    assert get_replay_buffers().get(game_id).last_seq == last_seq
+    assert turn_deadlines.open_dialogs(game_id) == {"alice": "askPurchaseProperty"}
+    deadline_user_id, default_event, seconds_left = turn_deadlines.pending(game_id)
+    assert (deadline_user_id, default_event.space_index) == ("alice", space_index)
+    assert 0 < seconds_left <= 30
+    assert not list(tmp_path.iterdir())  # The snapshot was consumed
+    assert await successor.adopt(game_id) is None
+
+
+async def test_drain_hands_off_a_game_after_its_queued_events(two_player_game, tmp_path):
+    game_id = two_player_game.game_id
+    state_manager = get_state_manager()
+    money = two_player_game.player_states["alice"].money_dollars
+    release = asyncio.Event()
+
+    async def queued_event() -> None:
+        await release.wait()
+        state_manager.apply(ModifyFunds(game_id=game_id, user_id="alice", money_dollars=-100))
+
+    get_inbound_dispatcher().dispatch(game_id, queued_event)
+    drained = asyncio.ensure_future(GameMigrator(handoff_dir=tmp_path).drain(successor_url=None))
+    await asyncio.sleep(0)
+    assert state_manager.get_game_state(game_id) is two_player_game  # Waiting behind the queued event
+
+    release.set()
+    assert await drained >= 1
+
+    snapshot = decode_snapshot((tmp_path / f"{game_id}.snapshot").read_bytes())
+    alice = next(player for player in snapshot["players"] if player["user_id"] == "alice")
+    assert alice["money_dollars"] == money - 100
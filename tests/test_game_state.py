@@ -0,0 +1,54 @@
+from core.state_manager import get_state_manager
+from models.commands import BuyProperty, ModifyFunds
+from utils.metrics import get_metrics
+
+from tests.helpers import move_to_property
+
+
+def cache_lookups() -> tuple:
+    metrics = get_metrics()
+    return metrics.get("serialization_cache.hits"), metrics.get("serialization_cache.misses")
+
+
+def test_funds_change_re_encodes_only_the_player(two_player_game):
+    before = two_player_game.to_dict()
+    hits, misses = cache_lookups()
+
+    get_state_manager().apply(ModifyFunds(game_id=two_player_game.game_id, user_id="alice", money_dollars=-100))
+    after = two_player_game.to_dict()
+
+    space_count = len(two_player_game.board.spaces)
+    assert cache_lookups() == (hits + space_count + 1, misses + 1)
+    assert after["player_states"]["alice"] is not before["player_states"]["alice"]
+    assert after["player_states"]["alice"]["money_dollars"] == before["player_states"]["alice"]["money_dollars"] - 100
+    assert after["player_states"]["bob"] is before["player_states"]["bob"]
+    assert all(new is old for new, old in zip(after["game_board"], before["game_board"]))
+
+
+def test_purchase_re_encodes_only_the_buyer_and_the_space(two_player_game):
+    space_index = move_to_property(two_player_game, "alice")
+    before = two_player_game.to_dict()
+    hits, misses = cache_lookups()
+
+    get_state_manager().apply(BuyProperty(game_id=two_player_game.game_id, user_id="alice", space_index=space_index))
+    after = two_player_game.to_dict()
+
+    space_count = len(two_player_game.board.spaces)
+    assert cache_lookups() == (hits + space_count - 1 + 1, misses + 2)
+    assert after["game_board"][space_index]["owned_by"] == "alice"
+    assert after["player_states"]["bob"] is before["player_states"]["bob"]
+    assert [index for index, (new, old) in enumerate(zip(after["game_board"], before["game_board"])) if new is not old] == [space_index]
+
+
+def test_dynamic_payload_re_encodes_only_the_changed_space(two_player_game):
+    space_index = move_to_property(two_player_game, "alice")
+    before = two_player_game.to_dynamic_dict()
+    hits, misses = cache_lookups()
+
+    get_state_manager().apply(BuyProperty(game_id=two_player_game.game_id, user_id="alice", space_index=space_index))
+    after = two_player_game.to_dynamic_dict()
+
+    # The start space (bob) and the bought space (alice) have dynamic state, of the players only alice changed
+    assert cache_lookups() == (hits + 1 + 1, misses + 1 + 1)
+    assert {space["space_index"]: space["owned_by"] for space in after["spaces"] if "owned_by" in space} == {space_index: "alice"}
+    assert after["spaces"][0] is before["spaces"][0]
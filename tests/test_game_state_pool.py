@@ -0,0 +1,62 @@
+from config.board_loader import get_board
+from core.game_state_pool import GameStatePool
+from core.state_manager import get_state_manager
+from models.board_models import Board
+from models.commands import BuyProperty
+from models.game_state import GameState
+
+from tests.helpers import move_to_property
+
+
+def test_refill_builds_warm_states_that_are_acquired():
+    board = get_board()
+    pool = GameStatePool(size=2, refill_batch=8)
+
+    assert pool.refill() == 2
+    assert len(pool) == 2
+    idle = pool.idle_states()
+
+    game_state = pool.acquire("pooled-game", board)
+    assert game_state in idle
+    assert game_state.game_id == "pooled-game"
+    assert game_state.warm() == 0  # Every fragment was built ahead
+    assert len(pool) == 1
+
+
+def test_acquire_from_an_empty_pool_builds_a_state():
+    pool = GameStatePool(size=2)
+
+    game_state = pool.acquire("fresh-game", get_board())
+
+    assert game_state.game_id == "fresh-game"
+    assert len(pool) == 0
+
+
+def test_ended_game_is_recycled_empty(two_player_game, game_id):
+    state_manager = get_state_manager()
+    ended_id = two_player_game.game_id
+    space_index = move_to_property(two_player_game, "alice")
+    state_manager.apply(BuyProperty(game_id=ended_id, user_id="alice", space_index=space_index))
+    two_player_game.to_dict()  # Caches the fragments of the owned and occupied spaces
+
+    state_manager.remove_state(ended_id)
+    new_game = state_manager.create_state(f"{game_id}-next")
+
+    assert new_game is two_player_game
+    assert new_game.game_id == f"{game_id}-next"
+    assert new_game.player_states == {}
+    assert new_game.owners == {} and new_game.occupants == {}
+    assert new_game.space_fragment(space_index)["visual_properties"]["occupied_by"] == []
+    assert new_game.space_fragment(space_index, dynamic_only=True)["owned_by"] is None
+    assert ended_id not in state_manager.get_user_games("alice")
+
+
+def test_states_of_a_reloaded_board_are_not_recycled():
+    pool = GameStatePool(size=2)
+    # A board with the current hash that the registry no longer holds, as after a reload
+    board = get_board()
+    stale_board = Board.from_spaces(board.variant, board.hash, list(board.spaces))
+
+    pool.release(GameState(game_id="ended-game", player_states={}, board=stale_board))
+
+    assert len(pool) == 0
@@ -0,0 +1,54 @@
+import asyncio
+
+import core.event_handlers
+from app import event_handler_registry
+from core.inbound_dispatcher import InboundDispatcher, get_inbound_dispatcher
+from core.state_manager import get_state_manager
+from models.wsp_schemas import WSPEvent
+
+from tests.helpers import FakeConnection
+
+
+async def test_jobs_of_one_key_run_in_order_and_keys_run_concurrently():
+    dispatcher = InboundDispatcher()
+    release = asyncio.Event()
+    ran = []
+
+    async def slow():
+        await release.wait()
+        ran.append("game-1 first")
+
+    async def record(name):
+        ran.append(name)
+
+    first = dispatcher.dispatch("game-1", slow)
+    second = dispatcher.dispatch("game-1", lambda: record("game-1 second"))
+    other = dispatcher.dispatch("game-2", lambda: record("game-2"))
+
+    await other
+    assert ran == ["game-2"]
+    release.set()
+    await asyncio.gather(first, second)
+    assert ran == ["game-2", "game-1 first", "game-1 second"]
+    assert len(dispatcher) == 0
+
+
+async def test_quick_join_initializes_the_session_in_the_games_queue(game_id, monkeypatch):
+    game_state = get_state_manager().create_state(game_id)
+
+    async def join(user_id: str, variant: str) -> str:
+        return game_id
+    monkeypatch.setattr(core.event_handlers.matchmaker, "join", join)
+
+    release = asyncio.Event()
+    queued = get_inbound_dispatcher().dispatch(game_id, release.wait)
+    quick_join = asyncio.create_task(event_handler_registry.handle_event(
+        FakeConnection(), "carol", None, WSPEvent(event="quickJoin", data={"userId": "carol", "sessionId": "session"})
+    ))
+
+    await asyncio.sleep(0.01)
+    assert "carol" not in game_state.player_states
+
+    release.set()
+    await asyncio.gather(queued, quick_join)
+    assert "carol" in game_state.player_states
@@ -0,0 +1,46 @@
+import logging
+
+from utils.logger import get_logger, log_context, sampled, set_sample_rate
+
+
+def debug_record(logger: logging.Logger, game_id: str | None) -> logging.LogRecord:
+    return logger.makeRecord(logger.name, logging.DEBUG, __file__, 0, "Details", (), None, extra=log_context(game_id=game_id))
+
+
+async def test_game_log_level_lowers_only_that_games_records(game_id, send, admin_token):
+    logger = get_logger("state_manager")
+    assert logger.level == logging.INFO
+
+    response = await send(game_id, "alice", "setLogLevel", {"adminToken": admin_token, "gameId": game_id, "level": "DEBUG"})
+
+    assert response.event == "logLevels"
+    assert response.data["games"] == {game_id: "DEBUG"}
+    assert response.data["loggers"]["state_manager"] == "INFO"
+    assert logger.level == logging.DEBUG
+    assert logger.filter(debug_record(logger, game_id))
+    assert not logger.filter(debug_record(logger, f"{game_id}-other"))
+    assert not logger.filter(debug_record(logger, None))
+    # Nor are its records sampled
+    set_sample_rate("test.dropped", 0)
+    assert sampled("test.dropped", game_id)
+    assert not sampled("test.dropped", f"{game_id}-other")
+
+    await send(game_id, "alice", "setLogLevel", {"adminToken": admin_token, "gameId": game_id, "level": None})
+    assert logger.level == logging.INFO
+    assert not logger.filter(debug_record(logger, game_id))
+
+
+async def test_log_levels_require_the_admin_token(game_id, send, admin_token):
+    response = await send(game_id, "alice", "setLogLevel", {"adminToken": "guess", "level": "DEBUG"})
+
+    assert response.error == "unauthorized"
+    assert get_logger("state_manager").level == logging.INFO
+
+
+def test_sampled_keeps_the_configured_share():
+    set_sample_rate("test.quarter", 0.25)
+    set_sample_rate("test.none", 0)
+
+    assert [sampled("test.quarter") for _ in range(8)] == [False, False, False, True] * 2
+    assert not any(sampled("test.none") for _ in range(8))
+    assert all(sampled("test.unconfigured") for _ in range(8))
@@ -0,0 +1,53 @@
+import asyncio
+
+import core.event_handlers
+from core.matchmaking import MATCHMADE_GAME_PREFIX, Lobby, Matchmaker
+
+
+def test_lobby_offers_the_oldest_of_the_fullest_games():
+    lobby = Lobby(seats_per_game=4)
+    lobby.set_free_seats("old-empty", 4)
+    lobby.set_free_seats("old-half", 2)
+    lobby.set_free_seats("new-half", 2)
+    lobby.set_free_seats("full", 0)
+
+    assert lobby.fullest_open_game() == ("old-half", 2)
+    assert len(lobby) == 3
+
+
+async def test_a_burst_of_joins_fills_games_before_creating_more():
+    matchmaker = Matchmaker(seats_per_game=4, batch_interval=0)
+    game_ids = await asyncio.gather(*(matchmaker.join(f"player-{i}", "default") for i in range(6)))
+
+    assert all(game_id.startswith(MATCHMADE_GAME_PREFIX) for game_id in game_ids)
+    assert [game_ids.count(game_id) for game_id in dict.fromkeys(game_ids)] == [4, 2]
+
+    late_game_id = await matchmaker.join("late", "default")
+    assert late_game_id == game_ids[-1]
+
+
+async def test_cancelled_join_takes_no_seat():
+    matchmaker = Matchmaker(seats_per_game=4, batch_interval=0.01)
+    cancelled = asyncio.ensure_future(matchmaker.join("leaver", "default"))
+    staying = asyncio.ensure_future(matchmaker.join("stayer", "default"))
+    await asyncio.sleep(0)
+
+    matchmaker.cancel("leaver")
+
+    assert await cancelled is None
+    game_id = await staying
+    assert matchmaker._lobby("default").free_seats(game_id) == 3
+
+
+async def test_direct_joins_take_matchmade_seats(monkeypatch, send):
+    matchmaker = Matchmaker(seats_per_game=2, batch_interval=0)
+    monkeypatch.setattr(core.event_handlers, "matchmaker", matchmaker)
+    game_id = await matchmaker.join("alice", "default")
+
+    assert await send(game_id, "bob", "onlineGame", {"userId": "bob", "onlineGameId": game_id}) is None
+    assert matchmaker._lobby("default").free_seats(game_id) == 0
+
+    response = await send(game_id, "carol", "onlineGame", {"userId": "carol", "onlineGameId": game_id})
+    assert response.error == "gameFull"
+    # A player already seated rejoins their own seat
+    assert await send(game_id, "bob", "onlineGame", {"userId": "bob", "onlineGameId": game_id}) is None
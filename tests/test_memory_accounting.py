@@ -0,0 +1,65 @@
+import tracemalloc
+
+from core.memory_accounting import get_heap_profiler
+
+
+async def test_memory_report_splits_games_players_and_subsystems(two_player_game, send, admin_token):
+    game_id = two_player_game.game_id
+
+    response = await send(game_id, "alice", "getMemoryReport", {"adminToken": admin_token})
+
+    assert response.event == "memoryReport"
+    report, = response.data["games"].values()
+    assert list(response.data["games"]) == [game_id]
+    assert set(report["players"]) == {"alice", "bob"}
+    assert all(size > 0 for size in report["players"].values())
+    parts = ("boardStateBytes", "gameStateBytes", "ownershipIndexBytes", "replayBufferBytes", "writeBufferBytes")
+    assert report["totalBytes"] == sum(report["players"].values()) + sum(report[part] for part in parts)
+    subsystems = response.data["subsystems"]
+    assert subsystems["stateManagerBytes"] > 0 and subsystems["boardDefinitionBytes"] > 0
+    assert subsystems["games"] >= 1 and subsystems["seats"] >= 2
+
+
+async def test_memory_report_of_every_game(two_player_game, send, admin_token):
+    response = await send(None, "alice", "getMemoryReport", {"adminToken": admin_token})
+
+    assert two_player_game.game_id in response.data["games"]
+
+
+async def test_memory_report_requires_the_admin_token(two_player_game, send, admin_token):
+    response = await send(two_player_game.game_id, "alice", "getMemoryReport", {"adminToken": "guess"})
+    assert response.error == "unauthorized"
+
+    response = await send("missing-game", "alice", "getMemoryReport", {"adminToken": admin_token})
+    assert response.error == "invalidGame"
+
+
+async def test_heap_profile_cycle_leaves_tracing_stopped(send, admin_token):
+    async def heap_profile(action: str):
+        return await send(None, "admin", "heapProfile", {"adminToken": admin_token, "action": action, "limit": 50})
+
+    try:
+        started = await heap_profile("start")
+        assert started.data["tracing"] and tracemalloc.is_tracing()
+
+        retained = [bytes(1024) for _ in range(1000)]
+        top = await heap_profile("top")
+        assert top.data["sites"]
+        diff = await heap_profile("diff")
+        grown = [site for site in diff.data["sites"] if __file__ in site["site"]]
+        assert grown and grown[0]["sizeDiffBytes"] >= 1024 * 1000
+        del retained
+
+        stopped = await heap_profile("stop")
+        assert not stopped.data["tracing"]
+        assert not tracemalloc.is_tracing()
+        assert (await heap_profile("diff")).error == "invalidHeapProfileAction"
+    finally:
+        get_heap_profiler().stop()
+
+
+async def test_heap_profile_requires_the_admin_token(send, admin_token):
+    response = await send(None, "admin", "heapProfile", {"adminToken": "guess", "action": "start"})
+
+    assert response.error == "unauthorized"
+    assert not tracemalloc.is_tracing()
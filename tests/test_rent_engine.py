@@ -0,0 +1,55 @@
+from config.board_loader import get_board
+from core.rent_engine import CLOUD_PROVIDER_GROUP, CLOUD_PROVIDER_RENTS, UTILITY_GROUP, UTILITY_RENTS, get_rent_table
+from core.state_manager import get_state_manager
+
+
+def test_shipped_board_groups():
+    rent_table = get_rent_table(get_board())
+
+    assert rent_table.group_sizes[CLOUD_PROVIDER_GROUP] == len(CLOUD_PROVIDER_RENTS) == 4
+    assert rent_table.group_sizes[UTILITY_GROUP] == len(UTILITY_RENTS) == 2
+    assert rent_table.groups[35] == CLOUD_PROVIDER_GROUP
+    assert {rent_table.groups[space_index] for space_index in (12, 28)} == {UTILITY_GROUP}
+    assert rent_table.group_sizes["brown"] == rent_table.group_sizes["blue"] == 2
+    assert rent_table.group_sizes["light_blue"] == 3
+
+
+def test_cloud_provider_rent_grows_with_the_group(two_player_game):
+    game_id = two_player_game.game_id
+    state_manager = get_state_manager()
+    index = state_manager.get_ownership_index(game_id)
+
+    for owned, space_index in enumerate((5, 15, 25, 35), start=1):
+        two_player_game.set_owner(space_index, "bob")
+        index.add("bob", space_index)
+        assert state_manager.get_rent(game_id, 5) == CLOUD_PROVIDER_RENTS[owned - 1]
+    assert index.has_monopoly("bob", CLOUD_PROVIDER_GROUP)
+
+
+def test_monopoly_doubles_base_rent(two_player_game):
+    game_id = two_player_game.game_id
+    state_manager = get_state_manager()
+    index = state_manager.get_ownership_index(game_id)
+    base_rent = get_rent_table(two_player_game.board).base_rent(1)
+
+    for space_index in (1, 3):
+        two_player_game.set_owner(space_index, "bob")
+        index.add("bob", space_index)
+
+    assert state_manager.get_rent(game_id, 1) == base_rent * 2
+
+
+def test_properties_of_a_removed_player_go_back_to_the_bank(two_player_game):
+    game_id = two_player_game.game_id
+    state_manager = get_state_manager()
+    index = state_manager.get_ownership_index(game_id)
+    for space_index in (1, 3):
+        two_player_game.set_owner(space_index, "bob")
+        index.add("bob", space_index)
+
+    state_manager.remove_player(game_id, "bob")
+
+    assert two_player_game.owner_of(1) is None
+    assert not index.owns("bob", 3)
+    assert not index.has_monopoly("bob", "brown")
+    assert state_manager.get_rent(game_id, 1) == 0
@@ -0,0 +1,52 @@
+import json
+
+from app import event_handler_registry
+from core.replay_buffer import ReplayBuffer, get_replay_buffers
+from models.wsp_schemas import WSPEvent
+
+from tests.helpers import FakeConnection
+
+
+def test_missed_events_are_the_users_own_and_broadcasts():
+    buffer = ReplayBuffer(maxlen=8)
+    buffer.record(WSPEvent(event="seen"))
+    last_seq = buffer.record(WSPEvent(event="seen"), "bob")
+    buffer.record(WSPEvent(event="toBob"), "bob")
+    buffer.record(WSPEvent(event="toAlice"), "alice")
+    buffer.record_state_update()
+    buffer.record(WSPEvent(event="toEveryone"))
+
+    missed_events, missed_state_update = buffer.missed_since(last_seq, "bob")
+
+    assert [event.event for event in missed_events] == ["toBob", "toEveryone"]
+    assert missed_state_update
+    assert buffer.missed_since(buffer.last_seq, "bob") == ([], False)
+
+
+def test_missed_events_fallen_out_of_the_buffer_are_none():
+    buffer = ReplayBuffer(maxlen=2)
+    for _ in range(3):
+        buffer.record(WSPEvent(event="tick"))
+
+    assert buffer.missed_since(0, "bob") is None
+    assert [event.event for event in buffer.missed_since(1, "bob")[0]] == ["tick", "tick"]
+
+
+async def test_reconnecting_player_is_replayed_what_they_missed(two_player_game):
+    game_id = two_player_game.game_id
+    buffer = get_replay_buffers().get(game_id)
+    last_seq = buffer.record(WSPEvent(event="seen"), "bob")
+    buffer.record(WSPEvent(event="showDialog", data={"promptType": "buyProperty"}), "bob")
+    buffer.record(WSPEvent(event="showDialog", data={"promptType": "payRent"}), "alice")
+    buffer.record_state_update()
+
+    ws = FakeConnection()
+    response = await event_handler_registry.handle_event(
+        ws, "bob", game_id, WSPEvent(event="sessionInit", data={"userId": "bob", "lastSeq": last_seq})
+    )
+
+    assert response is None
+    replayed = [json.loads(frame) for frame in ws.sent]
+    assert [event["event"] for event in replayed] == ["showDialog", "stateUpdate"]
+    assert replayed[0]["data"]["promptType"] == "buyProperty"
+    assert replayed[1]["seq"] == buffer.last_seq
@@ -0,0 +1,40 @@
+from core.state_manager import get_state_manager
+from utils.request_dedup import RequestDeduplicator
+
+
+async def test_retried_request_is_answered_without_running_again(two_player_game, send):
+    game_id = two_player_game.game_id
+    first = await send(game_id, "mallory", "addBot", request_id="req-1")
+    assert first.error == "notInGame"
+    assert first.request_id == "req-1"
+
+    get_state_manager().add_player(game_id, "mallory")
+    retry = await send(game_id, "mallory", "addBot", request_id="req-1")
+
+    assert retry == first
+    assert len(two_player_game.player_states) == 3
+
+
+async def test_request_id_reused_for_another_event_or_game_runs(two_player_game, send):
+    game_id = two_player_game.game_id
+    await send(game_id, "alice", "monopolyMove", request_id="req-1")
+    assert two_player_game.player_states["alice"].position != 0  # Rolled, doubles may keep the turn
+
+    assert await send(game_id, "alice", "addBot", request_id="req-1") is None
+    assert len(two_player_game.player_states) == 3
+
+    other_game = get_state_manager().create_state(f"{game_id}-other")
+    get_state_manager().add_player(other_game.game_id, "alice")
+    assert await send(other_game.game_id, "alice", "addBot", request_id="req-1") is None
+    assert len(other_game.player_states) == 2
+
+
+def test_records_are_bounded_per_user_and_in_users():
+    dedup = RequestDeduplicator(ttl=60, max_per_user=2, max_users=2)
+    for request_id in ("a", "b", "c"):
+        assert dedup.begin("alice", ("game", "event", request_id)) is None
+    assert dedup.begin("alice", ("game", "event", "a")) is None  # Forgotten, the oldest of three
+
+    dedup.begin("bob", ("game", "event", "a"))
+    dedup.begin("carol", ("game", "event", "a"))
+    assert len(dedup) == 2  # alice, the least recently active, was forgotten
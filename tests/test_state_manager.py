@@ -0,0 +1,122 @@
+from core.state_manager import get_state_manager
+from models.commands import EndTurn, ModifyFunds
+from utils.event_bus import get_event_bus
+
+
+def second_game(game_id: str):
+    state_manager = get_state_manager()
+    other = state_manager.create_state(f"{game_id}-other")
+    for user_id in ("alice", "carol"):
+        state_manager.add_player(other.game_id, user_id)
+        state_manager.place_on_board(other.game_id, user_id)
+    return other
+
+
+async def test_player_has_a_separate_state_per_game(two_player_game, send):
+    state_manager = get_state_manager()
+    game_id = two_player_game.game_id
+    other = second_game(game_id)
+
+    alice = state_manager.get_user_state(game_id, "alice")
+    other_alice = state_manager.get_user_state(other.game_id, "alice")
+    assert alice is two_player_game.player_states["alice"]
+    assert other_alice is other.player_states["alice"]
+    assert other_alice is not alice
+
+    state_manager.apply(ModifyFunds(game_id=game_id, user_id="alice", money_dollars=-100))
+    await send(game_id, "alice", "monopolyMove")
+
+    assert other_alice.money_dollars == alice.money_dollars + 100
+    assert alice.position != 0
+    assert other_alice.position == 0
+
+
+def test_leaving_one_game_keeps_the_others(two_player_game):
+    state_manager = get_state_manager()
+    game_id = two_player_game.game_id
+    other = second_game(game_id)
+    assert state_manager.get_user_games("alice")[-2:] == [game_id, other.game_id]
+
+    state_manager.remove_player(game_id, "alice")
+
+    assert state_manager.get_user_state(game_id, "alice") is None
+    assert state_manager.get_user_state(other.game_id, "alice") is other.player_states["alice"]
+    assert game_id not in state_manager.get_user_games("alice")
+    assert other.game_id in state_manager.get_user_games("alice")
+
+    state_manager.remove_state(other.game_id)
+    assert other.game_id not in state_manager.get_user_games("carol")
+    assert state_manager.get_user_state(other.game_id, "carol") is None
+
+
+def four_player_game(game_id: str, holder: str):
+    """A game of alice, bob, carol and dave in that turn order, holder holds the turn."""
+    state_manager = get_state_manager()
+    game_state = state_manager.create_state(game_id)
+    for user_id in ("alice", "bob", "carol", "dave"):
+        state_manager.add_player(game_id, user_id)
+    while game_state.current_turn_uid != holder:
+        state_manager.apply(EndTurn(game_id=game_id, user_id=game_state.current_turn_uid))
+    return game_state
+
+
+def one_round(game_state) -> list:
+    """The turn holders of a full round of EndTurns, starting with the current one."""
+    holders = []
+    for _ in game_state.turn_order:
+        holders.append(game_state.current_turn_uid)
+        get_state_manager().apply(EndTurn(game_id=game_state.game_id, user_id=game_state.current_turn_uid))
+    return holders
+
+
+async def test_out_of_turn_move_is_rejected_before_publishing(two_player_game, send, monkeypatch):
+    published = []
+
+    async def publish(phase, event) -> None:
+        published.append(event)
+
+    monkeypatch.setattr(get_event_bus(), "publish", publish)
+    version = two_player_game.version
+
+    response = await send(two_player_game.game_id, "bob", "monopolyMove")
+
+    assert response.error == "outOfTurn"
+    assert published == []
+    assert two_player_game.version == version
+    assert two_player_game.current_turn_uid == "alice"
+
+
+def test_removing_the_turn_holder_passes_the_turn_on(game_id):
+    game_state = four_player_game(game_id, holder="carol")
+
+    get_state_manager().remove_player(game_id, "carol")
+
+    assert game_state.current_turn_uid == "dave"
+    assert one_round(game_state) == ["dave", "alice", "bob"]
+
+
+def test_removing_the_last_turn_holder_wraps_to_the_first(game_id):
+    game_state = four_player_game(game_id, holder="dave")
+
+    get_state_manager().remove_player(game_id, "dave")
+
+    assert game_state.current_turn_uid == "alice"
+    assert one_round(game_state) == ["alice", "bob", "carol"]
+
+
+def test_removing_a_player_before_the_holder_keeps_the_turn(game_id):
+    game_state = four_player_game(game_id, holder="carol")
+
+    get_state_manager().remove_player(game_id, "alice")
+
+    assert game_state.current_turn_uid == "carol"
+    assert one_round(game_state) == ["carol", "dave", "bob"]
+
+
+def test_removing_a_player_after_the_holder_keeps_the_turn(game_id):
+    game_state = four_player_game(game_id, holder="bob")
+
+    get_state_manager().remove_player(game_id, "dave")
+
+    assert game_state.current_turn_uid == "bob"
+    assert one_round(game_state) == ["bob", "carol", "alice"]
@@ -0,0 +1,94 @@
+import time
+
+from core.state_manager import get_state_manager
+from core.turn_deadlines import get_turn_deadlines
+from models.events import PassedOnProperty, PayedRent
+from utils.timer_wheel import TimerWheel
+
+from tests.helpers import expire_deadlines, move_to_property
+
+
+async def test_timer_wheel_fires_due_timers_once_in_order():
+    wheel = TimerWheel(tick_seconds=0.1, slots_per_level=8, levels=3)
+    start = time.monotonic()
+    fired = []
+    wheel.schedule(0.5, fired.append, "soon")
+    wheel.schedule(20, fired.append, "cascaded")  # Beyond level 0, moves down as the wheel turns
+    cancelled = wheel.schedule(0.3, fired.append, "cancelled")
+    cancelled.cancel()
+
+    await wheel.fire(wheel.advance(start + 0.45))
+    assert fired == []
+    await wheel.fire(wheel.advance(start + 1))
+    assert fired == ["soon"]
+    await wheel.fire(wheel.advance(start + 30))
+    assert fired == ["soon", "cascaded"]
+    assert len(wheel) == 0
+
+
+async def test_turn_timeout_ends_the_turn(two_player_game):
+    deadlines = get_turn_deadlines()
+    deadlines.ensure_turn_deadline(two_player_game, bots=set())
+    assert deadlines.pending(two_player_game.game_id)[0] == "alice"
+
+    await expire_deadlines()
+    assert two_player_game.current_turn_uid == "bob"
+
+
+async def test_purchase_answered_in_time(two_player_game, send):
+    game_id = two_player_game.game_id
+    space_index = move_to_property(two_player_game, "alice")
+    get_turn_deadlines().open_dialog(
+        game_id, "alice", "askPurchaseProperty", PassedOnProperty(game_id=game_id, user_id="alice", space_index=space_index), 30
+    )
+
+    assert await send(game_id, "alice", "buyProperty") is None
+    assert two_player_game.owner_of(space_index) == "alice"
+    assert two_player_game.current_turn_uid == "bob"
+
+    # Answered once, a repeated answer has no dialog left to answer
+    response = await send(game_id, "alice", "buyProperty")
+    assert response.error == "noPendingDialog"
+
+
+async def test_late_purchase_after_default_is_rejected(two_player_game, send):
+    game_id = two_player_game.game_id
+    space_index = move_to_property(two_player_game, "alice")
+    get_turn_deadlines().open_dialog(
+        game_id, "alice", "askPurchaseProperty", PassedOnProperty(game_id=game_id, user_id="alice", space_index=space_index), 30
+    )
+
+    await expire_deadlines()
+    assert two_player_game.current_turn_uid == "bob"
+
+    response = await send(game_id, "alice", "buyProperty")
+    assert response.error == "noPendingDialog"
+    assert two_player_game.owner_of(space_index) is None
+    assert two_player_game.current_turn_uid == "bob"
+
+
+async def test_late_rent_after_default_is_charged_once(two_player_game, send):
+    game_id = two_player_game.game_id
+    space_index = move_to_property(two_player_game, "alice")
+    two_player_game.set_owner(space_index, "bob")
+    rent = get_state_manager().get_rent(game_id, space_index)
+    get_turn_deadlines().open_dialog(
+        game_id, "alice", "payRent", PayedRent(game_id=game_id, user_id="alice", opponent_id="bob", rent_dollars=rent), 30
+    )
+    money_before = two_player_game.player_states["alice"].money_dollars
+
+    await expire_deadlines()
+    response = await send(game_id, "alice", "payRentConfirmation")
+
+    assert response.error == "noPendingDialog"
+    assert two_player_game.player_states["alice"].money_dollars == money_before - rent
+    assert two_player_game.current_turn_uid == "bob"
+
+
+async def test_answer_out_of_turn_is_rejected(two_player_game, send):
+    game_id = two_player_game.game_id
+    move_to_property(two_player_game, "bob")
+
+    response = await send(game_id, "bob", "buyProperty")
+    assert response.error == "noPendingDialog"
+    assert two_player_game.current_turn_uid == "alice"
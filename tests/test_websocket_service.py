@@ -0,0 +1,49 @@
+from websockets.protocol import State
+
+from core.websocket_service import WebsocketService
+
+from tests.helpers import FakeConnection
+
+
+def test_idle_players_are_stale_but_listening_spectators_are_not():
+    service = WebsocketService()
+    player, spectator, closed = FakeConnection(), FakeConnection(), FakeConnection(State.CLOSED)
+    for ws in (player, spectator, closed):
+        assert service.admit_connection(ws)
+    service.register_websocket(player, "alice", "game")
+    service.register_spectator(spectator, "game")
+
+    stale_closed, stale_idle = service.get_stale_connections(idle_timeout=-1)
+    assert stale_closed == [closed]
+    assert stale_idle == [player]
+
+
+def test_touch_keeps_a_connection_active():
+    service = WebsocketService()
+    ws = FakeConnection()
+    service.admit_connection(ws)
+    service.touch(ws)
+
+    assert service.get_stale_connections(idle_timeout=60) == ([], [])
+
+
+def test_connection_is_registered_only_in_its_players_games():
+    service = WebsocketService()
+    ws = FakeConnection()
+    service.admit_connection(ws)
+    service.register_websocket(ws, "alice", "game")
+
+    assert service.is_registered(ws, "game")
+    assert not service.is_registered(ws, "other-game")
+
+
+def test_spectators_are_forgotten_with_their_connection():
+    service = WebsocketService()
+    spectator = FakeConnection()
+    service.admit_connection(spectator)
+    service.register_spectator(spectator, "game")
+
+    assert service.unregister_websockets([spectator]) == {}
+    assert not service.is_spectator(spectator)
+    assert service.get_spectators("game") == set()
+    assert "game" not in service._spectators_by_game
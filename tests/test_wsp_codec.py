@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from models.wsp_schemas import WSPEvent
+from utils.wsp_codec import _CODECS, JSON_ENCODING, available_encodings, decode_event, encode_event, negotiate_encoding
+
+
+@pytest.mark.parametrize("encoding", available_encodings())
+def test_events_round_trip_in_every_encoding(encoding):
+    event = WSPEvent(event="stateUpdate", data={"money": 1500, "owners": {"5": "alice"}}, seq=7, request_id="req-1")
+
+    frame = encode_event(event, encoding)
+    assert isinstance(frame, str) == (encoding == JSON_ENCODING)
+    assert encode_event(event, encoding) is frame  # Memoized
+
+    assert decode_event(frame, encoding).model_dump() == event.model_dump()
+
+
+@pytest.mark.parametrize("encoding", available_encodings())
+def test_unset_seq_and_request_id_are_left_out_of_frames(encoding):
+    event = WSPEvent(event="error", error="rateLimited")
+
+    frame = encode_event(event, encoding)
+
+    expected = {"event": "error", "data": None, "error": "rateLimited"}
+    assert (json.loads(frame) if encoding == JSON_ENCODING else _CODECS[encoding][1](frame)) == expected
+    assert event.model_dump() == expected
+    assert decode_event(frame, encoding).seq is None
+
+
+def test_copies_are_encoded_from_their_own_fields():
+    event = WSPEvent(event="stateUpdate", data={"money": 1500})
+    encode_event(event)
+
+    copied = event.model_copy(update={"seq": 3})
+    assert decode_event(encode_event(copied)).seq == 3
+
+
+def test_unsupported_offers_fall_back_to_json():
+    assert negotiate_encoding(None) == JSON_ENCODING
+    assert negotiate_encoding(["protobuf", *available_encodings()]) == available_encodings()[0]
+
+
+def test_undecodable_binary_frame_raises_value_error():
+    binary = [encoding for encoding in available_encodings() if encoding != JSON_ENCODING]
+    if not binary:
+        pytest.skip("No binary codec installed")
+    with pytest.raises(ValueError):
+        decode_event(b"\xc1", binary[0])
@@ -0,0 +1,519 @@
+import asyncio
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from config.config import (
+    BACKPLANE_MAX_PENDING_BYTES, BACKPLANE_MAX_RECONNECT_DELAY_SECONDS, BACKPLANE_REQUEST_TIMEOUT_SECONDS,
+    GAME_OWNERSHIP_TTL_SECONDS
+)
+
+from utils.logger import get_logger
+from utils.metrics import get_metrics
+
+
+log = get_logger("backplane")
+_backplane = None
+
+
+MessageCallback = Callable[[str, str], Awaitable[None]]
+"""Called with (channel, message) for every message published to a subscribed channel by another process"""
+
+
+@dataclass(frozen=True, slots=True)
+class GameOwner:
+    """The process hosting a game."""
+    origin_id: str
+    url: Optional[str]
+    """Address clients reach the process at, None if it didn't advertise one"""
+
+
+class Backplane(ABC):
+    """Pub/sub channel between server processes, and the registry of which process hosts each game.
+
+    Messages published within one flush interval are sent as a single batch per channel. Each batch carries
+    the publishing process's id and send time, so receivers skip their own messages and record the lag
+    of every channel in `backplane.lag_ms.<channel>`.
+
+    A game is hosted by exactly one process, the first to claim it. Other processes send its players there.
+
+    Use case:
+    ```
+    backplane = get_backplane()
+    owner = await backplane.claim_game("123")
+    if owner.origin_id == backplane.origin_id:
+        await backplane.subscribe("game:123", on_message)
+        backplane.publish("game:123", encoded_update)
+    ```
+    """
+
+    def __init__(self, flush_interval: float = 0.005, public_url: Optional[str] = None):
+        self.origin_id = uuid.uuid4().hex
+        self.public_url = public_url
+        self.flush_interval = flush_interval
+        self._callbacks: Dict[str, MessageCallback] = {}
+        self._outbox: Dict[str, List[str]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def start(self) -> None:
+        ...
+
+    async def close(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush()
+
+    async def subscribe(self, channel: str, callback: MessageCallback) -> None:
+        self._callbacks[channel] = callback
+
+    async def unsubscribe(self, channel: str) -> None:
+        self._callbacks.pop(channel, None)
+        metrics = get_metrics()
+        metrics.gauges.pop(f"backplane.lag_ms.{channel}", None)
+
+    def is_subscribed(self, channel: str) -> bool:
+        return channel in self._callbacks
+
+    def has_remote_subscribers(self, channel: str) -> bool:
+        """Whether another process may be listening, publishers can skip encoding when it isn't."""
+        return True
+
+    def publish(self, channel: str, message: str) -> None:
+        """Queue a message for the channel, it is sent with the next batch."""
+        self._outbox.setdefault(channel, []).append(message)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self._flush)
+
+    def _flush(self) -> None:
+        self._flush_handle = None
+        if not self._outbox:
+            return
+        outbox, self._outbox = self._outbox, {}
+        batches = {
+            channel: json.dumps({"origin": self.origin_id, "sentAt": time.time(), "messages": messages})
+            for channel, messages in outbox.items()
+        }
+        metrics = get_metrics()
+        metrics.incr("backplane.batches_published", len(batches))
+        metrics.incr("backplane.messages_published", sum(len(messages) for messages in outbox.values()))
+        self._send_batches(batches)
+
+    @abstractmethod
+    def _send_batches(self, batches: Dict[str, str]) -> None:
+        ...
+
+    @abstractmethod
+    async def claim_game(self, game_id: str) -> GameOwner:
+        """Make this process the game's host unless another process already is. Returns the host.
+
+        Raises:
+            ConnectionError: If the registry can't be reached.
+        """
+
+    @abstractmethod
+    async def release_game(self, game_id: str) -> None:
+        """Stop hosting a game, e.g. once it ended or was handed to another process."""
+
+    @abstractmethod
+    async def game_owner(self, game_id: str) -> Optional[GameOwner]:
+        """The process hosting the game, None if no process does.
+
+        Raises:
+            ConnectionError: If the registry can't be reached.
+        """
+
+    async def _receive_batch(self, channel: str, batch: str) -> None:
+        """Unpack a batch received on a subscribed channel and hand its messages to the channel's callback."""
+        callback = self._callbacks.get(channel)
+        if callback is None:
+            return
+
+        try:
+            envelope = json.loads(batch)
+        except json.JSONDecodeError as e:
+            log.error(f"Dropping malformed batch on channel {channel}: {e}")
+            return
+
+        if envelope.get("origin") == self.origin_id:
+            return
+
+        metrics = get_metrics()
+        metrics.set_gauge(f"backplane.lag_ms.{channel}", (time.time() - envelope.get("sentAt", time.time())) * 1000)
+        metrics.incr("backplane.messages_received", len(envelope.get("messages", [])))
+
+        for message in envelope.get("messages", []):
+            try:
+                await callback(channel, message)
+            except Exception as e:
+                log.error(f"Backplane callback for channel {channel} failed: {e}")
+
+
+class InProcessBackplane(Backplane):
+    """Backplane between instances living in the same process. Used when no external broker is configured."""
+
+    _channels: Dict[str, Set["InProcessBackplane"]] = {}
+    """Maps channel to every subscribed instance in the process"""
+    _owners: Dict[str, GameOwner] = {}
+    """Maps game_id to the instance hosting it"""
+
+    async def subscribe(self, channel: str, callback: MessageCallback) -> None:
+        await super().subscribe(channel, callback)
+        self._channels.setdefault(channel, set()).add(self)
+
+    async def unsubscribe(self, channel: str) -> None:
+        await super().unsubscribe(channel)
+        subscribers = self._channels.get(channel)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self._channels[channel]
+
+    def has_remote_subscribers(self, channel: str) -> bool:
+        subscribers = self._channels.get(channel, ())
+        return any(subscriber is not self for subscriber in subscribers)
+
+    def _send_batches(self, batches: Dict[str, str]) -> None:
+        loop = asyncio.get_running_loop()
+        for channel, batch in batches.items():
+            for subscriber in self._channels.get(channel, ()):
+                if subscriber is not self:
+                    loop.create_task(subscriber._receive_batch(channel, batch))
+
+    async def claim_game(self, game_id: str) -> GameOwner:
+        return self._owners.setdefault(game_id, GameOwner(self.origin_id, self.public_url))
+
+    async def release_game(self, game_id: str) -> None:
+        owner = self._owners.get(game_id)
+        if owner is not None and owner.origin_id == self.origin_id:
+            del self._owners[game_id]
+
+    async def game_owner(self, game_id: str) -> Optional[GameOwner]:
+        return self._owners.get(game_id)
+
+
+def _encode_command(*parts: str) -> bytes:
+    """Encode a command in the Redis serialization protocol (RESP)."""
+    encoded = [f"*{len(parts)}\r\n".encode()]
+    for part in parts:
+        data = part.encode()
+        encoded.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(encoded)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    """Read one RESP reply, arrays are returned as lists."""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Backplane connection closed")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise ValueError(f"Backplane error reply: {payload.decode()}")
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2].decode()
+    if kind == b"*":
+        length = int(payload)
+        return [await _read_reply(reader) for _ in range(length)] if length >= 0 else None
+    raise ValueError(f"Unexpected backplane reply: {line!r}")
+
+
+_CLAIM_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if not owner or owner == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return ARGV[1]
+end
+return owner
+"""
+"""Sets the game's owner unless another process owns it, renewing the lease when it is ours. Returns the owner"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+"""Deletes the game's owner only if it is ours"""
+
+
+def _owner_key(game_id: str) -> str:
+    return f"mas:owner:{game_id}"
+
+
+def _decode_owner(value: str) -> GameOwner:
+    owner = json.loads(value)
+    return GameOwner(owner["origin"], owner.get("url"))
+
+
+class RedisBackplane(Backplane):
+    """Backplane over any server speaking the Redis pub/sub protocol, by TCP (redis://host:port) or Unix socket (unix:///path).
+
+    Publishing and subscribing use separate connections, as a subscribed Redis connection can't publish.
+    Batches are pipelined into one write per flush and the next write waits for the previous one to drain.
+    While the connection is slow or down they queue up to max_pending_bytes, the oldest are dropped beyond that.
+
+    A supervisor task keeps both connections up: when either drops, every pending request fails, and it
+    reconnects with exponential backoff and subscribes to every channel again.
+
+    Game owners are keys leased for ownership_ttl seconds, renewed while the process lives, so the games
+    of a crashed process can be claimed by others once their lease runs out.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        flush_interval: float = 0.005,
+        public_url: Optional[str] = None,
+        max_pending_bytes: int = BACKPLANE_MAX_PENDING_BYTES,
+        max_reconnect_delay: float = BACKPLANE_MAX_RECONNECT_DELAY_SECONDS,
+        request_timeout: float = BACKPLANE_REQUEST_TIMEOUT_SECONDS,
+        ownership_ttl: float = GAME_OWNERSHIP_TTL_SECONDS
+    ):
+        super().__init__(flush_interval=flush_interval, public_url=public_url)
+        self.url = urlparse(url)
+        self.max_pending_bytes = max_pending_bytes
+        self.max_reconnect_delay = max_reconnect_delay
+        self.request_timeout = request_timeout
+        self.ownership_ttl = ownership_ttl
+        self.connected = False
+        self._owner_value = json.dumps({"origin": self.origin_id, "url": public_url})
+        self._owned: Set[str] = set()
+        """Games this process hosts, their leases are renewed"""
+        self._publisher: Optional[asyncio.StreamWriter] = None
+        self._subscriber: Optional[asyncio.StreamWriter] = None
+        self._replies: Deque[Optional[asyncio.Future]] = deque()
+        """One entry per command sent on the publisher connection, in order: the future awaiting its reply, None to discard it"""
+        self._pending: Deque[Tuple[bytes, int]] = deque()
+        """Pipelined PUBLISH commands waiting to be written, with the number of commands in each"""
+        self._pending_bytes = 0
+        self._supervisor: Optional[asyncio.Task] = None
+        self._sender: Optional[asyncio.Task] = None
+        self._renewer: Optional[asyncio.Task] = None
+
+    async def _connect(self):
+        if self.url.scheme == "unix":
+            return await asyncio.open_unix_connection(self.url.path)
+        return await asyncio.open_connection(self.url.hostname or "localhost", self.url.port or 6379)
+
+    async def start(self) -> None:
+        if self._supervisor is None:
+            self._supervisor = asyncio.get_running_loop().create_task(self._supervise())
+            self._renewer = asyncio.get_running_loop().create_task(self._renew_leases())
+
+    async def close(self) -> None:
+        await super().close()
+        for task in (self._supervisor, self._sender, self._renewer):
+            if task is not None:
+                task.cancel()
+        self._supervisor = self._sender = self._renewer = None
+        self._disconnect(ConnectionError("Backplane closed"))
+
+    async def _supervise(self) -> None:
+        """Connect, serve until either connection fails, and reconnect with exponential backoff."""
+        delay = 0.1
+        while True:
+            try:
+                publisher_reader, self._publisher = await self._connect()
+                subscriber_reader, self._subscriber = await self._connect()
+                if self._callbacks:
+                    self._subscriber.write(_encode_command("SUBSCRIBE", *self._callbacks))
+                    await self._subscriber.drain()
+            except OSError as e:
+                log.error(f"Backplane can't connect to {self.url.geturl()}, retrying in {delay:.1f}s: {e}")
+                self._disconnect(e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            log.info(f"Backplane connected to {self.url.geturl()}")
+            delay = 0.1
+            self.connected = True
+            self._wake_sender()
+            loop = asyncio.get_running_loop()
+            readers = {
+                loop.create_task(self._read_replies(publisher_reader)),
+                loop.create_task(self._listen(subscriber_reader))
+            }
+            try:
+                done, _ = await asyncio.wait(readers, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for reader in readers:
+                    reader.cancel()
+            error = next((task.exception() for task in done if not task.cancelled() and task.exception()), None)
+            log.error(f"Backplane connection lost, reconnecting: {error or 'closed by the server'}")
+            get_metrics().incr("backplane.reconnects")
+            self._disconnect(error or ConnectionError("Backplane connection closed"))
+
+    def _disconnect(self, error: BaseException) -> None:
+        """Close both connections and fail the requests still waiting on a reply, the supervisor opens new ones."""
+        self.connected = False
+        for writer in (self._publisher, self._subscriber):
+            if writer is not None:
+                writer.close()
+        self._publisher = self._subscriber = None
+        while self._replies:
+            future = self._replies.popleft()
+            if future is not None and not future.done():
+                future.set_exception(ConnectionError(f"Backplane disconnected: {error}"))
+
+    async def _request(self, *parts: str):
+        """Send a command on the publisher connection and wait for its reply.
+
+        Raises:
+            ConnectionError: If the backplane is not connected, or the connection drops before the reply.
+            ValueError: If the server answers with an error.
+        """
+        if not self.connected:
+            raise ConnectionError("Backplane is not connected")
+        future = asyncio.get_running_loop().create_future()
+        self._publisher.write(_encode_command(*parts))
+        self._replies.append(future)
+        await self._publisher.drain()
+        try:
+            return await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            # The cancelled future stays in line for its reply, which is discarded when it arrives
+            raise ConnectionError(f"Backplane didn't answer {parts[0]} within {self.request_timeout}s")
+
+    async def _claim(self, game_id: str) -> GameOwner:
+        value = await self._request(
+            "EVAL", _CLAIM_SCRIPT, "1", _owner_key(game_id), self._owner_value, str(int(self.ownership_ttl * 1000))
+        )
+        return _decode_owner(value)
+
+    async def claim_game(self, game_id: str) -> GameOwner:
+        owner = await self._claim(game_id)
+        if owner.origin_id == self.origin_id:
+            self._owned.add(game_id)
+        return owner
+
+    async def release_game(self, game_id: str) -> None:
+        self._owned.discard(game_id)
+        try:
+            await self._request("EVAL", _RELEASE_SCRIPT, "1", _owner_key(game_id), self._owner_value)
+        except ConnectionError as e:
+            log.error(f"Backplane couldn't release game {game_id}, its lease runs out instead: {e}")
+
+    async def game_owner(self, game_id: str) -> Optional[GameOwner]:
+        value = await self._request("GET", _owner_key(game_id))
+        return _decode_owner(value) if value is not None else None
+
+    async def _renew_leases(self) -> None:
+        """Renew the lease of every game this process hosts, at a third of their ttl."""
+        while True:
+            await asyncio.sleep(self.ownership_ttl / 3)
+            if not self.connected:
+                continue
+            game_ids = list(self._owned)
+            owners = await asyncio.gather(*(self._claim(game_id) for game_id in game_ids), return_exceptions=True)
+            for game_id, owner in zip(game_ids, owners):
+                if isinstance(owner, Exception):
+                    log.error(f"Backplane couldn't renew the lease of game {game_id}: {owner}")
+                elif owner.origin_id != self.origin_id and game_id in self._owned:
+                    # The lease ran out while the broker was unreachable and another process took the game
+                    self._owned.discard(game_id)
+                    get_metrics().incr("backplane.leases_lost")
+                    log.error(f"Backplane lost game {game_id} to another process")
+
+    async def subscribe(self, channel: str, callback: MessageCallback) -> None:
+        await super().subscribe(channel, callback)
+        await self._send_subscription("SUBSCRIBE", channel)
+
+    async def unsubscribe(self, channel: str) -> None:
+        await super().unsubscribe(channel)
+        await self._send_subscription("UNSUBSCRIBE", channel)
+
+    async def _send_subscription(self, command: str, channel: str) -> None:
+        # While disconnected, the supervisor subscribes to the current channels once it reconnects
+        if not self.connected:
+            return
+        try:
+            self._subscriber.write(_encode_command(command, channel))
+            await self._subscriber.drain()
+        except ConnectionError as e:
+            log.error(f"Backplane {command} {channel} not sent, it is resent on reconnect: {e}")
+
+    def _send_batches(self, batches: Dict[str, str]) -> None:
+        data = b"".join(_encode_command("PUBLISH", channel, batch) for channel, batch in batches.items())
+        self._pending.append((data, len(batches)))
+        self._pending_bytes += len(data)
+        dropped = 0
+        while self._pending_bytes > self.max_pending_bytes and len(self._pending) > 1:
+            self._pending_bytes -= len(self._pending.popleft()[0])
+            dropped += 1
+        if dropped:
+            get_metrics().incr("backplane.writes_dropped", dropped)
+            log.warning(f"Backplane is behind by more than {self.max_pending_bytes} bytes, dropped the {dropped} oldest writes")
+        self._wake_sender()
+
+    def _wake_sender(self) -> None:
+        if self._pending and self.connected and (self._sender is None or self._sender.done()):
+            self._sender = asyncio.get_running_loop().create_task(self._send_pending())
+
+    async def _send_pending(self) -> None:
+        """Write the queued batches, one write at a time once the previous one has drained."""
+        try:
+            while self._pending and self.connected:
+                data, command_count = self._pending.popleft()
+                self._pending_bytes -= len(data)
+                self._publisher.write(data)
+                self._replies.extend([None] * command_count)
+                await self._publisher.drain()
+        except ConnectionError as e:
+            # The supervisor reconnects, batches written into the lost connection are gone
+            log.error(f"Backplane write failed: {e}")
+
+    async def _read_replies(self, reader: asyncio.StreamReader) -> None:
+        """Hand each reply on the publisher connection to the request awaiting it, PUBLISH replies are discarded."""
+        while True:
+            try:
+                reply = await _read_reply(reader)
+            except ValueError as e:
+                # An error reply, the connection itself is still in sync
+                reply = e
+            future = self._replies.popleft() if self._replies else None
+            if future is None or future.done():
+                if isinstance(reply, Exception):
+                    log.error(f"Backplane command failed: {reply}")
+                continue
+            if isinstance(reply, Exception):
+                future.set_exception(reply)
+            else:
+                future.set_result(reply)
+
+    async def _listen(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            reply = await _read_reply(reader)
+            if isinstance(reply, list) and len(reply) == 3 and reply[0] == "message":
+                await self._receive_batch(reply[1], reply[2])
+
+
+def initialize_backplane(url: Optional[str] = None, public_url: Optional[str] = None) -> Backplane:
+    """Create the process's backplane, a RedisBackplane when a url is given and an InProcessBackplane otherwise.
+
+    public_url is where clients of the games this process hosts are sent when they arrive at another process.
+    """
+    global _backplane
+    _backplane = RedisBackplane(url, public_url=public_url) if url else InProcessBackplane(public_url=public_url)
+    log.info(f"Backplane initialized: {type(_backplane).__name__}")
+    return _backplane
+
+
+def get_backplane() -> Backplane:
+
+    if not _backplane:
+        raise ValueError('Attempted to retrieve Backplane object before initialization.')
+
+    return _backplane
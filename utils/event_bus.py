@@ -1,10 +1,9 @@
-from typing import Callable, Type, Dict, List, Optional, Protocol, TypeAlias, Awaitable
+from typing import Callable, Type, Dict, Hashable, List, Optional, Protocol, Tuple, TypeAlias, Awaitable
 from functools import lru_cache
 import inspect
-from pydantic import BaseModel
-import pydantic
 from enum import Enum
-from utils.logger import get_logger
+from utils.logger import get_logger, log_context, sampled
+from utils.metrics import get_metrics
 from inspect import iscoroutinefunction
 
 
@@ -12,7 +11,8 @@ log = get_logger('event_bus')
 _event_bus = None
 
 
-Event: TypeAlias = BaseModel
+Event: TypeAlias = object
+"""Any lightweight record, e.g. the slotted dataclasses in models.events"""
 
 
 class DefaultPhase(Enum):
@@ -33,24 +33,44 @@ class StateMngr(Protocol):
         """Applies the necessary state changes for a given Command"""
         ...
 
+    def apply_all(self, cmds: List[Command]) -> bool:
+        """Applies all of the Commands or none of them if any was derived from a state that has changed since"""
+        ...
+
 
 Handler: TypeAlias = Callable[[Event], Awaitable[Optional[Command | List[Command]]]]
 
 
 class EventBus:
+    """Phased event processing: the listeners of a phase's events derive commands, which are applied to the state
+    and turned into the events of the next phase.
+
+    Commands can carry the version of the game state they were derived from, see StateManager.apply_all. The
+    commands derived from one event are applied together or not at all. When they conflict with a change made
+    since, they are rejected if the event itself carries a version, since the player decided on a state that no
+    longer exists. Otherwise the listeners that versioned their commands are run again on the current state, so
+    such listeners must not have side effects.
+
+    Events are queued per game (their `game_id`, None for events without one) and process_all_phases runs the
+    queues of a single game. Games processed concurrently, e.g. by the InboundDispatcher, never run each other's
+    events, even when a listener suspends mid-phase to send something.
+    """
 
     handlers: Dict[Type, List[Handler]]
-    queues: Dict[Enum, List[Event]]
+    queues: Dict[Hashable, Dict[Enum, List[Event]]]
+    """Maps game_id to its queued events by phase"""
 
-    def __init__(self, state_manager: StateMngr, Phase: Optional[Type[Enum]] = None):
+    def __init__(self, state_manager: StateMngr, Phase: Optional[Type[Enum]] = None, max_conflict_retries: int = 3):
 
-        if not hasattr(state_manager, 'apply'):
-            raise ValueError("state_manager passed to EventBus must implement an apply method for executing commands.")
+        if not hasattr(state_manager, 'apply_all'):
+            raise ValueError("state_manager passed to EventBus must implement an apply_all method for executing commands.")
 
         self.state_manager = state_manager
         self.handlers = {}
         self.queues = {}
         self.Phase = Phase if Phase else DefaultPhase
+        self.max_conflict_retries = max_conflict_retries
+        self._processing = 0
     
     def on(self, event_type: Type):
         def decorator(func: Callable):
@@ -67,51 +87,112 @@ class EventBus:
         self.handlers[event_type].append(handler)
     
     async def publish(self, phase: Enum, event: Event) -> None:
-        if phase not in self.queues:
-            self.queues[phase] = []
-        self.queues[phase].append(event)
+        game_queues = self.queues.setdefault(getattr(event, "game_id", None), {})
+        if phase not in game_queues:
+            game_queues[phase] = []
+        game_queues[phase].append(event)
+
+    @property
+    def idle(self) -> bool:
+        """Whether no call to process_all_phases is in progress."""
+        return self._processing == 0
+
+    def take_pending(self, game_id: str) -> List[Tuple[Enum, Event]]:
+        """Remove the queued events of one game and return them with their phase, e.g. to hand the game to another process."""
+        game_queues = self.queues.pop(game_id, {})
+        return [(phase, event) for phase, queue in game_queues.items() for event in queue]
     
-    async def run_listeners(self, event: Event) -> List[Command] | None:
-        """Runs all event listeners for a given event type, returns a list of commands returneed from event listeners"""
+    async def run_listener(self, handler: Handler, event: Event, context: Optional[Dict] = None) -> List[Command]:
+        """Runs one event listener, returns the commands it returned as a list"""
+        if context:
+            log.info(f"Running handler {handler.__name__}", extra=context)
+
+        handler_commands = await handler(event)
+        if not handler_commands:
+            if context:
+                log.info("Handler returned no commands. Continuing...", extra=context)
+            return []
+        if not isinstance(handler_commands, list):
+            handler_commands = [handler_commands]
+
+        if context:
+            log.info(f"Handler returned commands: {', '.join([type(cmd).__name__ for cmd in handler_commands])}", extra=context)
+        return handler_commands
+
+    async def run_listeners(self, event: Event) -> List[Tuple[Handler, List[Command]]] | None:
+        """Runs all event listeners for a given event type, returns each listener that returned commands with its commands"""
         event_type = type(event)
         if not event_type in self.handlers:
             log.error(f'Event type {event_type.__name__} not found in EventBus.handlers')
             return
 
-        log.info(f"Running listeners for event type {event_type.__name__} with data {event.model_dump_json()}")
-        event_commands: List[Command] = []
+        game_id = getattr(event, "game_id", None)
+        verbose = sampled("event_bus.listeners", game_id)
+        context = log_context(game_id=game_id, user_id=getattr(event, "user_id", None), event=event_type.__name__) if verbose else None
+        if verbose:
+            log.info(f"Running listeners for event type {event_type.__name__} with data {event}", extra=context)
+        listener_commands: List[Tuple[Handler, List[Command]]] = []
         for handler in self.handlers[event_type]:
-            log.info(f"Running handler {handler.__name__}")
-
-            handler_commands = await handler(event)
-            if not handler_commands:
-                log.info("Handler returned no commands. Continuing...")
-                continue
-            if not isinstance(handler_commands, list):
-                handler_commands = [handler_commands]
-
-            log.info(f"Handler returned commands: {', '.join([type(cmd).__name__ for cmd in handler_commands])}")
-            event_commands.extend(handler_commands if handler_commands else [])
-
-        return event_commands
+            handler_commands = await self.run_listener(handler, event, context)
+            if handler_commands:
+                listener_commands.append((handler, handler_commands))
+
+        return listener_commands
+
+    async def apply_commands(self, event: Event, listener_commands: List[Tuple[Handler, List[Command]]]) -> List[Command]:
+        """Applies the commands the listeners derived from an event, all or none. Returns the applied commands,
+        empty when they were rejected for conflicting with changes to the state."""
+        metrics = get_metrics()
+        metrics.incr("event_bus.batches")
+        for attempt in range(self.max_conflict_retries + 1):
+            commands = [cmd for _, handler_commands in listener_commands for cmd in handler_commands]
+            if self.state_manager.apply_all(commands):
+                return commands
+
+            metrics.incr("event_bus.conflicts")
+            if getattr(event, "version", None) is not None or attempt == self.max_conflict_retries:
+                break
+
+            metrics.incr("event_bus.retries")
+            # Only the listeners that versioned their commands read the state they depend on
+            retried: List[Tuple[Handler, List[Command]]] = []
+            for handler, handler_commands in listener_commands:
+                if any(getattr(cmd, "version", None) is not None for cmd in handler_commands):
+                    handler_commands = await self.run_listener(handler, event)
+                retried.append((handler, handler_commands))
+            listener_commands = retried
+
+        metrics.incr("event_bus.rejected")
+        log.warning(
+            f"Rejected the commands derived from {type(event).__name__}, the game changed since",
+            extra=log_context(game_id=getattr(event, "game_id", None), user_id=getattr(event, "user_id", None))
+        )
+        return []
     
-    async def process_phase(self, phase: Enum) -> None:
-        """Runs all events in a specific queue by phase enum"""
+    async def process_phase(self, phase: Enum, game_id: Hashable = None) -> None:
+        """Runs all of a game's events in a specific queue by phase enum"""
 
-        if not phase in self.queues:
-            log.info(f"Phase {phase.name} not present in current event queue. Skipping...")
+        verbose = sampled("event_bus.phases", game_id)
+
+        game_queues = self.queues.get(game_id)
+        if not game_queues or phase not in game_queues:
+            if verbose:
+                log.info(f"Phase {phase.name} not present in current event queue. Skipping...")
             return
 
-        log.info(f"Processing queued events for phase: {phase}")
-        phase_commands: List[Command] = []
-        for event in self.queues[phase]:
-            event_commands = await self.run_listeners(event)
-            phase_commands.extend(event_commands if event_commands else [])
+        if verbose:
+            log.info(f"Processing queued events for phase: {phase}")
+        phase_commands: List[Tuple[Event, List[Tuple[Handler, List[Command]]]]] = []
+        for event in game_queues[phase]:
+            listener_commands = await self.run_listeners(event)
+            if listener_commands:
+                phase_commands.append((event, listener_commands))
         
-        self.queues[phase] = []
+        game_queues.pop(phase, None)
         
         if not phase_commands:
-            log.info(f'Phase {phase.name} returned no commands. Continuing...')
+            if verbose:
+                log.info(f'Phase {phase.name} returned no commands. Continuing...')
             return
 
         try:
@@ -120,27 +201,37 @@ class EventBus:
             log.warning("Recieved commands from the last phase type of event listeners. These commands WILL NOT be executed. Ignoring...")
             return
         
-        log.info(f"Registering command events for the phase {next_phase.name}")
-
-        for cmd in phase_commands:
-            log.info(f"Applying state updates for command: {type(cmd).__name__}")
-            self.state_manager.apply(cmd)
-            event = cmd.to_event() if hasattr(cmd, "to_event") else None
-            if event:
-                log.info(f"Publishing event {type(event).__name__}")
-                await self.publish(next_phase, event)
+        if verbose:
+            log.info(f"Registering command events for the phase {next_phase.name}")
+
+        for source_event, listener_commands in phase_commands:
+            for cmd in await self.apply_commands(source_event, listener_commands):
+                if verbose:
+                    log.info(f"Applied state updates for command: {type(cmd).__name__}", extra=log_context(game_id=getattr(cmd, "game_id", None), user_id=getattr(cmd, "user_id", None)))
+                event = cmd.to_event() if hasattr(cmd, "to_event") else None
+                if event:
+                    if verbose:
+                        log.info(f"Publishing event {type(event).__name__}", extra=log_context(game_id=getattr(cmd, "game_id", None), user_id=getattr(cmd, "user_id", None)))
+                    await self.publish(next_phase, event)
     
-    async def process_all_phases(self) -> None:
-        """Runs all events in each of the queues, in order of phase enum"""
+    async def process_all_phases(self, game_id: Hashable = None) -> None:
+        """Runs all of a game's events in each of its queues, in order of phase enum"""
         ordered_phases = sorted(self.Phase, key=lambda phase: phase.value)
-        log.info(f"Processing all phases in this order: {', '.join([phase.name for phase in ordered_phases])}")
-        for phase in ordered_phases:
-            await self.process_phase(phase)
+        if sampled("event_bus.phases", game_id):
+            log.info(f"Processing all phases in this order: {', '.join([phase.name for phase in ordered_phases])}")
+        self._processing += 1
+        try:
+            for phase in ordered_phases:
+                await self.process_phase(phase, game_id)
+        finally:
+            self._processing -= 1
+            if game_id in self.queues and not self.queues[game_id]:
+                del self.queues[game_id]
 
 
-def initialize_event_bus(state_manager: object) -> None:
+def initialize_event_bus(state_manager: object, max_conflict_retries: int = 3) -> None:
     global _event_bus
-    _event_bus = EventBus(state_manager=state_manager)
+    _event_bus = EventBus(state_manager=state_manager, max_conflict_retries=max_conflict_retries)
     log.info("Event Bus initialized.")
 
 
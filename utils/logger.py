@@ -1,7 +1,10 @@
 # logger.py
+import json
 import logging
+import os
 from logging.handlers import RotatingFileHandler
 import sys
+from typing import Dict, Optional
 from config.config import PROJECT_PATH
 
 
@@ -9,6 +12,18 @@ from config.config import PROJECT_PATH
 LOG_FILE = PROJECT_PATH / "logs" / "mobile_app_server.log"
 MAX_BYTES = 1_000_000  # 1 MB per file
 BACKUP_COUNT = 3       # Keep 3 rotated logs
+JSON_CONSOLE = os.environ.get("MAS_LOG_FORMAT") == "json"  # Write console logs as JSON records too, e.g. for log collectors
+CONTEXT_FIELDS = ("game_id", "user_id", "event")  # Record attributes copied into structured log records
+LOG_SAMPLE_RATES: Dict[str, float] = {
+    # Fraction of records kept for chatty categories, categories without a rate are always logged
+    "server.received": 0.01,
+    "event_handlers.execution": 0.01,
+    "event_bus.listeners": 0.01,
+    "event_bus.phases": 0.01,
+    "state_manager.commands": 0.01,
+    "state_manager.lookups": 0.001,
+    "state_update": 0.01
+}
 
 
 class ColorFormatter(logging.Formatter):
@@ -30,12 +45,148 @@ class ColorFormatter(logging.Formatter):
         return f"{color}{message}{self.RESET}"
 
 
-def get_logger(name: str = "server", level=logging.INFO) -> logging.Logger:
-    """Create a logger with both console + rotating file handlers."""
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the context fields passed through `extra=log_context(...)`."""
+
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def log_context(game_id: Optional[str] = None, user_id: Optional[str] = None, event: Optional[str] = None) -> Dict:
+    """Context fields for a record, use as `log.info(message, extra=log_context(...))`."""
+    context = {}
+    if game_id is not None:
+        context["game_id"] = game_id
+    if user_id is not None:
+        context["user_id"] = user_id
+    if event is not None:
+        context["event"] = event
+    return context
+
+
+# ---- SAMPLING ----
+_sample_counters: Dict[str, int] = {}
+_sample_intervals: Dict[str, int] = {}
+
+
+def set_sample_rate(category: str, rate: float) -> None:
+    """Keep `rate` of the records of a category, 0 drops them all and 1 keeps them all."""
+    LOG_SAMPLE_RATES[category] = rate
+    _sample_intervals.pop(category, None)
+
+
+def sampled(category: str, game_id: Optional[str] = None) -> bool:
+    """Whether to log the next record of a chatty category. Check it before building the message.
+
+    Every n-th record is kept rather than a random share, so a steady stream costs one counter increment
+    per skipped record. Games with a runtime log level are never sampled.
+    """
+    if game_id is not None and game_id in _game_levels:
+        return True
+    interval = _sample_intervals.get(category)
+    if interval is None:
+        rate = LOG_SAMPLE_RATES.get(category, 1.0)
+        interval = _sample_intervals[category] = 0 if rate <= 0 else max(round(1 / rate), 1)
+    if interval == 0:
+        return False
+    count = _sample_counters.get(category, 0) + 1
+    _sample_counters[category] = count
+    return count % interval == 0
+
+
+# ---- RUNTIME LEVELS ----
+_base_levels: Dict[str, int] = {}
+"""Level of every logger created by get_logger, by name"""
+_game_levels: Dict[str, int] = {}
+"""Lowered levels for records about specific games, by game_id"""
+
+
+class _ContextLevelFilter(logging.Filter):
+    """Lets records below their logger's level through when they belong to a game whose level was lowered."""
+
+    def filter(self, record):
+        if record.levelno >= _base_levels.get(record.name, logging.NOTSET):
+            return True
+        game_level = _game_levels.get(getattr(record, "game_id", None))
+        return game_level is not None and record.levelno >= game_level
+
+
+def _apply_levels() -> None:
+    # Loggers have to accept the lowest level any game asked for, the filter drops the records of other games
+    lowest_game_level = min(_game_levels.values(), default=logging.CRITICAL)
+    for name, level in _base_levels.items():
+        logging.getLogger(name).setLevel(min(level, lowest_game_level))
+
+
+def parse_level(level: str | int) -> int:
+    """Level number from a name like "DEBUG", raises ValueError for unknown names."""
+    if isinstance(level, int):
+        return level
+    number = logging.getLevelName(str(level).upper())
+    if not isinstance(number, int):
+        raise ValueError(f"Unknown log level: {level}")
+    return number
+
+
+def set_log_level(level: str | int, name: Optional[str] = None) -> None:
+    """Change the level of one logger, or of every logger when no name is given, without a restart."""
+    level = parse_level(level)
+    for logger_name in ([name] if name else list(_base_levels)):
+        if logger_name not in _base_levels:
+            raise ValueError(f"Unknown logger: {logger_name}")
+        _base_levels[logger_name] = level
+    _apply_levels()
+
+
+def set_game_log_level(game_id: str, level: str | int | None) -> None:
+    """Log records about one game down to `level` across every logger, None returns the game to the normal levels."""
+    if level is None:
+        _game_levels.pop(game_id, None)
+    else:
+        _game_levels[game_id] = parse_level(level)
+    _apply_levels()
+
+
+def get_log_levels() -> Dict:
+    return {
+        "loggers": {name: logging.getLevelName(level) for name, level in _base_levels.items()},
+        "games": {game_id: logging.getLevelName(level) for game_id, level in _game_levels.items()},
+        "sampleRates": dict(LOG_SAMPLE_RATES)
+    }
+
+
+_file_handler: RotatingFileHandler | None = None
 
-    if not LOG_FILE.exists():
+
+def _get_file_handler() -> RotatingFileHandler:
+    """Rotating file handler shared by every logger, writing JSON records. The file is only opened once a record is written."""
+    global _file_handler
+    if _file_handler is None:
         LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
-        LOG_FILE.touch()
+        _file_handler = RotatingFileHandler(
+            LOG_FILE,
+            maxBytes=MAX_BYTES,
+            backupCount=BACKUP_COUNT,
+            delay=True
+        )
+        _file_handler.setFormatter(JsonFormatter())
+    return _file_handler
+
+
+def get_logger(name: str = "server", level=logging.INFO) -> logging.Logger:
+    """Create a logger with a console handler and the shared rotating file handler."""
 
     logger = logging.getLogger(name)
 
@@ -43,32 +194,23 @@ def get_logger(name: str = "server", level=logging.INFO) -> logging.Logger:
     if logger.handlers:
         return logger
 
-    logger.setLevel(level)
+    _base_levels[name] = level
+    logger.addFilter(_ContextLevelFilter())
+    _apply_levels()
 
     # ---- Console Handler ----
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_format = ColorFormatter(
-        f"[{name}] [%(levelname)s] %(message)s",
-        "%Y-%m-%d %H:%M:%S"
-    )
+    if JSON_CONSOLE:
+        console_format = JsonFormatter()
+    else:
+        console_format = ColorFormatter(
+            f"[{name}] [%(levelname)s] %(message)s",
+            "%Y-%m-%d %H:%M:%S"
+        )
     console_handler.setFormatter(console_format)
 
-    # ---- File Handler ----
-    file_handler = RotatingFileHandler(
-        LOG_FILE,
-        maxBytes=MAX_BYTES,
-        backupCount=BACKUP_COUNT
-    )
-    file_handler.setLevel(level)
-    file_format = logging.Formatter(
-        "[%(asctime)s] [%(levelname)s] %(message)s",
-        "%Y-%m-%d %H:%M:%S"
-    )
-    file_handler.setFormatter(file_format)
-
     # ---- Add handlers ----
     logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    logger.addHandler(_get_file_handler())
 
     return logger
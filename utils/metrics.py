@@ -0,0 +1,48 @@
+from functools import lru_cache
+from typing import Dict
+
+
+class Metrics:
+    """Process-wide counters and gauges used for instrumentation.
+
+    Use case:
+    ```
+    metrics = get_metrics()
+    metrics.incr("serialization_cache.hits", 12)
+    metrics.set_gauge("connections.open", 40)
+    metrics.snapshot()
+    ```
+    """
+
+    counters: Dict[str, int]
+    gauges: Dict[str, float]
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    def get(self, name: str) -> int | float:
+        return self.counters.get(name, self.gauges.get(name, 0))
+
+    def hit_rate(self, prefix: str) -> float | None:
+        """Ratio of `<prefix>.hits` to all `<prefix>.hits` and `<prefix>.misses`, None before any lookup."""
+        hits = self.counters.get(f"{prefix}.hits", 0)
+        total = hits + self.counters.get(f"{prefix}.misses", 0)
+        return hits / total if total else None
+
+    def snapshot(self) -> Dict:
+        return {
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges)
+        }
+
+
+@lru_cache(maxsize=1)
+def get_metrics() -> Metrics:
+    return Metrics()
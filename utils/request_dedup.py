@@ -0,0 +1,111 @@
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Hashable, Optional
+
+from config.config import REQUEST_DEDUP_TTL_SECONDS, REQUEST_DEDUP_MAX_PER_USER, REQUEST_DEDUP_MAX_USERS
+
+from models.wsp_schemas import WSPEvent
+
+from utils.metrics import get_metrics
+
+
+class RequestRecord:
+    """What is known about one requestId: whether its handler finished, and the response it produced."""
+
+    __slots__ = ("expires_at", "done", "response")
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+        self.done = False
+        self.response: Optional[WSPEvent] = None
+
+
+class RequestDeduplicator:
+    """Remembers the requests each user sent recently, so a retried request is answered instead of re-run.
+
+    A request is identified by its game, event type and requestId, the same requestId sent for another game
+    or event is a different request.
+
+    Bounded three ways: records expire after ttl seconds, each user keeps at most max_per_user of them, and
+    at most max_users users are tracked, the least recently active being forgotten first. Records outlive
+    the connection, since a retry usually arrives on the connection that replaced a dropped one.
+
+    Use case:
+    ```
+    dedup = get_request_deduplicator()
+    key = (game_id, event.event, request_id)
+    record = dedup.begin(user_id, key)
+    if record is not None:
+        return record.response if record.done else None  # Retry of a request seen before
+    try:
+        response = await handler(...)
+    except Exception:
+        dedup.discard(user_id, key)
+        raise
+    dedup.complete(user_id, key, response)
+    ```
+    """
+
+    _users: OrderedDict[str, OrderedDict[Hashable, RequestRecord]]
+    """Maps user_id to its records by (game_id, event, requestId), both ordered from least to most recent"""
+
+    def __init__(
+        self,
+        ttl: float = REQUEST_DEDUP_TTL_SECONDS,
+        max_per_user: int = REQUEST_DEDUP_MAX_PER_USER,
+        max_users: int = REQUEST_DEDUP_MAX_USERS
+    ):
+        self.ttl = ttl
+        self.max_per_user = max_per_user
+        self.max_users = max_users
+        self._users = OrderedDict()
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._users.values())
+
+    def begin(self, user_id: str, request_key: Hashable) -> RequestRecord | None:
+        """The record of a request seen before, or None after recording this one as in flight."""
+        now = time.monotonic()
+        metrics = get_metrics()
+        records = self._users.get(user_id)
+        if records is None:
+            records = self._users[user_id] = OrderedDict()
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+            # Records are in insertion order, so the expired ones are at the front
+            while records and next(iter(records.values())).expires_at <= now:
+                records.popitem(last=False)
+
+        record = records.get(request_key)
+        if record is not None:
+            metrics.incr("request_dedup.hits")
+            if not record.done:
+                metrics.incr("request_dedup.in_flight")
+            return record
+
+        metrics.incr("request_dedup.misses")
+        records[request_key] = RequestRecord(now + self.ttl)
+        if len(records) > self.max_per_user:
+            records.popitem(last=False)
+        return None
+
+    def complete(self, user_id: str, request_key: Hashable, response: Optional[WSPEvent]) -> None:
+        """Keep the response of a finished request for its retries."""
+        record = self._users.get(user_id, {}).get(request_key)
+        if record is not None:
+            record.done = True
+            record.response = response
+
+    def discard(self, user_id: str, request_key: Hashable) -> None:
+        """Forget a request whose handler failed, so a retry runs it again."""
+        records = self._users.get(user_id)
+        if records is not None:
+            records.pop(request_key, None)
+
+
+@lru_cache(maxsize=1)
+def get_request_deduplicator() -> RequestDeduplicator:
+    return RequestDeduplicator()
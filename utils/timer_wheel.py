@@ -0,0 +1,144 @@
+import asyncio
+import math
+import time
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+from config.config import TIMER_TICK_SECONDS
+
+from utils.logger import get_logger
+from utils.metrics import get_metrics
+
+
+log = get_logger("timer_wheel")
+
+
+class Timer:
+    """Handle of a scheduled callback, cancelled in O(1) by removing it from its slot."""
+
+    __slots__ = ("expires_at_tick", "callback", "args", "_slot")
+
+    def __init__(self, expires_at_tick: int, callback: Callable, args: Tuple[Any, ...]):
+        self.expires_at_tick = expires_at_tick
+        self.callback = callback
+        self.args = args
+        self._slot: Optional[Set["Timer"]] = None
+
+    @property
+    def active(self) -> bool:
+        return self._slot is not None
+
+    def cancel(self) -> None:
+        if self._slot is not None:
+            self._slot.discard(self)
+            self._slot = None
+
+
+class TimerWheel:
+    """Hierarchical timing wheel driving every deadline of the process from a single task.
+
+    Level 0 has one slot per tick, each higher level has one slot per full turn of the level below it.
+    Timers sit in the lowest level whose span covers their delay and move down a level each time the
+    level below them wraps around, so scheduling and cancelling are O(1) and a tick only touches the
+    timers that are due. Delays are rounded up to whole ticks, timers never fire early.
+
+    Use case:
+    ```
+    wheel = get_timer_wheel()
+    wheel.start()
+    timer = wheel.schedule(30, on_timeout, game_id)   # plain or async callback
+    timer.cancel()
+    ```
+    """
+
+    _levels: List[List[Set[Timer]]]
+    """Slots of every level, each holding the timers that are due (level 0) or cascade down (higher levels) at that slot"""
+
+    def __init__(self, tick_seconds: float = TIMER_TICK_SECONDS, slots_per_level: int = 64, levels: int = 4):
+        self.tick_seconds = tick_seconds
+        self.slots_per_level = slots_per_level
+        self._levels = [[set() for _ in range(slots_per_level)] for _ in range(levels)]
+        self._spans = [slots_per_level ** (level + 1) for level in range(levels)]
+        self._current_tick = 0
+        self._started_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return sum(len(slot) for level in self._levels for slot in level)
+
+    def schedule(self, delay: float, callback: Callable, *args: Any) -> Timer:
+        """Call callback(*args) once delay seconds have passed. Async callbacks are awaited by the wheel's task."""
+        timer = Timer(self._current_tick + max(1, math.ceil(delay / self.tick_seconds)), callback, args)
+        self._insert(timer)
+        return timer
+
+    def _insert(self, timer: Timer) -> None:
+        remaining = timer.expires_at_tick - self._current_tick
+        level = 0
+        while level < len(self._spans) - 1 and remaining >= self._spans[level]:
+            level += 1
+        # Delays beyond the top level's span go round it again when their slot cascades
+        slot = self._levels[level][(timer.expires_at_tick // (self._spans[level] // self.slots_per_level)) % self.slots_per_level]
+        slot.add(timer)
+        timer._slot = slot
+
+    def _cascade(self) -> None:
+        """Move the timers of every higher-level slot that starts at the current tick down a level."""
+        for level in range(1, len(self._levels)):
+            lower_span = self._spans[level - 1]
+            if self._current_tick % lower_span:
+                break
+            slot = self._levels[level][(self._current_tick // lower_span) % self.slots_per_level]
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self._insert(timer)
+
+    def advance(self, now: Optional[float] = None) -> List[Timer]:
+        """Move the wheel up to now, returns the timers that became due in the order they expired."""
+        target_tick = int(((time.monotonic() if now is None else now) - self._started_at) / self.tick_seconds)
+        due = []
+        while self._current_tick < target_tick:
+            self._current_tick += 1
+            self._cascade()
+            slot = self._levels[0][self._current_tick % self.slots_per_level]
+            if not slot:
+                continue
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                timer._slot = None
+            due.extend(timers)
+        return due
+
+    async def fire(self, timers: List[Timer]) -> None:
+        for timer in timers:
+            try:
+                result = timer.callback(*timer.args)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                log.error(f"Timer callback {getattr(timer.callback, '__name__', timer.callback)} failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            log.info(f"Timer wheel running with {self.tick_seconds * 1000:g}ms ticks")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            due = self.advance()
+            if due:
+                get_metrics().incr("timers.fired", len(due))
+                await self.fire(due)
+
+
+@lru_cache(maxsize=1)
+def get_timer_wheel() -> TimerWheel:
+    return TimerWheel()
@@ -0,0 +1,116 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory, PerMessageDeflate
+from websockets.asyncio.server import ServerConnection
+
+from config.config import (
+    DEFLATE_SERVER_MAX_WINDOW_BITS, DEFLATE_CLIENT_MAX_WINDOW_BITS, DEFLATE_COMPRESSION_LEVEL, DEFLATE_MEM_LEVEL
+)
+
+from models.wsp_schemas import WSPEvent
+
+try:
+    import msgpack
+except ImportError:  # Optional, clients can't negotiate msgpack without it
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # Optional, clients can't negotiate cbor without it
+    cbor2 = None
+
+
+JSON_ENCODING = "json"
+
+Frame = str | bytes
+
+_CODECS: Dict[str, Tuple[Callable[[Dict], bytes], Callable[[bytes], Dict]]] = {}
+"""Maps binary encoding name to its (encode, decode) functions, only for the installed libraries"""
+if msgpack is not None:
+    _CODECS["msgpack"] = (msgpack.packb, msgpack.unpackb)
+if cbor2 is not None:
+    _CODECS["cbor"] = (cbor2.dumps, cbor2.loads)
+
+
+_WIRE_FIELDS = [(name, field.alias or name, field.exclude_if) for name, field in WSPEvent.model_fields.items()]
+"""(attribute, key on the wire, predicate of the values left out of frames) of the WSPEvent fields"""
+
+
+def _wire_fields(event: WSPEvent) -> Dict:
+    """The event's fields by wire key, as model_dump() would return them."""
+    fields = {}
+    for name, key, exclude_if in _WIRE_FIELDS:
+        value = getattr(event, name)
+        if exclude_if is None or not exclude_if(value):
+            fields[key] = value
+    return fields
+
+
+def available_encodings() -> List[str]:
+    return [*_CODECS, JSON_ENCODING]
+
+
+def negotiate_encoding(offered: Sequence[str] | None) -> str:
+    """The first encoding of the client's preference list this server supports, JSON if there is none."""
+    for encoding in offered or ():
+        if encoding == JSON_ENCODING or encoding in _CODECS:
+            return encoding
+    return JSON_ENCODING
+
+
+def encode_event(event: WSPEvent, encoding: str = JSON_ENCODING) -> Frame:
+    """The frame of an event in an encoding: text for JSON, binary for the others.
+
+    Frames are memoized on the event, so an event broadcast to many sockets is encoded once per encoding.
+    Events must not be changed once they have been encoded.
+    """
+    frames = event._frames
+    if frames is None:
+        frames = event._frames = {}
+    frame = frames.get(encoding)
+    if frame is None:
+        if encoding == JSON_ENCODING:
+            frame = event.model_dump_json()
+        else:
+            # The payload is plain data already, model_dump() would only copy it
+            frame = _CODECS[encoding][0](_wire_fields(event))
+        frames[encoding] = frame
+    return frame
+
+
+def decode_event(frame: Frame, encoding: str = JSON_ENCODING) -> WSPEvent:
+    """Parse an inbound frame. Text frames are always JSON, binary frames use the connection's encoding.
+
+    Raises:
+        ValueError: If the frame can't be decoded or doesn't conform to the WSPEvent schema.
+    """
+    if isinstance(frame, str) or encoding == JSON_ENCODING:
+        return WSPEvent.model_validate_json(frame)
+    try:
+        event_dict = _CODECS[encoding][1](frame)
+    except Exception as e:
+        raise ValueError(f"Invalid {encoding} data: {e}")
+    return WSPEvent.model_validate(event_dict)
+
+
+def deflate_extension_factory() -> ServerPerMessageDeflateFactory:
+    """The permessage-deflate parameters the server accepts in the handshake, tuned for small, repetitive state updates."""
+    return ServerPerMessageDeflateFactory(
+        server_max_window_bits=DEFLATE_SERVER_MAX_WINDOW_BITS,
+        client_max_window_bits=DEFLATE_CLIENT_MAX_WINDOW_BITS,
+        compress_settings={"level": DEFLATE_COMPRESSION_LEVEL, "memLevel": DEFLATE_MEM_LEVEL}
+    )
+
+
+def negotiated_compression(ws: ServerConnection) -> Optional[Dict]:
+    """The permessage-deflate parameters agreed on in the connection's handshake, None if it isn't compressed."""
+    for extension in ws.protocol.extensions:
+        if isinstance(extension, PerMessageDeflate):
+            return {
+                "name": extension.name,
+                "serverMaxWindowBits": extension.local_max_window_bits,
+                "clientMaxWindowBits": extension.remote_max_window_bits,
+                "serverNoContextTakeover": extension.local_no_context_takeover,
+                "clientNoContextTakeover": extension.remote_no_context_takeover
+            }
+    return None
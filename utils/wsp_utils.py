@@ -1,9 +1,11 @@
 from logging import Logger
 from typing import Any, Callable, Optional, Dict, Awaitable
-import json
 
 from websockets import ServerConnection
 from models.wsp_schemas import WSPEvent
+from utils.logger import log_context, sampled
+from utils.request_dedup import get_request_deduplicator
+from utils.wsp_codec import JSON_ENCODING, decode_event, encode_event
 import pydantic
 
 
@@ -27,38 +29,34 @@ def get_missing_fields(data: Dict | None, required_fields: list[str]) -> list[st
     return missing_fields
 
 
-def validate_wsp(event_data: str, required_fields: list[str] | None = None) -> WSPEvent:
+def validate_wsp(event_data: str | bytes, encoding: str = JSON_ENCODING) -> WSPEvent:
     """Validate incoming event data against WSPEvent schema.
     
     Args:
-        event_data (str): The raw event data as a JSON string.
+        event_data (str | bytes): The raw event data, a JSON text frame or a binary frame.
+        encoding (str): The wire encoding the connection negotiated, used for binary frames.
     
     Returns:
         WSPEvent: The validated WSPEvent object.
     
     Raises:
-        pydantic.ValidationError: If the event data does not conform to the WSPEvent schema.
+        ValueError: If the event data can't be decoded or does not conform to the WSPEvent schema.
     """
     try:
-        event_dict = json.loads(event_data)
-        event = WSPEvent.model_validate(event_dict)
-        return event
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON data: {e}")
+        return decode_event(event_data, encoding)
     except pydantic.ValidationError as e:
         raise ValueError(f"Event data validation error: {e}")
 
 
-async def send_wsp_event(ws: ServerConnection, event: WSPEvent) -> None:
+async def send_wsp_event(ws: ServerConnection, event: WSPEvent, encoding: str = JSON_ENCODING) -> None:
     """Send a WSPEvent over a WebSocket connection.
     
     Args:
         ws (ServerConnection): The WebSocket connection to send the event through.
         event (WSPEvent): The WSPEvent object to send.
+        encoding (str): The wire encoding the connection negotiated, JSON by default.
     """
-    if not validate_wsp(event.model_dump_json()):
-        raise ValueError("Invalid WSPEvent data")
-    await ws.send(event.model_dump_json())
+    await ws.send(encode_event(event, encoding))
 
 
 class EventHandlerRegistry:
@@ -86,6 +84,7 @@ class EventHandlerRegistry:
     def __init__(self, log: Logger):
         self.log = log
         self.handlers = {}
+        self.out_of_band = set()
 
     def get_handler(self, event_type: str) -> EventHandler | None:
         event_handler = self.handlers.get(event_type)
@@ -94,24 +93,34 @@ class EventHandlerRegistry:
             return
         return event_handler
 
-    def event(self, event_type: str):
+    def is_out_of_band(self, event_type: str) -> bool:
+        """Whether the event only reads, and can be answered without waiting behind its game's other events."""
+        return event_type in self.out_of_band
+
+    def event(self, event_type: str, out_of_band: bool = False):
 
         if event_type in self.handlers:
             raise ValueError(f"A handler has already been registered for the event type {event_type}.")
 
         def decorator(event_handler: EventHandler) -> EventHandler:
             async def wrapper(ws: ServerConnection, game_id: str, user_id: str, data: Dict | None) -> WSPEvent:
-                self.log.info(f"Executing event handler {event_handler.__name__} for event {event_type}")
+                verbose = sampled("event_handlers.execution", game_id)
+                if verbose:
+                    context = log_context(game_id=game_id, user_id=user_id, event=event_type)
+                    self.log.info(f"Executing event handler {event_handler.__name__} for event {event_type}", extra=context)
                 result = await event_handler(
                     ws=ws,
                     game_id=game_id,
                     user_id=user_id,
                     data=data
                 )
-                self.log.info("Successfully executed event!")
+                if verbose:
+                    self.log.info("Successfully executed event!", extra=context)
                 return result
             
             self.handlers[event_type] = wrapper
+            if out_of_band:
+                self.out_of_band.add(event_type)
 
             return wrapper
         return decorator
@@ -125,9 +134,39 @@ class EventHandlerRegistry:
                 data={"message": f"No handler found for event: {event.event}", "errorValue": event.event},
                 error="invalidEvent"
             )
-        return await event_handler(
-            ws=ws,
-            user_id=user_id,
-            game_id=game_id,
-            data=event.data
-        )
+        if event.request_id is None or user_id is None:
+            return await event_handler(
+                ws=ws,
+                user_id=user_id,
+                game_id=game_id,
+                data=event.data
+            )
+
+        # A retry of a request already seen is answered from the cache, or dropped while the original runs
+        dedup = get_request_deduplicator()
+        # A requestId reused for another game or event is another request
+        request_key = (game_id, event.event, event.request_id)
+        record = dedup.begin(user_id, request_key)
+        if record is not None:
+            if sampled("event_handlers.execution", game_id):
+                self.log.info(
+                    f"Duplicate request {event.request_id}, {'replaying its response' if record.done else 'still in flight'}",
+                    extra=log_context(game_id=game_id, user_id=user_id, event=event.event)
+                )
+            return record.response if record.done else None
+
+        try:
+            response = await event_handler(
+                ws=ws,
+                user_id=user_id,
+                game_id=game_id,
+                data=event.data
+            )
+        except Exception:
+            dedup.discard(user_id, request_key)
+            raise
+        if response is not None:
+            # Lets the client match the response to the request it retried
+            response = response.model_copy(update={"request_id": event.request_id})
+        dedup.complete(user_id, request_key, response)
+        return response